@@ -1,22 +1,177 @@
 # backend/app/api/endpoints.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Request, Response,
+    Query, WebSocket, WebSocketDisconnect
+)
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as FormFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from pydantic import ValidationError
+import asyncio
+import hashlib
+import hmac
+import math
+import orjson
 import os
 import uuid
 import shutil
-from typing import List, Optional, Dict, Any
-from app.services.lesson_generator import generate_baseline_lesson, enhance_with_udl_principle
-from app.services.pptx_generator import create_presentation
-from app.models.lesson import LessonRequest, LessonStage, SlideEditRequest, UDLEnhancementRequest
+from typing import List, Optional, Dict, Any, Tuple
+from app.services.lesson_generator import build_baseline_lesson, generate_baseline_lesson, enhance_with_udl_principle
+from app.services.pptx_generator import export_filename, export_path
+from app.services.rate_limiter import ModelCapacityError, client_rate_limiter, client_key, model_call_limiter
+from app.services.resilience import model_resilience
+from app.services.model_routing import model_router
+from app.services.prompts import prompt_registry
+from app.services.single_flight import generation_flights, baseline_flight_key, enhancement_flight_key
+from app.services.speculation import speculative_stages
+from app.services.export_prerender import export_prerenderer
+from app.services.scheduler import INTERACTIVE, priority_scope
+from app.services.session_events import session_events
+from app.services.lesson_archive import ArchivedLessonNotFound, lesson_archive
+from app.services.request_index import similar_requests
+from app.services.image_provider import slide_images
+from app.services.deck_import import DeckImportError, clip, deck_importer
+from app.services.pipeline import (
+    UDL_STAGES, PipelineError, available_next_stages, build_full_udl_pipeline, next_stage, remaining_stages
+)
+from app.services.session_store import (
+    idempotency_keys, lesson_sessions, mark_slides_changed, mark_lesson_changed, slides_changed_since
+)
+from app.core.config import settings
+from app.core.profiling import profiler
+from app.models.lesson_analytics import analyze_lesson, analyze_slide_contents
+from app.models.lesson import (
+    LessonRequest, LessonStage, LessonContent, LessonSlide, SlideEditRequest, BulkSlideEditRequest,
+    UDLEnhancementRequest, FullUDLRequest, ProfilingArmRequest
+)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-# Store lesson sessions in memory (in production, use Redis or database)
-lesson_sessions = {}
+def model_json(model, include=None) -> orjson.Fragment:
+    """Embed a model's pydantic-core JSON in an orjson response without re-encoding it"""
+    return orjson.Fragment(model.model_dump_json(include=include))
 
 
-@router.post("/generate-baseline")
+def parse_slide_fields(fields: List[str]) -> Optional[set]:
+    unknown = [name for name in fields if name not in LessonSlide.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown slide fields: {', '.join(unknown)}")
+    return set(fields) or None
+
+
+def parse_field_selection(fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Translate ?fields=title,udl_stage,slides.title into a pydantic include spec"""
+    if not fields:
+        return None
+
+    include = {}
+    slide_fields = []
+    for name in (field.strip() for field in fields.split(",") if field.strip()):
+        if name.startswith("slides."):
+            slide_fields.append(name[len("slides."):])
+        elif name in LessonContent.model_fields:
+            include[name] = True
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown lesson field: {name}")
+
+    slide_include = parse_slide_fields(slide_fields)
+    if slide_include and "slides" not in include:
+        include["slides"] = {"__all__": slide_include}
+    return include or None
+
+
+def slide_selection(selected) -> Optional[set]:
+    """Slide-level part of an include spec (None selects every slide field)"""
+    return selected["__all__"] if isinstance(selected, dict) else None
+
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def prioritized(level: str):
+    """Dependency running the endpoint's model calls and renders in the given scheduling class"""
+
+    async def set_priority():
+        with priority_scope(level):
+            yield
+
+    return set_priority
+
+
+def rate_limited(operation: str, calls_model: bool = True):
+    """Dependency enforcing per-client and provider-wide budgets for an LLM-backed operation
+
+    With ``calls_model=False`` only the client's request budget applies: no token charge
+    and no provider capacity check.
+    """
+
+    async def enforce_rate_limit(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        requester = client_key(request.headers.get("X-API-Key"), request.client.host if request.client else None)
+        estimated_tokens = settings.RATE_LIMIT_TOKEN_COSTS.get(operation, 0) if calls_model else 0
+
+        # Reject up front rather than queueing behind an exhausted provider quota; checked
+        # before the client's budgets so the client is not charged for the rejection
+        if calls_model:
+            provider_delay = model_call_limiter.admission_delay(estimated_tokens)
+            if provider_delay > settings.MODEL_CALL_QUEUE_TIMEOUT:
+                raise capacity_exhausted(ModelCapacityError(provider_delay))
+
+        retry_after = client_rate_limiter.check(requester, estimated_tokens)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {operation}. Please retry later.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+        # Refunded by capacity_exhausted if the provider turns the request away later
+        request.state.rate_limit_charge = (requester, estimated_tokens)
+
+    return enforce_rate_limit
+
+
+def capacity_exhausted(error: ModelCapacityError, request: Optional[Request] = None) -> HTTPException:
+    """429 for a model call that could not get a provider slot or budget within the queue timeout
+
+    Refunds the client budget ``rate_limited`` charged for ``request``, since the server rejected it.
+    """
+    charge = getattr(request.state, "rate_limit_charge", None) if request is not None else None
+    if charge is not None:
+        client_rate_limiter.refund(*charge)
+        request.state.rate_limit_charge = None
+    return HTTPException(
+        status_code=429,
+        detail="Model provider capacity exhausted. Please retry later.",
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
+async def session_admitted():
+    """Dependency refusing to start sessions while this worker's sessions fill its memory limit"""
+    if not await lesson_sessions.admit():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at its session memory limit. Please retry later.",
+            headers={"Retry-After": str(settings.SESSION_ADMISSION_RETRY_AFTER)}
+        )
+
+
+@router.post("/generate-baseline",
+             dependencies=[Depends(rate_limited("generate-baseline")), Depends(session_admitted)])
 async def generate_baseline_lesson_endpoint(
+        request: Request,
         background_tasks: BackgroundTasks,
         topic: str = Form(...),
         chapter: str = Form(...),
@@ -25,9 +180,15 @@ async def generate_baseline_lesson_endpoint(
         learning_objectives: str = Form(...),
         duration: str = Form(...),
         complexity_level: int = Form(5),
+        speculative: bool = Form(False),
+        reuse_similar: bool = Form(False),
         file: Optional[UploadFile] = File(None)
 ):
-    """Generate the initial baseline lesson deck"""
+    """Generate the initial baseline lesson deck
+
+    With ``reuse_similar`` a near-duplicate archived lesson, if there is one,
+    is opened instead and no model call is made.
+    """
     try:
         # Create unique session ID
         session_id = str(uuid.uuid4())
@@ -55,8 +216,29 @@ async def generate_baseline_lesson_endpoint(
             uploaded_file_path=uploaded_file_path
         )
 
-        # Generate baseline lesson content
-        baseline_lesson = generate_baseline_lesson(lesson_request)
+        # Lessons built on uploaded material are always generated
+        if reuse_similar and not uploaded_file_path and similar_requests_enabled():
+            matches = await run_in_threadpool(
+                similar_requests.similar, lesson_request, settings.SIMILAR_REQUESTS_THRESHOLD, 1
+            )
+            if matches:
+                lesson_id, similarity = matches[0]
+                try:
+                    reused_id, session = await open_archived_session(lesson_id, speculative)
+                except ArchivedLessonNotFound:
+                    pass  # Deleted from the archive since it was indexed; generate as usual
+                else:
+                    shutil.rmtree(lesson_dir, ignore_errors=True)
+                    return archived_session_response(reused_id, session, {
+                        "similarity": similarity,
+                        "message": "Reused a similar archived lesson"
+                    })
+
+        # Generate baseline lesson content; identical concurrent requests share one model call
+        baseline_lesson = await generation_flights.do(
+            baseline_flight_key(lesson_request),
+            lambda: run_in_threadpool(generate_baseline_lesson, lesson_request)
+        )
 
         # Store session data
         lesson_sessions[session_id] = {
@@ -64,69 +246,387 @@ async def generate_baseline_lesson_endpoint(
             "current_stage": "baseline",
             "lesson_content": baseline_lesson,
             "edit_history": [],
-            "lesson_dir": lesson_dir
+            "lesson_dir": lesson_dir,
+            "speculative": speculative or settings.SPECULATIVE_STAGES_ENABLED
         }
 
-        return {
+        if lesson_sessions[session_id]["speculative"]:
+            speculative_stages.schedule(session_id, lesson_sessions[session_id], next_stage("baseline"))
+        export_prerenderer.schedule(session_id, lesson_sessions[session_id])
+
+        return ORJSONResponse({
             "success": True,
             "session_id": session_id,
             "stage": "baseline",
-            "lesson_content": baseline_lesson.dict(),
+            "version": lesson_sessions[session_id]["version"],
+            "lesson_content": model_json(baseline_lesson),
             "message": "Baseline lesson generated successfully"
-        }
+        })
 
+    except ModelCapacityError as e:
+        shutil.rmtree(lesson_dir, ignore_errors=True)
+        raise capacity_exhausted(e, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating baseline lesson: {str(e)}")
 
 
+async def limited_body(request: Request, max_bytes: int):
+    """Request body chunks, refused with a 413 as soon as more than ``max_bytes`` arrived"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Decks can be at most {settings.DECK_IMPORT_MAX_BYTES} bytes")
+        yield chunk
+
+
+@router.post("/import-deck", dependencies=[Depends(session_admitted)])
+async def import_deck(request: Request):
+    """Start a session at the baseline stage from an existing .pptx deck, without a model call
+
+    Takes the /generate-baseline form fields with the deck as ``file``;
+    ``lesson_title`` defaults to the deck's own title. Slide titles, body
+    text (bullets, tables and grouped shapes), speaker notes and picture alt
+    text become the lesson's slides, ready for the UDL stages.
+
+    The form is parsed here rather than by FastAPI so the upload can be cut
+    off while it streams, instead of after it was spooled in full.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=415, detail="Upload the deck as multipart/form-data")
+
+    # Room for the multipart framing and the other fields on top of the deck
+    max_bytes = settings.DECK_IMPORT_MAX_BYTES + 64 * 1024
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Decks can be at most {settings.DECK_IMPORT_MAX_BYTES} bytes")
+
+    try:
+        parser = MultiPartParser(request.headers, limited_body(request, max_bytes), max_files=1, max_fields=20)
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    session_id = str(uuid.uuid4())
+    lesson_dir = f"static/downloads/{session_id}"
+    try:
+        deck = form.get("file")
+        if not isinstance(deck, FormFile) or not deck.filename:
+            raise HTTPException(status_code=400, detail="Attach the deck as the file field")
+        if not deck.filename.lower().endswith(".pptx"):
+            raise HTTPException(status_code=400, detail="Only PowerPoint (.pptx) decks can be imported")
+
+        lesson_title = form.get("lesson_title")
+        try:
+            lesson_request = LessonRequest(
+                topic=form.get("topic"),
+                chapter=form.get("chapter"),
+                lesson_title=lesson_title or deck.filename,
+                learning_objectives=form.get("learning_objectives"),
+                duration=form.get("duration"),
+                complexity_level=form.get("complexity_level") or 5
+            )
+        except ValidationError as e:
+            raise HTTPException(status_code=422,
+                                detail=e.errors(include_url=False, include_context=False, include_input=False))
+
+        os.makedirs(lesson_dir, exist_ok=True)
+        uploaded_file_path = f"{lesson_dir}/uploaded_{os.path.basename(deck.filename)}"
+
+        def save_upload():
+            with open(uploaded_file_path, "wb") as buffer:
+                shutil.copyfileobj(deck.file, buffer)
+
+        await run_in_threadpool(save_upload)
+        try:
+            imported = await asyncio.wrap_future(deck_importer.submit(uploaded_file_path))
+        except DeckImportError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+        update = {"uploaded_file_path": uploaded_file_path}
+        if not lesson_title and imported.title:
+            update["lesson_title"] = clip(imported.title, 300)
+        lesson_request = lesson_request.model_copy(update=update)
+        baseline_lesson = build_baseline_lesson(lesson_request, imported.slides)
+
+        lesson_sessions[session_id] = {
+            "request": lesson_request,
+            "current_stage": "baseline",
+            "lesson_content": baseline_lesson,
+            "edit_history": [],
+            "lesson_dir": lesson_dir,
+            "speculative": form.get("speculative", "").lower() == "true" or settings.SPECULATIVE_STAGES_ENABLED
+        }
+
+        session = lesson_sessions[session_id]
+        if session["speculative"]:
+            speculative_stages.schedule(session_id, session, next_stage("baseline"))
+        export_prerenderer.schedule(session_id, session)
+
+        return ORJSONResponse({
+            "success": True,
+            "session_id": session_id,
+            "stage": "baseline",
+            "version": session["version"],
+            "lesson_content": model_json(baseline_lesson),
+            "source_slides": imported.source_slides,
+            "skipped_slides": imported.skipped,
+            "message": "Deck imported as a baseline lesson"
+        })
+
+    except HTTPException:
+        shutil.rmtree(lesson_dir, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(lesson_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Error importing deck: {str(e)}")
+    finally:
+        await form.close()
+
+
+def publish_lesson_replaced(session_id: str, session: Dict[str, Any]):
+    """Push a replaced lesson (after a stage) to the session's WebSocket clients"""
+    if session_events.has_subscribers(session_id):
+        session_events.publish(session_id, {
+            "type": "lesson_replaced",
+            "stage": session["current_stage"],
+            "version": session["version"],
+            "lesson_content": model_json(session["lesson_content"])
+        })
+
+
+def slide_edit_changes(edit_request: SlideEditRequest) -> Dict[str, str]:
+    return {
+        field: getattr(edit_request, field)
+        for field in ("title", "content", "notes", "image_prompt")
+        if getattr(edit_request, field) is not None
+    }
+
+
+def apply_slide_edit(session_id: str, session: Dict[str, Any], edit_request: SlideEditRequest,
+                     origin: Optional[str] = None):
+    """Apply a slide edit (from a POST or the session WebSocket) and notify connected clients
+
+    With ``base_version`` the edit is rejected with 409 if the slide changed
+    since that version, instead of silently overwriting a co-teacher's edit.
+    """
+    lesson_content = session["lesson_content"]
+
+    # Validate slide index
+    if edit_request.slide_index >= len(lesson_content.slides):
+        raise HTTPException(status_code=400, detail="Invalid slide index")
+
+    slide_version = session["slide_versions"][edit_request.slide_index]
+    if edit_request.base_version is not None and (
+            slide_version > edit_request.base_version or session["structure_version"] > edit_request.base_version):
+        raise HTTPException(status_code=409, detail={
+            "message": "Slide changed since base_version",
+            "slide_index": edit_request.slide_index,
+            "slide_version": slide_version,
+            "slide": lesson_content.slides[edit_request.slide_index].model_dump()
+        })
+
+    # Store edit in history
+    session["edit_history"].append({
+        "slide_index": edit_request.slide_index,
+        "original": lesson_content.slides[edit_request.slide_index].model_dump(),
+        "timestamp": str(uuid.uuid4())  # Simple timestamp placeholder
+    })
+
+    # Apply edits
+    slide = lesson_content.slides[edit_request.slide_index]
+    changes = slide_edit_changes(edit_request)
+    for field, value in changes.items():
+        setattr(slide, field, value)
+
+    version = mark_slides_changed(session, [edit_request.slide_index])
+    speculative_stages.discard(session_id)
+    export_prerenderer.schedule(session_id, session, debounce=True)
+    session_events.publish(session_id, {
+        "type": "slide_patch",
+        "version": version,
+        "slide_index": edit_request.slide_index,
+        "slide_version": version,
+        "changes": changes,
+        "origin": origin
+    })
+    return slide, version
+
+
 @router.post("/edit-slide/{session_id}")
 async def edit_slide(session_id: str, edit_request: SlideEditRequest):
     """Edit a specific slide in the current lesson"""
     try:
-        if session_id not in lesson_sessions:
+        if not await lesson_sessions.ensure_loaded(session_id):
             raise HTTPException(status_code=404, detail="Lesson session not found")
 
-        session = lesson_sessions[session_id]
-        lesson_content = session["lesson_content"]
+        slide, version = apply_slide_edit(session_id, lesson_sessions[session_id], edit_request)
 
-        # Validate slide index
-        if edit_request.slide_index >= len(lesson_content.slides):
-            raise HTTPException(status_code=400, detail="Invalid slide index")
+        return ORJSONResponse({
+            "success": True,
+            "message": "Slide updated successfully",
+            "version": version,
+            "slide": model_json(slide)
+        })
 
-        # Store edit in history
-        original_slide = lesson_content.slides[edit_request.slide_index].copy()
-        session["edit_history"].append({
-            "slide_index": edit_request.slide_index,
-            "original": original_slide.dict(),
-            "timestamp": str(uuid.uuid4())  # Simple timestamp placeholder
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error editing slide: {str(e)}")
+
+
+def validation_detail(position: Optional[int], error: ValidationError) -> Dict[str, Any]:
+    """422 detail for a bulk edit; ``position`` is the failing operation, or None for the whole batch"""
+    return {
+        "message": "Edits produce an invalid lesson",
+        "operation": position,
+        "errors": error.errors(include_url=False, include_context=False, include_input=False)
+    }
+
+
+def apply_slide_operations(session_id: str, session: Dict[str, Any], bulk_request: BulkSlideEditRequest,
+                           origin: Optional[str] = None) -> Tuple[int, bool, List[int]]:
+    """Apply a bulk slide edit atomically, as one history entry and one version bump
+
+    Every operation is checked and the resulting deck validated against the
+    LessonSlide and LessonContent constraints before the session changes, so
+    a failing batch leaves the lesson untouched. Indexes in each operation
+    refer to the deck as left by the operations before it. With
+    ``base_version`` the batch is rejected with 409 if the deck was
+    restructured, or a slide it touches changed, since that version.
+
+    Returns (version, whether slides were inserted, deleted or moved, indexes
+    of the changed slides in the new deck).
+    """
+    lesson_content = session["lesson_content"]
+    base_version = bulk_request.base_version
+    if base_version is not None and session["structure_version"] > base_version:
+        raise HTTPException(status_code=409, detail={
+            "message": "Slides were inserted, removed or reordered since base_version",
+            "structure_version": session["structure_version"]
         })
 
-        # Apply edits
-        slide = lesson_content.slides[edit_request.slide_index]
-        if edit_request.title is not None:
-            slide.title = edit_request.title
-        if edit_request.content is not None:
-            slide.content = edit_request.content
-        if edit_request.notes is not None:
-            slide.notes = edit_request.notes
-        if edit_request.image_prompt is not None:
-            slide.image_prompt = edit_request.image_prompt
+    # Working deck of (slide, index before the batch); inserted slides have no index
+    deck = [(slide, index) for index, slide in enumerate(lesson_content.slides)]
+    originals: Dict[int, Dict[str, Any]] = {}
+    restructured = False
 
-        return {
+    for position, operation in enumerate(bulk_request.operations):
+        limit = len(deck) + 1 if operation.op == "insert" else len(deck)
+        if operation.slide_index >= limit:
+            raise HTTPException(status_code=400, detail={"message": "Invalid slide index", "operation": position})
+
+        if operation.op == "insert":
+            try:
+                slide = LessonSlide.model_validate(slide_edit_changes(operation))
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=validation_detail(position, e))
+            deck.insert(operation.slide_index, (slide, None))
+            restructured = True
+            continue
+
+        slide, index = deck[operation.slide_index]
+        if index is not None and base_version is not None and session["slide_versions"][index] > base_version:
+            raise HTTPException(status_code=409, detail={
+                "message": "Slide changed since base_version",
+                "operation": position,
+                "slide_index": index,
+                "slide_version": session["slide_versions"][index],
+                "slide": lesson_content.slides[index].model_dump()
+            })
+
+        if operation.op == "patch":
+            if index is not None:
+                originals.setdefault(index, lesson_content.slides[index].model_dump())
+            try:
+                slide = LessonSlide.model_validate({**slide.model_dump(), **slide_edit_changes(operation)})
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=validation_detail(position, e))
+            deck[operation.slide_index] = (slide, index)
+        elif operation.op == "delete":
+            if index is not None:
+                originals.setdefault(index, lesson_content.slides[index].model_dump())
+            del deck[operation.slide_index]
+            restructured = True
+        else:
+            if operation.to_index is None or operation.to_index >= len(deck):
+                raise HTTPException(status_code=400, detail={"message": "Invalid to_index", "operation": position})
+            deck.insert(operation.to_index, deck.pop(operation.slide_index))
+            restructured = True
+
+    slides = [slide for slide, _ in deck]
+    try:
+        # Checks the slide count limits without revalidating the rest of the lesson
+        LessonContent.__pydantic_validator__.validate_assignment(lesson_content.model_copy(), "slides", slides)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=validation_detail(None, e))
+
+    # One history entry holding the operations and the slides they overwrote or removed
+    session["edit_history"].append({
+        "operations": [operation.model_dump(exclude_none=True) for operation in bulk_request.operations],
+        "originals": [{"slide_index": index, "original": original} for index, original in sorted(originals.items())],
+        "timestamp": str(uuid.uuid4())
+    })
+
+    changed = [position for position, (slide, index) in enumerate(deck)
+               if index is None or slide is not lesson_content.slides[index]]
+    lesson_content.slides = slides
+    if restructured:
+        version = mark_lesson_changed(session)
+        publish_lesson_replaced(session_id, session)
+    else:
+        version = mark_slides_changed(session, changed)
+        session_events.publish(session_id, {
+            "type": "slides_patch",
+            "version": version,
+            "slides": [{"slide_index": index, "slide_version": version, "slide": model_json(slides[index])}
+                       for index in changed],
+            "origin": origin
+        })
+
+    speculative_stages.discard(session_id)
+    export_prerenderer.schedule(session_id, session, debounce=True)
+    return version, restructured, changed
+
+
+@router.post("/edit-slides/{session_id}")
+async def edit_slides(session_id: str, bulk_request: BulkSlideEditRequest):
+    """Patch, insert, delete and reorder slides in one atomic batch"""
+    try:
+        if not await lesson_sessions.ensure_loaded(session_id):
+            raise HTTPException(status_code=404, detail="Lesson session not found")
+
+        session = lesson_sessions[session_id]
+        version, restructured, changed = apply_slide_operations(session_id, session, bulk_request)
+        slides = session["lesson_content"].slides
+
+        response = {
             "success": True,
-            "message": "Slide updated successfully",
-            "slide": slide.dict()
+            "message": f"Applied {len(bulk_request.operations)} slide operations",
+            "version": version,
+            "restructured": restructured,
+            "slide_count": len(slides),
+            "changed_slides": changed
         }
+        if restructured:
+            response["lesson_content"] = model_json(session["lesson_content"])
+        else:
+            response["slides"] = [{"slide_index": index, "slide": model_json(slides[index])} for index in changed]
+        return ORJSONResponse(response)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error editing slide: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error editing slides: {str(e)}")
 
 
-@router.post("/ai-enhance-slide/{session_id}")
+@router.post("/ai-enhance-slide/{session_id}",
+             dependencies=[Depends(rate_limited("ai-enhance-slide", calls_model=False)),
+                           Depends(prioritized(INTERACTIVE))])
 async def ai_enhance_slide(session_id: str, enhancement_request: Dict[str, Any]):
     """Use AI to enhance a specific slide based on user prompt"""
     try:
-        if session_id not in lesson_sessions:
+        if not await lesson_sessions.ensure_loaded(session_id):
             raise HTTPException(status_code=404, detail="Lesson session not found")
 
         session = lesson_sessions[session_id]
@@ -139,10 +639,9 @@ async def ai_enhance_slide(session_id: str, enhancement_request: Dict[str, Any])
             raise HTTPException(status_code=400, detail="Invalid slide index")
 
         # Store original in history
-        original_slide = lesson_content.slides[slide_index].copy()
         session["edit_history"].append({
             "slide_index": slide_index,
-            "original": original_slide.dict(),
+            "original": lesson_content.slides[slide_index].model_dump(),
             "timestamp": str(uuid.uuid4())
         })
 
@@ -154,118 +653,333 @@ async def ai_enhance_slide(session_id: str, enhancement_request: Dict[str, Any])
         )
 
         lesson_content.slides[slide_index] = enhanced_slide
+        version = mark_slides_changed(session, [slide_index])
+        speculative_stages.discard(session_id)
+        export_prerenderer.schedule(session_id, session, debounce=True)
+        session_events.publish(session_id, {
+            "type": "slide_patch",
+            "version": version,
+            "slide_index": slide_index,
+            "slide_version": version,
+            "changes": model_json(enhanced_slide),
+            "origin": None
+        })
 
-        return {
+        return ORJSONResponse({
             "success": True,
             "message": "Slide enhanced with AI",
-            "slide": enhanced_slide.dict()
-        }
+            "version": version,
+            "slide": model_json(enhanced_slide)
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error enhancing slide: {str(e)}")
 
 
-@router.post("/apply-udl-principle/{session_id}")
-async def apply_udl_principle(session_id: str, udl_request: UDLEnhancementRequest):
+@router.post("/apply-udl-principle/{session_id}",
+             dependencies=[Depends(rate_limited("apply-udl-principle")), Depends(prioritized(INTERACTIVE))])
+async def apply_udl_principle(session_id: str, udl_request: UDLEnhancementRequest, request: Request):
     """Apply a specific UDL principle to the entire lesson"""
     try:
-        if session_id not in lesson_sessions:
+        if not await lesson_sessions.ensure_loaded(session_id):
             raise HTTPException(status_code=404, detail="Lesson session not found")
 
         session = lesson_sessions[session_id]
 
         # Validate UDL principle
-        valid_principles = ["engagement", "representation", "action_expression"]
-        if udl_request.principle not in valid_principles:
+        if udl_request.principle not in UDL_STAGES:
             raise HTTPException(status_code=400, detail="Invalid UDL principle")
 
         # Check stage progression
         current_stage = session["current_stage"]
-        stage_progression = {
-            "baseline": "engagement",
-            "engagement": "representation",
-            "representation": "action_expression"
-        }
-
-        expected_principle = stage_progression.get(current_stage)
+        expected_principle = next_stage(current_stage)
         if udl_request.principle != expected_principle:
             raise HTTPException(
                 status_code=400,
                 detail=f"Must apply {expected_principle} principle next"
             )
 
+        started_version = session["version"]
+        session_events.publish(session_id, {"type": "stage_started", "stage": udl_request.principle})
+
+        # Serve a still-valid speculative result, otherwise apply the UDL enhancement;
+        # identical concurrent requests share one model call
+        enhanced_lesson = await speculative_stages.take(session_id, session, udl_request.principle)
+        if enhanced_lesson is None:
+            enhanced_lesson = await generation_flights.do(
+                enhancement_flight_key(session["lesson_content"], udl_request.principle, session["request"]),
+                lambda: run_in_threadpool(
+                    enhance_with_udl_principle,
+                    session["lesson_content"],
+                    udl_request.principle,
+                    session["request"]
+                )
+            )
+
+        # Edits made while the stage ran are not in its result; keep them rather than overwrite them.
+        # The session may also have been spilled and read back meanwhile, so use the current one
+        if not await lesson_sessions.ensure_loaded(session_id):
+            raise HTTPException(status_code=404, detail="Lesson session not found")
+        session = lesson_sessions[session_id]
+        if session["version"] != started_version:
+            session_events.publish(session_id, {"type": "stage_failed", "stage": udl_request.principle})
+            raise HTTPException(status_code=409, detail="Lesson changed while the UDL principle was being applied")
+
         # Store current state in history
         session["edit_history"].append({
             "stage_transition": f"{current_stage}_to_{udl_request.principle}",
-            "lesson_content": session["lesson_content"].dict(),
+            "lesson_content": session["lesson_content"].model_dump(),
             "timestamp": str(uuid.uuid4())
         })
 
-        # Apply UDL enhancement
-        enhanced_lesson = enhance_with_udl_principle(
-            session["lesson_content"],
-            udl_request.principle,
-            session["request"]
-        )
-
         # Update session
         session["lesson_content"] = enhanced_lesson
         session["current_stage"] = udl_request.principle
+        version = mark_lesson_changed(session)
+        publish_lesson_replaced(session_id, session)
 
-        return {
+        if session.get("speculative"):
+            speculative_stages.schedule(session_id, session, next_stage(udl_request.principle))
+        export_prerenderer.schedule(session_id, session)
+
+        return ORJSONResponse({
             "success": True,
             "stage": udl_request.principle,
-            "lesson_content": enhanced_lesson.dict(),
+            "version": version,
+            "lesson_content": model_json(enhanced_lesson),
             "message": f"UDL {udl_request.principle} principle applied successfully"
-        }
+        })
 
+    except HTTPException:
+        raise
+    except ModelCapacityError as e:
+        session_events.publish(session_id, {"type": "stage_failed", "stage": udl_request.principle})
+        raise capacity_exhausted(e, request)
     except Exception as e:
+        session_events.publish(session_id, {"type": "stage_failed", "stage": udl_request.principle})
         raise HTTPException(status_code=500, detail=f"Error applying UDL principle: {str(e)}")
 
 
+@router.post("/run-full-udl/{session_id}", dependencies=[Depends(rate_limited("run-full-udl"))])
+async def run_full_udl(session_id: str, background_tasks: BackgroundTasks, request: Request,
+                       full_request: FullUDLRequest = FullUDLRequest()):
+    """Apply every remaining UDL principle in one run, then quality-check and optionally export
+
+    The principles are independent enhancements of the current lesson, so they
+    run concurrently and are merged; the response reports per-stage timings.
+    """
+    try:
+        if not await lesson_sessions.ensure_loaded(session_id):
+            raise HTTPException(status_code=404, detail="Lesson session not found")
+
+        session = lesson_sessions[session_id]
+        current_stage = session["current_stage"]
+        principles = remaining_stages(current_stage)
+        if not principles:
+            raise HTTPException(status_code=400, detail="All UDL principles have already been applied")
+
+        started_version = session["version"]
+        snapshot = session["lesson_content"].model_copy(deep=True)
+        deck_path = None
+        if full_request.export:
+            deck_path = export_path(session["lesson_dir"], snapshot)
+
+        speculative_stages.discard(session_id)
+        session_events.publish(session_id, {"type": "pipeline_started", "stages": principles})
+        if deck_path:
+            # The pipeline writes the deck itself; keep a background render from racing it
+            export_prerenderer.cancel(session_id)
+        try:
+            results, timings = await build_full_udl_pipeline(
+                snapshot, session["request"], principles, deck_path
+            ).run(observer=lambda node, status, timing: session_events.publish(
+                session_id, {"type": "stage_progress", "stage": node, "status": status, **timing}
+            ))
+        except PipelineError as e:
+            if isinstance(e.error, ModelCapacityError):
+                raise capacity_exhausted(e.error, request)
+            raise HTTPException(status_code=500, detail={"message": str(e), "timings": e.timings})
+
+        if not await lesson_sessions.ensure_loaded(session_id):
+            raise HTTPException(status_code=404, detail="Lesson session not found")
+        session = lesson_sessions[session_id]
+        if session["version"] != started_version:
+            raise HTTPException(status_code=409, detail="Lesson changed while the UDL pipeline was running")
+
+        session["edit_history"].append({
+            "stage_transition": f"{current_stage}_to_{principles[-1]}",
+            "lesson_content": snapshot.model_dump(),
+            "timestamp": str(uuid.uuid4())
+        })
+
+        enhanced_lesson = results["merge"]
+        session["lesson_content"] = enhanced_lesson
+        session["current_stage"] = principles[-1]
+        version = mark_lesson_changed(session)
+        publish_lesson_replaced(session_id, session)
+        if deck_path:
+            export_prerenderer.record(session_id, session, deck_path)
+            archive_exported_lesson(session, background_tasks)
+        else:
+            export_prerenderer.schedule(session_id, session)
+
+        payload = {
+            "success": True,
+            "stage": principles[-1],
+            "applied_principles": principles,
+            "version": version,
+            "lesson_content": model_json(enhanced_lesson),
+            "quality_check": results["quality_check"],
+            "timings": timings,
+            "message": "All UDL principles applied successfully"
+        }
+        if deck_path:
+            payload["download_url"] = f"/static/downloads/{session_id}/{export_filename(snapshot)}"
+        return ORJSONResponse(payload)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running UDL pipeline: {str(e)}")
+
+
 @router.get("/lesson-session/{session_id}")
-async def get_lesson_session(session_id: str):
-    """Get current lesson session data"""
+async def get_lesson_session(session_id: str, request: Request, fields: Optional[str] = None,
+                             since_version: Optional[int] = None):
+    """Get current lesson session data
+
+    ``fields`` limits the lesson to the listed fields (``slides.<field>`` selects
+    slide fields). With ``since_version`` only slides changed after that version
+    are returned, unless the lesson was replaced and needs a full reload.
+    """
     try:
-        if session_id not in lesson_sessions:
+        if not await lesson_sessions.ensure_loaded(session_id):
             raise HTTPException(status_code=404, detail="Lesson session not found")
 
         session = lesson_sessions[session_id]
+        include = parse_field_selection(fields)
+        etag = make_etag(session_id, session["version"], fields, since_version)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
-        return {
+        payload = {
             "success": True,
             "session_id": session_id,
             "stage": session["current_stage"],
-            "lesson_content": session["lesson_content"].dict(),
-            "available_next_stages": get_available_next_stages(session["current_stage"])
+            "version": session["version"],
+            "available_next_stages": available_next_stages(session["current_stage"])
         }
 
+        changed = slides_changed_since(session, since_version) if since_version is not None else None
+        if changed is None:
+            payload["full"] = True
+            payload["lesson_content"] = model_json(session["lesson_content"], include)
+        else:
+            slides = session["lesson_content"].slides
+            selected = include.get("slides") if include else True
+            payload["full"] = False
+            payload["changed_slides"] = [
+                {"index": index, "slide": model_json(slides[index], slide_selection(selected))}
+                if selected else {"index": index}
+                for index in changed
+            ]
+
+        return ORJSONResponse(payload, headers={"ETag": etag})
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving session: {str(e)}")
 
 
-@router.post("/export-lesson/{session_id}")
-async def export_lesson(session_id: str):
+@router.get("/lesson-session/{session_id}/slides/{slide_index}")
+async def get_lesson_slide(session_id: str, slide_index: int, request: Request, fields: Optional[str] = None):
+    """Get a single slide, optionally limited to ``fields``"""
+    if not await lesson_sessions.ensure_loaded(session_id):
+        raise HTTPException(status_code=404, detail="Lesson session not found")
+
+    session = lesson_sessions[session_id]
+    slides = session["lesson_content"].slides
+    if slide_index < 0 or slide_index >= len(slides):
+        raise HTTPException(status_code=404, detail="Slide not found")
+
+    include = parse_slide_fields([field.strip() for field in fields.split(",") if field.strip()]) if fields else None
+    etag = make_etag(session_id, slide_index, session["structure_version"],
+                     session["slide_versions"][slide_index], fields)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return ORJSONResponse({
+        "success": True,
+        "session_id": session_id,
+        "slide_index": slide_index,
+        "version": session["version"],
+        "slide_version": session["slide_versions"][slide_index],
+        "slide": model_json(slides[slide_index], include)
+    }, headers={"ETag": etag})
+
+
+@router.get("/lesson-session/{session_id}/analytics")
+async def get_lesson_analytics(session_id: str):
+    """Readability grade, sentence lengths, jargon density and size of every slide
+
+    Slides flagged ``needs_rewrite`` are the ones the representation stage
+    sends to the model.
+    """
+    if not await lesson_sessions.ensure_loaded(session_id):
+        raise HTTPException(status_code=404, detail="Lesson session not found")
+
+    session = lesson_sessions[session_id]
+    analytics = analyze_lesson(session["lesson_content"], session["request"].course_level)
+    return {"success": True, "session_id": session_id, "version": session["version"], **analytics}
+
+
+@router.get("/lesson-session/{session_id}/memory")
+async def get_session_memory(session_id: str):
+    """Serialized size of a session and its parts; spilled sessions report their size on disk"""
+    memory = lesson_sessions.memory(session_id)
+    if memory is None:
+        raise HTTPException(status_code=404, detail="Lesson session not found")
+    return {"success": True, "memory": memory}
+
+
+@router.get("/sessions/memory")
+async def get_sessions_memory(limit: int = Query(10, ge=1, le=100)):
+    """Aggregate session memory accounting plus the largest in-memory sessions"""
+    return {
+        "success": True,
+        "sessions": lesson_sessions.stats(),
+        "largest": lesson_sessions.largest(limit)
+    }
+
+
+@router.post("/export-lesson/{session_id}", dependencies=[Depends(prioritized(INTERACTIVE))])
+async def export_lesson(session_id: str, background_tasks: BackgroundTasks):
     """Export the final lesson as PowerPoint"""
     try:
-        if session_id not in lesson_sessions:
+        if not await lesson_sessions.ensure_loaded(session_id):
             raise HTTPException(status_code=404, detail="Lesson session not found")
 
         session = lesson_sessions[session_id]
         lesson_content = session["lesson_content"]
-        lesson_dir = session["lesson_dir"]
 
-        # Create PowerPoint presentation
-        pptx_filename = f"{lesson_content.title.replace(' ', '_')}_final.pptx"
-        pptx_path = f"{lesson_dir}/{pptx_filename}"
-        create_presentation(lesson_content, pptx_path)
+        # Serve the pre-rendered PowerPoint presentation, rendering it now if it is not warm yet
+        pptx_path, render_source = await export_prerenderer.current_artifact(session_id, session)
 
         # Generate download URL
-        download_url = f"/static/downloads/{session_id}/{pptx_filename}"
+        download_url = f"/static/downloads/{session_id}/{os.path.basename(pptx_path)}"
+        session_events.publish(session_id, {
+            "type": "exported",
+            "version": session["version"],
+            "download_url": download_url
+        })
+        archive_id = archive_exported_lesson(session, background_tasks)
 
         return {
             "success": True,
             "download_url": download_url,
+            "render_source": render_source,
+            "archive_id": archive_id,
             "message": "Lesson exported successfully",
             "lesson_details": {
                 "title": lesson_content.title,
@@ -283,7 +997,12 @@ async def export_lesson(session_id: str):
 async def delete_lesson_session(session_id: str):
     """Clean up lesson session"""
     try:
-        if session_id in lesson_sessions:
+        if await lesson_sessions.ensure_loaded(session_id):
+            # Stop background work before its files disappear
+            speculative_stages.discard(session_id)
+            export_prerenderer.discard(session_id)
+            session_events.close(session_id, "Session deleted")
+
             # Clean up files
             lesson_dir = lesson_sessions[session_id]["lesson_dir"]
             if os.path.exists(lesson_dir):
@@ -298,22 +1017,355 @@ async def delete_lesson_session(session_id: str):
         raise HTTPException(status_code=500, detail=f"Error cleaning up session: {str(e)}")
 
 
-def get_available_next_stages(current_stage: str) -> List[str]:
-    """Get list of available next stages"""
-    stage_map = {
-        "baseline": ["engagement"],
-        "engagement": ["representation"],
-        "representation": ["action_expression"],
-        "action_expression": ["export"]
+def archive_exported_lesson(session: Dict[str, Any], background_tasks: BackgroundTasks) -> Optional[str]:
+    """Index the exported lesson in the library once the response is sent
+
+    Re-exports of the same session replace its archive entry. Returns the
+    archive id, or None when the archive is disabled.
+    """
+    if not settings.LESSON_ARCHIVE_ENABLED:
+        return None
+    archive_id = session.setdefault("archive_id", str(uuid.uuid4()))
+    version = session["version"]
+    if session.get("archived_version") == version:
+        return archive_id
+
+    snapshot = session["lesson_content"].model_copy(deep=True)
+
+    def archive():
+        try:
+            lesson_archive.archive(snapshot, session["request"], session["current_stage"], archive_id)
+            if "archived_version" not in session and similar_requests_enabled():
+                similar_requests.add(session["request"], archive_id)
+            session["archived_version"] = version
+        except Exception as e:
+            print(f"Error archiving lesson {archive_id}: {e}")
+
+    background_tasks.add_task(archive)
+    return archive_id
+
+
+def require_archive():
+    if not settings.LESSON_ARCHIVE_ENABLED:
+        raise HTTPException(status_code=404, detail="Lesson archive is disabled")
+
+
+def similar_requests_enabled() -> bool:
+    return settings.LESSON_ARCHIVE_ENABLED and settings.SIMILAR_REQUESTS_ENABLED
+
+
+async def open_archived_session(lesson_id: str, speculative: bool):
+    """Create a session from an archived lesson (raises ArchivedLessonNotFound)"""
+    lesson_request, lesson_content, stage = await run_in_threadpool(lesson_archive.get, lesson_id)
+
+    session_id = str(uuid.uuid4())
+    lesson_dir = f"static/downloads/{session_id}"
+    os.makedirs(lesson_dir, exist_ok=True)
+
+    lesson_sessions[session_id] = {
+        "request": lesson_request,
+        "current_stage": stage,
+        "lesson_content": lesson_content,
+        "edit_history": [],
+        "lesson_dir": lesson_dir,
+        "speculative": speculative or settings.SPECULATIVE_STAGES_ENABLED,
+        "source_lesson_id": lesson_id
+    }
+
+    session = lesson_sessions[session_id]
+    if session["speculative"] and next_stage(stage):
+        speculative_stages.schedule(session_id, session, next_stage(stage))
+    export_prerenderer.schedule(session_id, session)
+    return session_id, session
+
+
+def archived_session_response(session_id: str, session: Dict[str, Any], extra: Dict[str, Any]) -> ORJSONResponse:
+    return ORJSONResponse({
+        "success": True,
+        "session_id": session_id,
+        "stage": session["current_stage"],
+        "version": session["version"],
+        "source_lesson_id": session["source_lesson_id"],
+        "available_next_stages": available_next_stages(session["current_stage"]),
+        "lesson_content": model_json(session["lesson_content"]),
+        **extra
+    })
+
+
+@router.get("/library/search", dependencies=[Depends(require_archive)])
+async def search_library(
+        q: str = Query(..., min_length=1, max_length=200),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=settings.LIBRARY_SEARCH_MAX_PAGE_SIZE),
+        stage: Optional[LessonStage] = None
+):
+    """Full-text search over archived lessons' slides, best matches first"""
+    total, results = await run_in_threadpool(
+        lesson_archive.search, q, page, page_size, stage.value if stage else None
+    )
+    return {
+        "success": True,
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": math.ceil(total / page_size),
+        "results": results
+    }
+
+
+@router.post("/library/similar", dependencies=[Depends(require_archive)])
+async def find_similar_lessons(lesson_request: LessonRequest, limit: int = Query(5, ge=1, le=20)):
+    """Archived lessons whose requests nearly match this one, checked before generating
+
+    Matching ignores wording differences such as "Intro to" versus
+    "Introduction to" and the order of learning objectives.
+    """
+    if not settings.SIMILAR_REQUESTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Similar lesson detection is disabled")
+
+    matches = await run_in_threadpool(
+        similar_requests.similar, lesson_request, settings.SIMILAR_REQUESTS_THRESHOLD, limit
+    )
+    summaries = await run_in_threadpool(lesson_archive.summaries, [lesson_id for lesson_id, _ in matches])
+    return {
+        "success": True,
+        "threshold": settings.SIMILAR_REQUESTS_THRESHOLD,
+        "matches": [
+            {"lesson_id": lesson_id, "similarity": similarity, **summaries[lesson_id]}
+            for lesson_id, similarity in matches
+            if lesson_id in summaries
+        ]
+    }
+
+
+@router.get("/library/analytics", dependencies=[Depends(require_archive)])
+async def get_library_analytics(limit: int = Query(20, ge=1, le=200)):
+    """Readability analytics over the latest archived slides, with the lessons most in need of rewrites
+
+    Only the ``LIBRARY_ANALYTICS_MAX_LESSONS`` most recently archived lessons are scanned, and the
+    result is reused until a lesson is archived or deleted.
+    """
+    max_lessons = settings.LIBRARY_ANALYTICS_MAX_LESSONS
+
+    def analyze_archive():
+        analytics = analyze_slide_contents(lesson_archive.slide_contents(max_lessons))
+        analytics["lessons"].sort(key=lambda lesson: len(lesson["rewrite_candidates"]), reverse=True)
+        analytics["truncated"] = lesson_archive.revision()[0] > analytics["summary"]["lessons"]
+        return analytics
+
+    analytics = await run_in_threadpool(lesson_archive.cached, "library_analytics", analyze_archive)
+    return {"success": True, **analytics, "lessons": analytics["lessons"][:limit]}
+
+
+@router.get("/library/lessons/{lesson_id}", dependencies=[Depends(require_archive)])
+async def get_archived_lesson(lesson_id: str):
+    """Full content of an archived lesson"""
+    try:
+        lesson_request, lesson_content, stage = await run_in_threadpool(lesson_archive.get, lesson_id)
+    except ArchivedLessonNotFound:
+        raise HTTPException(status_code=404, detail="Archived lesson not found")
+
+    return ORJSONResponse({
+        "success": True,
+        "lesson_id": lesson_id,
+        "stage": stage,
+        "request": model_json(lesson_request),
+        "lesson_content": model_json(lesson_content)
+    })
+
+
+@router.post("/library/lessons/{lesson_id}/start", dependencies=[Depends(require_archive), Depends(session_admitted)])
+async def start_from_archived_lesson(lesson_id: str, speculative: bool = False):
+    """Open a new session from an archived lesson, skipping baseline generation
+
+    The session resumes at the stage the lesson was archived in, so the
+    teacher can keep editing, apply the remaining principles or export.
+    """
+    try:
+        try:
+            session_id, session = await open_archived_session(lesson_id, speculative)
+        except ArchivedLessonNotFound:
+            raise HTTPException(status_code=404, detail="Archived lesson not found")
+
+        return archived_session_response(session_id, session, {"message": "Session started from archived lesson"})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting from archived lesson: {str(e)}")
+
+
+def session_snapshot(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "snapshot",
+        "version": session["version"],
+        "stage": session["current_stage"],
+        "structure_version": session["structure_version"],
+        "slide_versions": session["slide_versions"],
+        "lesson_content": model_json(session["lesson_content"])
     }
-    return stage_map.get(current_stage, [])
+
+
+@router.websocket("/ws/session/{session_id}")
+async def session_socket(websocket: WebSocket, session_id: str):
+    """Live session channel: stage progress, slide patches and collaborative edits
+
+    The client gets a snapshot on connect, then every change as it happens.
+    It may send ``{"type": "edit", "op_id", "slide_index", "base_version", ...fields}``
+    or ``{"type": "edit_batch", "op_id", "operations", "base_version"}``
+    (answered with ``ack`` or ``conflict``), ``{"type": "resync"}`` for a fresh
+    snapshot, or ``{"type": "ping"}``.
+    """
+    await websocket.accept()
+    if not await lesson_sessions.ensure_loaded(session_id):
+        await websocket.close(code=4404, reason="Lesson session not found")
+        return
+
+    queue = session_events.subscribe(session_id)
+
+    async def send(event: Dict[str, Any]):
+        await websocket.send_text(orjson.dumps(event).decode())
+
+    async def forward_events():
+        while True:
+            event = await queue.get()
+            await send(event)
+            if event["type"] == "session_closed":
+                await websocket.close(code=4410, reason=event["reason"])
+                return
+
+    async def handle_messages():
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+            except orjson.JSONDecodeError:
+                await send({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            if not await lesson_sessions.ensure_loaded(session_id):
+                return
+            session = lesson_sessions[session_id]
+            message_type = message.get("type") if isinstance(message, dict) else None
+
+            if message_type == "ping":
+                await send({"type": "pong"})
+            elif message_type == "resync":
+                await send(session_snapshot(session))
+            elif message_type == "edit":
+                op_id = message.get("op_id")
+                try:
+                    edit_request = SlideEditRequest.model_validate(message)
+                    slide, version = apply_slide_edit(session_id, session, edit_request, origin=op_id)
+                except ValidationError as e:
+                    await send({"type": "error", "op_id": op_id, "detail": e.errors(include_url=False)})
+                except HTTPException as e:
+                    await send({
+                        "type": "conflict" if e.status_code == 409 else "error",
+                        "op_id": op_id,
+                        "detail": e.detail
+                    })
+                else:
+                    await send({
+                        "type": "ack",
+                        "op_id": op_id,
+                        "version": version,
+                        "slide_index": edit_request.slide_index,
+                        "slide_version": session["slide_versions"][edit_request.slide_index]
+                    })
+            elif message_type == "edit_batch":
+                op_id = message.get("op_id")
+                try:
+                    bulk_request = BulkSlideEditRequest.model_validate(message)
+                    version, restructured, changed = apply_slide_operations(
+                        session_id, session, bulk_request, origin=op_id
+                    )
+                except ValidationError as e:
+                    await send({"type": "error", "op_id": op_id, "detail": e.errors(include_url=False)})
+                except HTTPException as e:
+                    await send({
+                        "type": "conflict" if e.status_code == 409 else "error",
+                        "op_id": op_id,
+                        "detail": e.detail
+                    })
+                else:
+                    await send({
+                        "type": "ack",
+                        "op_id": op_id,
+                        "version": version,
+                        "restructured": restructured,
+                        "changed_slides": changed
+                    })
+            else:
+                await send({"type": "error", "detail": f"Unknown message type: {message_type}"})
+
+    await send(session_snapshot(lesson_sessions[session_id]))
+    tasks = [asyncio.ensure_future(forward_events()), asyncio.ensure_future(handle_messages())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() is not None and not isinstance(task.exception(), WebSocketDisconnect):
+                print(f"Session socket error for {session_id}: {task.exception()}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        session_events.unsubscribe(session_id, queue)
+
+
+def require_admin(request: Request):
+    """Admin endpoints answer 404 unless profiling is enabled and the request carries the admin token"""
+    token = request.headers.get("X-Admin-Token", "")
+    if (not settings.PROFILING_ENABLED or not settings.PROFILING_ADMIN_TOKEN
+            or not hmac.compare_digest(token.encode("utf-8"), settings.PROFILING_ADMIN_TOKEN.encode("utf-8"))):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.post("/admin/profiling", dependencies=[Depends(require_admin)])
+async def arm_profiler(arm_request: ProfilingArmRequest):
+    """Profile a fraction of requests, or every request of one session, for a limited time"""
+    if arm_request.duration_seconds > settings.PROFILING_MAX_DURATION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Profiling can be armed for at most {settings.PROFILING_MAX_DURATION} seconds"
+        )
+    profiler.arm(arm_request.sample_rate, arm_request.session_id, arm_request.duration_seconds)
+    return {"success": True, "profiling": profiler.stats()}
+
+
+@router.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiler_status():
+    return {"success": True, "profiling": profiler.stats()}
+
+
+@router.delete("/admin/profiling", dependencies=[Depends(require_admin)])
+async def disarm_profiler():
+    profiler.disarm()
+    return {"success": True, "profiling": profiler.stats()}
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Kept profiles, newest first, with the profiled calls each request made"""
+    return {"success": True, "profiles": profiler.profiles()}
+
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """A profile's samples as folded stacks, for flamegraph.pl or speedscope"""
+    folded = profiler.folded(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        folded, headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
 
 
 def enhance_slide_with_ai(slide, user_prompt: str, lesson_request):
     """Enhance a slide using AI based on user prompt"""
     # This would integrate with your existing AI enhancement logic
     # For now, return the slide with a note about the enhancement
-    enhanced_slide = slide.copy()
+    enhanced_slide = slide.model_copy(deep=True)
     enhanced_slide.notes = f"{slide.notes}\n\nAI Enhancement: {user_prompt}"
     return enhanced_slide
 
@@ -325,5 +1377,19 @@ async def health_check():
         "status": "healthy",
         "message": "Enhanced UDL Lesson Generator API with Staged Pipeline",
         "version": "3.0 - Teacher-in-the-Loop Pipeline",
-        "active_sessions": len(lesson_sessions)
+        "active_sessions": len(lesson_sessions),
+        "sessions": lesson_sessions.stats(),
+        "model_calls": model_call_limiter.stats(),
+        "model_resilience": model_resilience.stats(),
+        "model_routes": model_router.stats(),
+        "generation_flights": generation_flights.stats(),
+        "prompts": prompt_registry.stats(),
+        "speculation": speculative_stages.stats(),
+        "export_prerender": export_prerenderer.stats(),
+        "idempotency_keys": idempotency_keys.stats(),
+        "session_events": session_events.stats(),
+        "lesson_archive": lesson_archive.stats() if settings.LESSON_ARCHIVE_ENABLED else None,
+        "similar_requests": similar_requests.stats(),
+        "slide_images": slide_images.stats(),
+        "deck_import": deck_importer.stats()
     }
\ No newline at end of file
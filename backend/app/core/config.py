@@ -16,6 +16,167 @@ class Settings:
     STATIC_DIR: str = "static"
     DOWNLOADS_DIR: str = os.path.join(STATIC_DIR, "downloads")
 
+    # Import the model SDK and python-pptx in the background once the server is up
+    WARM_UP_ON_STARTUP: bool = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+
+    # Per-client rate limits on LLM-backed endpoints (keyed by X-API-Key header or client address)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_REQUESTS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "10"))
+    RATE_LIMIT_REQUEST_BURST: float = float(os.getenv("RATE_LIMIT_REQUEST_BURST", "5"))
+    RATE_LIMIT_TOKENS_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_TOKENS_PER_MINUTE", "40000"))
+
+    # Estimated LLM tokens charged per call to each rate-limited endpoint (ai-enhance-slide
+    # does not call the model yet, so it only counts against the request budget)
+    RATE_LIMIT_TOKEN_COSTS = {
+        "generate-baseline": 6000,
+        "apply-udl-principle": 8000,
+        "run-full-udl": 24000
+    }
+
+    # Process-wide limits matching the model provider's quotas
+    MAX_CONCURRENT_MODEL_CALLS: int = int(os.getenv("MAX_CONCURRENT_MODEL_CALLS", "8"))
+    OPENAI_RPM_LIMIT: float = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+    OPENAI_TPM_LIMIT: float = float(os.getenv("OPENAI_TPM_LIMIT", "150000"))
+    MODEL_CALL_QUEUE_TIMEOUT: float = float(os.getenv("MODEL_CALL_QUEUE_TIMEOUT", "30"))
+
+    # Priority scheduling of model calls and export renders (weighted fair queueing between classes)
+    SCHEDULER_WEIGHTS = {
+        "interactive": float(os.getenv("SCHEDULER_WEIGHT_INTERACTIVE", "8")),
+        "normal": float(os.getenv("SCHEDULER_WEIGHT_NORMAL", "4")),
+        "background": float(os.getenv("SCHEDULER_WEIGHT_BACKGROUND", "1"))
+    }
+    # Largest share of slots background work may hold at once
+    SCHEDULER_BACKGROUND_SHARE: float = float(os.getenv("SCHEDULER_BACKGROUND_SHARE", "0.5"))
+
+    # Resilience around model calls: jittered retries, hedged requests and a circuit breaker
+    MODEL_RETRY_MAX_ATTEMPTS: int = int(os.getenv("MODEL_RETRY_MAX_ATTEMPTS", "3"))
+    MODEL_RETRY_BASE_DELAY: float = float(os.getenv("MODEL_RETRY_BASE_DELAY", "1.0"))
+    MODEL_RETRY_MAX_DELAY: float = float(os.getenv("MODEL_RETRY_MAX_DELAY", "20"))
+    MODEL_HEDGE_ENABLED: bool = os.getenv("MODEL_HEDGE_ENABLED", "false").lower() == "true"
+    MODEL_HEDGE_PERCENTILE: float = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+    MODEL_HEDGE_MIN_SAMPLES: int = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "30"))
+
+    # Model routing per stage: model, output token limit, request timeout (seconds) and sampling temperature.
+    # A route with "escalate_to" is retried on that model when the validator scores its lesson below
+    # "min_score" (out of 10) and below the lesson it was given. The UDL stages stay on the baseline model
+    # and do not escalate: their lessons are not built from the response yet, so a retry cannot change them
+    MODEL_ROUTES = {
+        "baseline": {
+            "model": os.getenv("MODEL_ROUTE_BASELINE", "gpt-4-turbo-preview"),
+            "max_tokens": 4000, "timeout": 120.0, "temperature": 0.7
+        },
+        "representation": {
+            "model": os.getenv("MODEL_ROUTE_REPRESENTATION", "gpt-4-turbo-preview"),
+            "max_tokens": 4000, "timeout": 120.0, "temperature": 0.7
+        },
+        "action_expression": {
+            "model": os.getenv("MODEL_ROUTE_ACTION_EXPRESSION", "gpt-4-turbo-preview"),
+            "max_tokens": 4000, "timeout": 120.0, "temperature": 0.7
+        },
+        "engagement": {
+            "model": os.getenv("MODEL_ROUTE_ENGAGEMENT", "gpt-4-turbo-preview"),
+            "max_tokens": 4000, "timeout": 120.0, "temperature": 0.7
+        }
+    }
+    MODEL_ESCALATION_ENABLED: bool = os.getenv("MODEL_ESCALATION_ENABLED", "true").lower() == "true"
+
+    # The representation stage sends only the slides the readability analytics flag for a rewrite
+    # (and makes no model call when none are flagged)
+    REPRESENTATION_SELECTIVE_REWRITE: bool = os.getenv("REPRESENTATION_SELECTIVE_REWRITE", "true").lower() == "true"
+
+    # USD per million (prompt, completion, cached prompt) tokens, for the per-route cost report
+    MODEL_PRICES = {
+        "gpt-4-turbo-preview": (10.0, 30.0, 10.0),
+        "gpt-3.5-turbo": (0.5, 1.5, 0.5),
+        "gpt-4o": (2.5, 10.0, 1.25),
+        "gpt-4o-mini": (0.15, 0.6, 0.075)
+    }
+
+    # Idempotency-Key support on generation endpoints: retries replay the first response
+    IDEMPOTENCY_KEY_TTL: float = float(os.getenv("IDEMPOTENCY_KEY_TTL", "3600"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "1000"))
+    IDEMPOTENT_PATHS = (
+        "/api/generate-baseline",
+        "/api/ai-enhance-slide/",
+        "/api/apply-udl-principle/",
+        "/api/run-full-udl/"
+    )
+
+    # Live session WebSocket: events buffered per client before it must resync
+    WS_EVENT_QUEUE_SIZE: int = int(os.getenv("WS_EVENT_QUEUE_SIZE", "100"))
+
+    # Session memory accounting (serialized size of each session); past SESSION_SPILL_THRESHOLD of the
+    # ceiling, sessions idle for SESSION_SPILL_IDLE_SECONDS move to disk, and at the ceiling new sessions
+    # are refused with 503. A limit of 0 disables admission control
+    SESSION_MEMORY_LIMIT_MB: float = float(os.getenv("SESSION_MEMORY_LIMIT_MB", "512"))
+    SESSION_SPILL_THRESHOLD: float = float(os.getenv("SESSION_SPILL_THRESHOLD", "0.8"))
+    SESSION_SPILL_IDLE_SECONDS: float = float(os.getenv("SESSION_SPILL_IDLE_SECONDS", "900"))
+    SESSION_SPILL_DIR: str = os.getenv("SESSION_SPILL_DIR", os.path.join("data", "session_spill"))
+    SESSION_ADMISSION_RETRY_AFTER: int = int(os.getenv("SESSION_ADMISSION_RETRY_AFTER", "30"))
+
+    # Speculative pre-generation of the next UDL stage (opt-in per session or globally)
+    SPECULATIVE_STAGES_ENABLED: bool = os.getenv("SPECULATIVE_STAGES_ENABLED", "false").lower() == "true"
+    SPECULATION_MAX_CONCURRENT: int = int(os.getenv("SPECULATION_MAX_CONCURRENT", "2"))
+
+    # Background PowerPoint pre-rendering after stages complete and once edits settle;
+    # EXPORT_RENDER_SLOTS bounds concurrent renders, interactive exports included
+    EXPORT_PRERENDER_ENABLED: bool = os.getenv("EXPORT_PRERENDER_ENABLED", "true").lower() == "true"
+    EXPORT_PRERENDER_DEBOUNCE: float = float(os.getenv("EXPORT_PRERENDER_DEBOUNCE", "3.0"))
+    EXPORT_RENDER_SLOTS: int = int(os.getenv("EXPORT_RENDER_SLOTS", "2"))
+
+    # Slide images drawn from each slide's image_prompt and embedded in exports; rendered in a
+    # worker pool and cached on disk by provider, style and prompt
+    IMAGES_ENABLED: bool = os.getenv("IMAGES_ENABLED", "true").lower() == "true"
+    IMAGE_PROVIDER: str = os.getenv("IMAGE_PROVIDER", "pillow")
+    IMAGE_STYLE: str = os.getenv("IMAGE_STYLE", "classroom")
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", os.path.join("data", "image_cache"))
+    IMAGE_RENDER_WORKERS: int = int(os.getenv("IMAGE_RENDER_WORKERS", "4"))
+    # The cache is pruned in the worker pool: entries unused for IMAGE_CACHE_MAX_AGE_DAYS go first (0 keeps
+    # them), then the least recently used until it is back under IMAGE_CACHE_MAX_MB
+    IMAGE_CACHE_MAX_MB: int = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+    IMAGE_CACHE_MAX_AGE_DAYS: float = float(os.getenv("IMAGE_CACHE_MAX_AGE_DAYS", "30"))
+
+    # Existing PowerPoint decks imported as baseline lessons (no model call); uploads are cut off once
+    # they pass DECK_IMPORT_MAX_BYTES, and the packages are checked before parsing in a worker pool
+    DECK_IMPORT_MAX_BYTES: int = int(os.getenv("DECK_IMPORT_MAX_BYTES", str(25 * 1024 * 1024)))
+    DECK_IMPORT_MAX_UNCOMPRESSED_BYTES: int = int(os.getenv("DECK_IMPORT_MAX_UNCOMPRESSED_BYTES",
+                                                            str(200 * 1024 * 1024)))
+    DECK_IMPORT_MAX_SOURCE_SLIDES: int = int(os.getenv("DECK_IMPORT_MAX_SOURCE_SLIDES", "200"))
+    DECK_IMPORT_WORKERS: int = int(os.getenv("DECK_IMPORT_WORKERS", "2"))
+
+    # Full-text archive of exported lessons (SQLite FTS5), searchable and reusable as a starting point
+    LESSON_ARCHIVE_ENABLED: bool = os.getenv("LESSON_ARCHIVE_ENABLED", "true").lower() == "true"
+    LESSON_ARCHIVE_PATH: str = os.getenv("LESSON_ARCHIVE_PATH", os.path.join("data", "lesson_archive.db"))
+    LIBRARY_SEARCH_MAX_PAGE_SIZE: int = int(os.getenv("LIBRARY_SEARCH_MAX_PAGE_SIZE", "50"))
+    # Library analytics read only the slide contents of the most recently archived lessons
+    LIBRARY_ANALYTICS_MAX_LESSONS: int = int(os.getenv("LIBRARY_ANALYTICS_MAX_LESSONS", "2000"))
+
+    # Near-duplicate request detection (MinHash/LSH over archived lessons' requests), checked before generating;
+    # the capacity bounds memory at roughly 340 bytes per indexed request
+    SIMILAR_REQUESTS_ENABLED: bool = os.getenv("SIMILAR_REQUESTS_ENABLED", "true").lower() == "true"
+    SIMILAR_REQUESTS_THRESHOLD: float = float(os.getenv("SIMILAR_REQUESTS_THRESHOLD", "0.75"))
+    SIMILAR_REQUESTS_CAPACITY: int = int(os.getenv("SIMILAR_REQUESTS_CAPACITY", "1000000"))
+
+    # Response compression (brotli is used when the optional Brotli package is installed)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Prompt registry: active template version (v2 shares one cacheable system prompt across stages)
+    # and optional directory of extra versions
+    PROMPT_VERSION: str = os.getenv("PROMPT_VERSION", "v2")
+    PROMPT_TEMPLATES_DIR: str = os.getenv("PROMPT_TEMPLATES_DIR", "")
+
+    # On-demand sampling profiler: armed through the admin endpoints (X-Admin-Token header), which
+    # are unavailable without a token; when disabled, profiled functions are left unwrapped
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_ADMIN_TOKEN: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "20"))
+    PROFILING_MAX_DURATION: float = float(os.getenv("PROFILING_MAX_DURATION", "3600"))
+
     # UDL principles metadata
     UDL_PRINCIPLES = {
         "representation": [
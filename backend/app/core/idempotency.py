@@ -0,0 +1,148 @@
+# backend/app/core/idempotency.py
+import asyncio
+import hashlib
+from typing import List, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.rate_limiter import client_key
+from app.services.session_store import IdempotencyKeyStore
+
+# (status, raw headers, body) of a response captured for replay
+CapturedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+REUSED_KEY_ERROR = b'{"detail":"Idempotency-Key was already used for a different request"}'
+
+
+def request_fingerprint(headers: Headers, body: bytes) -> str:
+    """Hash of a request body that is stable across retries
+
+    Multipart boundaries are random per request, so they are removed before
+    hashing; the form fields and file contents still count.
+    """
+    content_type = headers.get("content-type", "")
+    if "boundary=" in content_type:
+        boundary = content_type.split("boundary=", 1)[1].split(";", 1)[0].strip().strip('"')
+        body = body.replace(boundary.encode("latin-1"), b"")
+    return hashlib.sha256(body).hexdigest()
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Honours an ``Idempotency-Key`` header on the configured POST endpoints.
+
+    The first request with a key runs as a detached task, so it completes even
+    if the client gives up. A retry with the same key (from the same client,
+    to the same path) awaits that task and receives the same response, marked
+    with ``Idempotent-Replayed: true``, without running the endpoint or its
+    rate limits again. Only successful responses are kept; after an error the
+    key can be retried. Reusing a key with a different body is rejected.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyKeyStore, paths: Tuple[str, ...]):
+        self.app = app
+        self.store = store
+        self.paths = paths
+
+    def _applies(self, scope: Scope) -> bool:
+        return (scope["type"] == "http" and scope["method"] == "POST"
+                and any(scope["path"] == path or (path.endswith("/") and scope["path"].startswith(path))
+                        for path in self.paths))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        fingerprint = request_fingerprint(headers, body)
+        client = scope.get("client")
+        store_key = ":".join((
+            client_key(headers.get("x-api-key"), client[0] if client else None),
+            scope["path"],
+            idempotency_key
+        ))
+
+        record = self.store.get(store_key)
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                await self._send_error(send, 422, REUSED_KEY_ERROR)
+                return
+            self.store.replays += 1
+            response = await asyncio.shield(record.task)
+            await self._send(send, response, replayed=True)
+            return
+
+        task = asyncio.ensure_future(self._run(scope, body))
+        record = self.store.begin(store_key, fingerprint, task)
+        try:
+            response = await asyncio.shield(task)
+        except Exception:
+            self.store.forget(store_key, record)
+            raise
+        if not 200 <= response[0] < 300:
+            self.store.forget(store_key, record)
+        await self._send(send, response, replayed=False)
+
+    async def _run(self, scope: Scope, body: bytes) -> CapturedResponse:
+        """Run the endpoint detached from the client connection and capture its response"""
+        body_sent = False
+        finished = asyncio.Event()
+        status, raw_headers, chunks = 500, [], []
+
+        async def receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def capture(message: Message):
+            nonlocal status, raw_headers
+            if message["type"] == "http.response.start":
+                status, raw_headers = message["status"], list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished.set()
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            finished.set()
+        return status, raw_headers, b"".join(chunks)
+
+    @staticmethod
+    async def _send(send: Send, response: CapturedResponse, replayed: bool):
+        status, raw_headers, body = response
+        headers = MutableHeaders(raw=list(raw_headers))
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
+        await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _send_error(send: Send, status: int, body: bytes):
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))
+        ]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,259 @@
+# backend/app/core/profiling.py
+"""On-demand sampling profiler for production requests.
+
+An admin arms the profiler for a while, either for a fraction of requests or
+for one session. Requests selected by ``ProfilingMiddleware`` carry a
+``RequestProfile`` in a context variable (which follows them into the
+threadpool and into background tasks they start), and functions wrapped with
+``@profiled`` register their thread with one shared sampler thread while they
+run. The sampler reads every registered thread's stack at a fixed interval and
+counts it in folded ("a;b;c count") form, ready for flamegraph tools. The last
+``PROFILING_MAX_PROFILES`` profiles that reached a profiled function are kept
+for download.
+
+With ``PROFILING_ENABLED`` off, ``profiled`` returns the function unchanged
+and the middleware is not installed, so there is no cost at all.
+"""
+import contextvars
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+SESSION_ID_PATTERN = re.compile(r"/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?:/|$)")
+
+# Longest stack kept per sample, counted from the profiled function
+MAX_STACK_DEPTH = 128
+
+
+class RequestProfile:
+    """Folded stack samples and profiled call timings collected for one request"""
+
+    def __init__(self, label: str, session_id: Optional[str]):
+        self.profile_id = str(uuid.uuid4())
+        self.label = label
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.samples = Counter()
+        self.calls: List[Dict[str, Any]] = []
+        self.finished = False
+        self.kept = False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "samples": sum(self.samples.values()),
+            "calls": list(self.calls),
+        }
+
+    def folded(self) -> str:
+        """Samples as folded stacks, the input format of flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Shared sampler thread plus the arming state and the kept profiles"""
+
+    def __init__(self, interval: float, max_profiles: int):
+        self.interval = interval
+        self.sample_rate = 0.0
+        self.target_session: Optional[str] = None
+        self.armed_until = 0.0
+        self._profiles: "deque[RequestProfile]" = deque(maxlen=max_profiles)
+        # Thread id -> (profile, wrapper frame, label) of the outermost profiled call running on it
+        self._active: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self.samples_taken = 0
+
+    @property
+    def armed(self) -> bool:
+        return time.monotonic() < self.armed_until
+
+    def arm(self, sample_rate: float, session_id: Optional[str], duration: float):
+        self.sample_rate = sample_rate
+        self.target_session = session_id
+        self.armed_until = time.monotonic() + duration
+
+    def disarm(self):
+        self.armed_until = 0.0
+
+    def should_profile(self, session_id: Optional[str]) -> bool:
+        if not self.armed:
+            return False
+        if self.target_session is not None:
+            return session_id == self.target_session
+        return random.random() < self.sample_rate
+
+    def _register(self, profile: RequestProfile, frame, label: str) -> bool:
+        """Start sampling the calling thread; False if an outer profiled call already is"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            if thread_id in self._active:
+                return False
+            self._active[thread_id] = (profile, frame, label)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+                self._sampler.start()
+        return True
+
+    def _unregister(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, (profile, root, label) in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and frame is not root and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                if frame is not root:
+                    continue  # the call returned between reading the registrations and the frames
+                stack.append(label)
+                stacks.append((profile, ";".join(reversed(stack))))
+            del frames
+
+            with self._lock:
+                for profile, stack in stacks:
+                    profile.samples[stack] += 1
+                self.samples_taken += 1
+
+    def _keep(self, profile: RequestProfile):
+        if not profile.kept:
+            profile.kept = True
+            self._profiles.append(profile)
+
+    def record_call(self, profile: RequestProfile, label: str, seconds: float):
+        with self._lock:
+            profile.calls.append({"function": label, "duration_ms": round(seconds * 1000, 3)})
+            # Background work a request started (such as an export pre-render) can finish after it
+            if profile.finished:
+                self._keep(profile)
+
+    def finish(self, profile: RequestProfile):
+        """Keep ``profile`` for download once its request completes, if anything was profiled"""
+        with self._lock:
+            profile.finished = True
+            if profile.calls:
+                self._keep(profile)
+
+    def profiles(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+    def folded(self, profile_id: str) -> Optional[str]:
+        """Folded stacks of a kept profile, or None if it is unknown or was evicted"""
+        with self._lock:
+            for profile in self._profiles:
+                if profile.profile_id == profile_id:
+                    return profile.folded()
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        armed = self.armed
+        return {
+            "armed": armed,
+            "sample_rate": self.sample_rate if armed else 0.0,
+            "session_id": self.target_session if armed else None,
+            "seconds_remaining": round(self.armed_until - time.monotonic(), 1) if armed else 0,
+            "interval_ms": self.interval * 1000,
+            "profiles": len(self._profiles),
+            "samples_taken": self.samples_taken,
+        }
+
+
+profiler = SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000, settings.PROFILING_MAX_PROFILES)
+
+
+def profiled(label: str) -> Callable[[F], F]:
+    """Sample ``fn`` while it runs on behalf of a request selected for profiling"""
+
+    def decorate(fn: F) -> F:
+        if not settings.PROFILING_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return fn(*args, **kwargs)
+
+            registered = profiler._register(profile, sys._getframe(), label)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.record_call(profile, label, time.perf_counter() - start)
+                if registered:
+                    profiler._unregister()
+
+        return wrapper
+
+    return decorate
+
+
+class ProfilingMiddleware:
+    """Selects requests to profile while the profiler is armed
+
+    The session id is taken from the request path, so a single session's
+    stage, edit and export requests can be targeted.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.profiler.armed:
+            await self.app(scope, receive, send)
+            return
+
+        match = SESSION_ID_PATTERN.search(scope["path"])
+        session_id = match.group(1) if match else None
+        if not self.profiler.should_profile(session_id):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(f"{scope['method']} {scope['path']}", session_id)
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.finish(profile)
@@ -0,0 +1,158 @@
+# backend/app/core/static_files.py
+import gzip
+import os
+import re
+import shutil
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.compression import negotiate_encoding
+
+# Formats that are already compressed internally (PPTX/DOCX are zip archives) gain nothing from gzip
+PRECOMPRESSIBLE_EXTENSIONS = {".json", ".txt", ".csv", ".html", ".svg", ".xml", ".md"}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive (start, end) offsets
+
+    Returns None for headers this server ignores (multiple ranges, other
+    units); raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+    if not start_text:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, file_size - length), file_size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else file_size - 1
+    if start >= file_size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, file_size - 1)
+
+
+def ensure_precompressed(path: str, minimum_size: int) -> Optional[str]:
+    """Path of an up-to-date ``.gz`` sibling of ``path``, creating it on first use"""
+    if os.path.splitext(path)[1].lower() not in PRECOMPRESSIBLE_EXTENSIONS:
+        return None
+    stat_result = os.stat(path)
+    if stat_result.st_size < minimum_size:
+        return None
+
+    gz_path = path + ".gz"
+    try:
+        if os.stat(gz_path).st_mtime >= stat_result.st_mtime:
+            return gz_path
+    except FileNotFoundError:
+        pass
+
+    tmp_path = f"{gz_path}.{os.getpid()}.tmp"
+    with open(path, "rb") as source, gzip.open(tmp_path, "wb", compresslevel=9) as target:
+        shutil.copyfileobj(source, target)
+    os.replace(tmp_path, gz_path)
+    return gz_path
+
+
+class RangeFileResponse(Response):
+    """206 Partial Content response streaming one byte range of a file"""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, end: int, file_size: int, headers: Headers, method: str):
+        super().__init__(status_code=206, headers={
+            key: value for key, value in headers.items() if key.lower() != "content-length"
+        })
+        self.path = path
+        self.start = start
+        self.end = end
+        self.send_body = method != "HEAD"
+        self.headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        self.headers["Content-Length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as handle:
+            await handle.seek(self.start)
+            while remaining > 0:
+                chunk = await handle.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b""})
+
+
+class DownloadStaticFiles(StaticFiles):
+    """StaticFiles with conditional GET, byte-range resume and cached gzip siblings"""
+
+    def __init__(self, *args, precompress_min_size: int = 1024, cache_control: str = "no-cache", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompress_min_size = precompress_min_size
+        self.cache_control = cache_control
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        method = scope["method"]
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=method)
+        response.headers["Accept-Ranges"] = "bytes"
+        # Re-exports overwrite the same filename, so clients must revalidate with the ETag
+        response.headers["Cache-Control"] = self.cache_control
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if range_header and status_code == 200 and self._if_range_matches(request_headers, response.headers):
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except ValueError:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{stat_result.st_size}"})
+            if byte_range is not None:
+                return RangeFileResponse(full_path, byte_range[0], byte_range[1], stat_result.st_size,
+                                         response.headers, method)
+
+        if negotiate_encoding(request_headers.get("accept-encoding", ""), ("gzip",)):
+            gz_path = ensure_precompressed(full_path, self.precompress_min_size)
+            if gz_path:
+                compressed = FileResponse(gz_path, status_code=status_code, method=method,
+                                          media_type=response.media_type)
+                for header in ("etag", "last-modified", "accept-ranges", "cache-control"):
+                    compressed.headers[header] = response.headers[header]
+                # Ranges and validators refer to the identity encoding, so mark the ETag weak
+                compressed.headers["etag"] = "W/" + response.headers["etag"]
+                compressed.headers["Accept-Ranges"] = "none"
+                compressed.headers["Content-Encoding"] = "gzip"
+                compressed.headers["Vary"] = "Accept-Encoding"
+                return compressed
+
+        return response
+
+    @staticmethod
+    def _if_range_matches(request_headers: Headers, response_headers) -> bool:
+        """A Range is honoured only if the client's If-Range validator still matches"""
+        if_range = request_headers.get("if-range")
+        if not if_range:
+            return True
+        return if_range == response_headers.get("etag") or if_range == response_headers.get("last-modified")
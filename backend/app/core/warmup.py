@@ -0,0 +1,48 @@
+# backend/app/core/warmup.py
+import os
+import threading
+import time
+
+from app.core.config import settings
+
+
+def warm_up():
+    """Import the model SDK and PowerPoint stack ahead of the first request that needs them"""
+    started = time.perf_counter()
+
+    import openai  # noqa: F401
+    from app.services.pptx_generator import load_template
+
+    load_template()
+    print(f"Warmed model client and PowerPoint modules in {time.perf_counter() - started:.2f}s")
+
+
+def prepare_static_dirs():
+    os.makedirs(settings.DOWNLOADS_DIR, exist_ok=True)
+
+
+def load_similar_requests():
+    """Index the archived lessons' requests for near-duplicate detection"""
+    from app.services.lesson_archive import lesson_archive
+    from app.services.request_index import similar_requests
+
+    started = time.perf_counter()
+    try:
+        count = similar_requests.load(lesson_archive.requests())
+    except Exception as e:
+        print(f"Error indexing archived lesson requests: {e}")
+        return
+    print(f"Indexed {count} archived lesson requests in {time.perf_counter() - started:.2f}s")
+
+
+def start_background_index_load() -> threading.Thread:
+    thread = threading.Thread(target=load_similar_requests, name="similar-requests-load", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_background_warm_up() -> threading.Thread:
+    """Warm up off the event loop, so the server accepts requests while heavy modules load"""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,10 @@
 # backend/app/models/lesson.py
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Literal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, List, Dict, Literal, Union
 from enum import Enum
+import orjson
+
+from app.core.profiling import profiled
 
 
 class LessonStage(str, Enum):
@@ -40,12 +43,14 @@ class LessonRequest(BaseModel):
     complexity_level: Optional[int] = Field(default=5, ge=3, le=10, description="Academic rigor level (3-10)")
     uploaded_file_path: Optional[str] = None
 
-    @validator('grade_level')
+    @field_validator('grade_level')
+    @classmethod
     def validate_grade_level(cls, v):
         """Ensure grade level is always College"""
         return "College"
 
-    @validator('learning_objectives')
+    @field_validator('learning_objectives')
+    @classmethod
     def validate_learning_objectives(cls, v):
         """Ensure learning objectives contain multiple items"""
         objectives = [obj.strip() for obj in v.split('\n') if obj.strip()]
@@ -53,7 +58,8 @@ class LessonRequest(BaseModel):
             raise ValueError('At least one learning objective is required')
         return v
 
-    @validator('complexity_level')
+    @field_validator('complexity_level')
+    @classmethod
     def validate_complexity_level(cls, v):
         """Ensure complexity level is appropriate for college"""
         if v < 3:
@@ -67,8 +73,10 @@ class SlideEditRequest(BaseModel):
     content: Optional[str] = Field(None, max_length=2000)
     notes: Optional[str] = Field(None, max_length=1000)
     image_prompt: Optional[str] = Field(None, max_length=500)
+    base_version: Optional[int] = Field(None, ge=0, description="Slide version the edit was based on")
 
-    @validator('slide_index')
+    @field_validator('slide_index')
+    @classmethod
     def validate_slide_index(cls, v):
         if v < 0:
             raise ValueError('Slide index must be non-negative')
@@ -80,6 +88,10 @@ class UDLEnhancementRequest(BaseModel):
     custom_requirements: Optional[str] = Field(None, max_length=1000, description="Custom UDL requirements")
 
 
+class FullUDLRequest(BaseModel):
+    export: bool = Field(default=True, description="Also export the finished lesson as PowerPoint")
+
+
 class LessonSlide(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     content: str = Field(..., min_length=10, max_length=2000)
@@ -88,22 +100,33 @@ class LessonSlide(BaseModel):
     accessibility_features: Dict[str, str] = Field(default_factory=dict)
     udl_enhancements: Dict[str, List[str]] = Field(default_factory=dict)
 
-    def copy(self):
-        """Create a deep copy of the slide"""
-        return LessonSlide(
-            title=self.title,
-            content=self.content,
-            image_prompt=self.image_prompt,
-            notes=self.notes,
-            accessibility_features=self.accessibility_features.copy(),
-            udl_enhancements={k: v.copy() for k, v in self.udl_enhancements.items()}
-        )
+
+class SlideOperation(BaseModel):
+    """One step of a bulk slide edit; indexes refer to the deck as left by the previous steps"""
+    op: Literal["patch", "insert", "delete", "move"] = "patch"
+    slide_index: int = Field(..., ge=0, description="Slide to patch, delete or move, or position to insert at")
+    to_index: Optional[int] = Field(None, ge=0, description="Destination index of a move")
+    title: Optional[str] = Field(None, max_length=200)
+    content: Optional[str] = Field(None, max_length=2000)
+    notes: Optional[str] = Field(None, max_length=1000)
+    image_prompt: Optional[str] = Field(None, max_length=500)
+
+
+class BulkSlideEditRequest(BaseModel):
+    operations: List[SlideOperation] = Field(..., min_length=1, max_length=100)
+    base_version: Optional[int] = Field(None, ge=0, description="Session version the batch was based on")
+
+
+class ProfilingArmRequest(BaseModel):
+    sample_rate: float = Field(0.01, ge=0.0, le=1.0, description="Fraction of requests to profile")
+    session_id: Optional[str] = Field(None, description="Profile every request for this session instead")
+    duration_seconds: float = Field(300, gt=0, description="How long the profiler stays armed")
 
 
 class LessonContent(BaseModel):
     title: str = Field(..., min_length=1, max_length=300)
     overview: str = Field(..., min_length=10, max_length=1000)
-    learning_objectives: List[str] = Field(..., min_items=1)
+    learning_objectives: List[str] = Field(..., min_length=1)
     grade_level: str = Field(default="College")
     course_level: Optional[str] = Field(default="undergraduate_intro")
     duration: str = Field(..., min_length=1, max_length=100)
@@ -113,16 +136,18 @@ class LessonContent(BaseModel):
     assessment: str = Field(..., min_length=10, max_length=1000)
     conclusion: str = Field(..., min_length=10, max_length=1000)
     accessibility_features: Dict[str, str] = Field(default_factory=dict)
-    slides: List[LessonSlide] = Field(..., min_items=8, max_items=15)
+    slides: List[LessonSlide] = Field(..., min_length=8, max_length=15)
     udl_stage: LessonStage = Field(default=LessonStage.BASELINE)
     udl_applied_principles: List[UDLPrinciple] = Field(default_factory=list)
 
-    @validator('grade_level')
+    @field_validator('grade_level')
+    @classmethod
     def validate_grade_level(cls, v):
         """Ensure grade level is always College"""
         return "College"
 
-    @validator('slides')
+    @field_validator('slides')
+    @classmethod
     def validate_slides_count(cls, v):
         """Ensure appropriate number of slides for college-level content"""
         if len(v) < 8:
@@ -132,6 +157,22 @@ class LessonContent(BaseModel):
         return v
 
 
+def load_stored_lesson(lesson_json: Union[str, bytes, Dict]) -> LessonContent:
+    """Rebuild a lesson from its model_dump_json() (or JSON-mode model_dump()) output exactly as it was stored
+
+    Field limits are checked when a lesson is built, but in-place changes (an
+    AI enhancement appended to a slide's notes, say) can take a live lesson
+    past them, so stored copies are not validated again: reloading a lesson
+    must not fail on, or lose, what the teacher already had.
+    """
+    data = dict(lesson_json) if isinstance(lesson_json, dict) else orjson.loads(lesson_json)
+    data["slides"] = [LessonSlide.model_construct(**slide) for slide in data.get("slides", [])]
+    if "udl_stage" in data:
+        data["udl_stage"] = LessonStage(data["udl_stage"])
+    data["udl_applied_principles"] = [UDLPrinciple(principle) for principle in data.get("udl_applied_principles", [])]
+    return LessonContent.model_construct(**data)
+
+
 class LessonSession(BaseModel):
     session_id: str
     request: LessonRequest
@@ -140,9 +181,7 @@ class LessonSession(BaseModel):
     edit_history: List[Dict] = Field(default_factory=list)
     lesson_dir: str
 
-    class Config:
-        """Pydantic configuration"""
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class CollegeLessonMetrics(BaseModel):
@@ -381,6 +420,7 @@ class CollegeLessonValidator:
     """Validator class for college-specific lesson requirements"""
 
     @staticmethod
+    @profiled("validate_academic_rigor")
     def validate_academic_rigor(lesson_content: LessonContent, course_level: CourseLevelType) -> Dict[str, any]:
         """Validate that lesson content meets academic rigor standards"""
         validation_results = {
@@ -428,6 +468,7 @@ class CollegeLessonValidator:
         return validation_results
 
     @staticmethod
+    @profiled("suggest_enhancements")
     def suggest_enhancements(lesson_content: LessonContent, course_level: CourseLevelType) -> List[str]:
         """Suggest enhancements to improve college-level appropriateness"""
         suggestions = []
@@ -0,0 +1,280 @@
+# backend/app/models/lesson_analytics.py
+"""Readability and density analytics for lesson slides
+
+Every slide of a batch (one lesson, or every lesson of the archive) is
+scanned in one vectorized pass: the joined text becomes an array of code
+point classes, words, vowel groups and sentence ends are found from its
+edges, and searchsorted/cumsum/bincount attribute them to words, sentences
+and slides without a Python loop per slide or word. Only slide content is
+measured, since that is what students read.
+
+Readability is the Flesch-Kincaid grade. Jargon density is the share of
+words with three or more syllables (Gunning's "complex words") plus
+acronyms, a proxy in the absence of a discipline vocabulary.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from annotated_types import MaxLen
+
+from app.models.lesson import CourseLevelType, LessonContent, LessonSlide
+
+# Code point classes; code points past the table are classed as letters
+LETTER, DIGIT, JOINER, VOWEL, UPPER, SPACE, TERMINAL, SILENT_E = (1 << bit for bit in range(8))
+CHAR_TABLE_SIZE = 0x3000
+_char_classes = None
+
+CONTENT_CHAR_LIMIT = next(item.max_length for item in LessonSlide.model_fields["content"].metadata
+                          if isinstance(item, MaxLen))
+
+# Reading grade a slide may reach before it needs a more accessible representation
+TARGET_GRADES = {
+    CourseLevelType.UNDERGRADUATE_INTRO: 13.0,
+    CourseLevelType.UNDERGRADUATE_INTERMEDIATE: 14.0,
+    CourseLevelType.UNDERGRADUATE_ADVANCED: 15.0,
+    CourseLevelType.GRADUATE_MASTERS: 16.0,
+    CourseLevelType.GRADUATE_DOCTORAL: 17.0,
+    CourseLevelType.PROFESSIONAL: 14.0,
+}
+GRADE_TOLERANCE = 2.0
+MAX_SENTENCE_WORDS = 35
+MAX_MEAN_SENTENCE_WORDS = 25
+MAX_JARGON_DENSITY = 0.4
+MAX_CHAR_LIMIT_RATIO = 0.85
+MIN_SLIDE_WORDS = 25
+
+SENTENCE_LENGTH_BINS = (1, 11, 21, 31)
+
+
+def char_classes():
+    """Lookup table from code point to its class bits, built on first use"""
+    global _char_classes
+    if _char_classes is None:
+        import numpy as np
+
+        table = np.zeros(CHAR_TABLE_SIZE, dtype=np.uint8)
+        for code in range(CHAR_TABLE_SIZE):
+            char = chr(code)
+            table[code] = ((LETTER if char.isalpha() else 0) | (DIGIT if char.isdigit() else 0)
+                           | (JOINER if char in "'’-" else 0) | (VOWEL if char in "aeiouyAEIOUY" else 0)
+                           | (UPPER if char.isupper() else 0) | (SPACE if char.isspace() else 0)
+                           | (TERMINAL if char in ".!?" else 0) | (SILENT_E if char in "eE" else 0))
+        table[-1] = LETTER
+        _char_classes = table
+    return _char_classes
+
+
+def text_metrics(texts: Sequence[str]) -> Dict[str, Any]:
+    """Per-text word, syllable, sentence and jargon counts for a batch of texts, in one pass
+
+    Returns numpy arrays indexed by text, plus ``sentence_lengths`` (words in
+    every non-empty sentence) and ``sentence_text_ids`` (the text each is in).
+    """
+    import numpy as np
+
+    count = len(texts)
+    text_starts = np.zeros(count, dtype=np.int64)
+    if count:
+        text_starts[1:] = np.cumsum([len(text) + 1 for text in texts[:-1]])
+    # Joined with newlines, so no sentence spans two texts; UTF-32 indexes match str indexes
+    corpus = "\n".join(texts)
+    codes = np.frombuffer(corpus.encode("utf-32-le"), dtype=np.uint32)
+    classes = char_classes()[np.minimum(codes, CHAR_TABLE_SIZE - 1)]
+
+    def running(mask):
+        """Prefix sums of ``mask``, so any span's count is totals[end] - totals[start]"""
+        return np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+
+    # Words: runs of letters, digits and inner apostrophes or hyphens holding a letter or digit
+    in_word = (classes & (LETTER | DIGIT | JOINER)) != 0
+    edges = np.diff(np.concatenate(([0], in_word.astype(np.int8), [0])))
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    alphanumeric = running((classes & (LETTER | DIGIT)) != 0)
+    keep = alphanumeric[run_ends] > alphanumeric[run_starts]
+    word_starts, word_ends = run_starts[keep], run_ends[keep]
+    word_text_ids = np.searchsorted(text_starts, word_starts, side="right") - 1
+
+    # Syllables: vowel groups per word, less a silent final "e" (but not "-le"), at least one
+    is_vowel = (classes & VOWEL) != 0
+    group_starts = running(is_vowel & ~np.concatenate(([False], is_vowel[:-1])))
+    syllables = group_starts[word_ends] - group_starts[word_starts]
+    previous = np.maximum(word_ends - 2, word_starts)
+    silent_e = (((classes[word_ends - 1] & SILENT_E) != 0) & ((classes[previous] & VOWEL) == 0)
+                & ((codes[previous] | 0x20) != ord("l")))
+    syllables = np.maximum(syllables - (silent_e & (syllables > 1)), 1)
+
+    letters, uppercase = running((classes & LETTER) != 0), running((classes & UPPER) != 0)
+    letter_count = letters[word_ends] - letters[word_starts]
+    acronyms = (letter_count > 1) & (uppercase[word_ends] - uppercase[word_starts] == letter_count)
+    jargon = (syllables >= 3) | acronyms
+
+    # Sentences end at a newline (slides rarely punctuate bullets) or at . ! ? before a space or the end;
+    # every word belongs to the sentence after the last end before it
+    followed_by_space = np.concatenate(((classes[1:] & SPACE) != 0, [True]))
+    ends = (((classes & TERMINAL) != 0) & followed_by_space) | (codes == ord("\n"))
+    boundaries = np.flatnonzero(ends) + 1
+    word_sentence_ids = np.searchsorted(boundaries, word_starts, side="right")
+    _, first_words, sentence_lengths = np.unique(word_sentence_ids, return_index=True, return_counts=True)
+    sentence_text_ids = word_text_ids[first_words]
+
+    max_sentence = np.zeros(count, dtype=np.int64)
+    np.maximum.at(max_sentence, sentence_text_ids, sentence_lengths)
+
+    return {
+        "words": np.bincount(word_text_ids, minlength=count),
+        "syllables": np.bincount(word_text_ids, weights=syllables, minlength=count),
+        "jargon": np.bincount(word_text_ids, weights=jargon, minlength=count),
+        "sentences": np.bincount(sentence_text_ids, minlength=count),
+        "max_sentence": max_sentence,
+        "chars": np.fromiter((len(text) for text in texts), dtype=np.int64, count=count),
+        "sentence_lengths": sentence_lengths,
+        "sentence_text_ids": sentence_text_ids,
+    }
+
+
+def sentence_length_distribution(lengths) -> Dict[str, Any]:
+    import numpy as np
+
+    if not len(lengths):
+        return {"mean": 0.0, "p50": 0.0, "p90": 0.0, "max": 0, "histogram": {}}
+    edges = list(SENTENCE_LENGTH_BINS) + [max(int(lengths.max()), SENTENCE_LENGTH_BINS[-1]) + 1]
+    counts, _ = np.histogram(lengths, bins=edges)
+    labels = [f"{low}-{high - 1}" for low, high in zip(SENTENCE_LENGTH_BINS, SENTENCE_LENGTH_BINS[1:])]
+    labels.append(f"{SENTENCE_LENGTH_BINS[-1]}+")
+    p50, p90 = np.percentile(lengths, [50, 90])
+    return {
+        "mean": round(float(lengths.mean()), 2),
+        "p50": float(p50),
+        "p90": float(p90),
+        "max": int(lengths.max()),
+        "histogram": dict(zip(labels, (int(value) for value in counts))),
+    }
+
+
+def target_grade(course_level: Optional[str]) -> float:
+    try:
+        return TARGET_GRADES[CourseLevelType(course_level or CourseLevelType.UNDERGRADUATE_INTRO)]
+    except ValueError:
+        return TARGET_GRADES[CourseLevelType.UNDERGRADUATE_INTRO]
+
+
+def slide_metrics(lessons: Sequence[Tuple[LessonContent, Optional[str]]]) -> Dict[str, Any]:
+    """Per-slide readability, density and rewrite flags for every slide of ``lessons``, as numpy arrays"""
+    return content_metrics([([slide.content for slide in lesson_content.slides], level)
+                            for lesson_content, level in lessons])
+
+
+def content_metrics(lessons: Sequence[Tuple[Sequence[str], Optional[str]]]) -> Dict[str, Any]:
+    """``slide_metrics`` from each lesson's slide contents and course level alone"""
+    import numpy as np
+
+    texts = [content for contents, _ in lessons for content in contents]
+    metrics = text_metrics(texts)
+    words = metrics["words"].astype(float)
+    sentences = np.maximum(metrics["sentences"], 1)
+    counted = np.maximum(words, 1)
+
+    grade = np.where(words > 0, 0.39 * words / sentences + 11.8 * metrics["syllables"] / counted - 15.59, 0.0)
+    grade = np.maximum(grade, 0.0)
+    targets = np.repeat([target_grade(level) for _, level in lessons], [len(contents) for contents, _ in lessons])
+
+    metrics.update({
+        "grade": grade,
+        "target_grade": targets,
+        "mean_sentence": words / sentences,
+        "jargon_density": metrics["jargon"] / counted,
+        "char_limit_ratio": metrics["chars"] / CONTENT_CHAR_LIMIT,
+    })
+    # Reasons a slide needs a more accessible representation, each a boolean array over the slides
+    metrics["reasons"] = {
+        "reading_level": grade > targets + GRADE_TOLERANCE,
+        "long_sentences": (metrics["max_sentence"] > MAX_SENTENCE_WORDS)
+                          | (metrics["mean_sentence"] > MAX_MEAN_SENTENCE_WORDS),
+        "jargon": metrics["jargon_density"] > MAX_JARGON_DENSITY,
+        "dense": metrics["char_limit_ratio"] > MAX_CHAR_LIMIT_RATIO,
+        "thin": words < MIN_SLIDE_WORDS,
+    }
+    metrics["needs_rewrite"] = np.logical_or.reduce(list(metrics["reasons"].values())) if texts else np.zeros(0, bool)
+    return metrics
+
+
+def summarize(metrics: Dict[str, Any], start: int, stop: int) -> Dict[str, Any]:
+    """Summary of the slides ``start:stop`` of a ``slide_metrics`` batch"""
+    import numpy as np
+
+    words = metrics["words"][start:stop]
+    # Sentences are in slide order, so the slides' sentences are one contiguous run
+    first, last = np.searchsorted(metrics["sentence_text_ids"], [start, stop])
+    total_words = int(words.sum())
+    return {
+        "slides": stop - start,
+        "words": total_words,
+        "mean_grade": round(float(metrics["grade"][start:stop].mean()), 2) if stop > start else 0.0,
+        "max_grade": round(float(metrics["grade"][start:stop].max()), 2) if stop > start else 0.0,
+        "jargon_density": round(float(metrics["jargon"][start:stop].sum()) / max(total_words, 1), 3),
+        "sentence_lengths": sentence_length_distribution(metrics["sentence_lengths"][first:last]),
+        "rewrite_candidates": [int(index) for index in np.flatnonzero(metrics["needs_rewrite"][start:stop])],
+    }
+
+
+def slide_report(metrics: Dict[str, Any], position: int, slide_index: int) -> Dict[str, Any]:
+    return {
+        "slide_index": slide_index,
+        "words": int(metrics["words"][position]),
+        "sentences": int(metrics["sentences"][position]),
+        "grade": round(float(metrics["grade"][position]), 2),
+        "mean_sentence_length": round(float(metrics["mean_sentence"][position]), 2),
+        "max_sentence_length": int(metrics["max_sentence"][position]),
+        "jargon_density": round(float(metrics["jargon_density"][position]), 3),
+        "chars": int(metrics["chars"][position]),
+        "char_limit": CONTENT_CHAR_LIMIT,
+        "char_limit_ratio": round(float(metrics["char_limit_ratio"][position]), 3),
+        "needs_rewrite": bool(metrics["needs_rewrite"][position]),
+        "reasons": [reason for reason, flags in metrics["reasons"].items() if flags[position]],
+    }
+
+
+def analyze_lesson(lesson_content: LessonContent, course_level: Optional[str] = None) -> Dict[str, Any]:
+    """Readability, sentence length, jargon and size of each slide, with the lesson summary"""
+    level = course_level or lesson_content.course_level
+    metrics = slide_metrics([(lesson_content, level)])
+    count = len(lesson_content.slides)
+    summary = summarize(metrics, 0, count)
+    summary["target_grade"] = target_grade(level)
+    return {
+        "summary": summary,
+        "slides": [slide_report(metrics, index, index) for index in range(count)],
+    }
+
+
+def analyze_lessons(lessons: Sequence[Tuple[str, LessonContent, Optional[str]]]) -> Dict[str, Any]:
+    """Summary over every slide of ``lessons`` (id, lesson, course level), plus a summary per lesson"""
+    return analyze_slide_contents([
+        (lesson_id, lesson_content.title, level, [slide.content for slide in lesson_content.slides])
+        for lesson_id, lesson_content, level in lessons
+    ])
+
+
+def analyze_slide_contents(lessons: Sequence[Tuple[str, str, Optional[str], Sequence[str]]]) -> Dict[str, Any]:
+    """``analyze_lessons`` from (id, title, course level, slide contents), without loading whole lessons"""
+    metrics = content_metrics([(contents, level) for _, _, level, contents in lessons])
+    per_lesson = []
+    start = 0
+    for lesson_id, title, level, contents in lessons:
+        stop = start + len(contents)
+        per_lesson.append({"lesson_id": lesson_id, "title": title,
+                           "target_grade": target_grade(level), **summarize(metrics, start, stop)})
+        start = stop
+
+    summary = summarize(metrics, 0, start)
+    summary["lessons"] = len(lessons)
+    summary["rewrite_candidates"] = len(summary["rewrite_candidates"])
+    summary["reasons"] = {reason: int(flags.sum()) for reason, flags in metrics["reasons"].items()}
+    return {"summary": summary, "lessons": per_lesson}
+
+
+def slides_needing_rewrite(lesson_content: LessonContent, course_level: Optional[str] = None) -> List[int]:
+    """Indexes of the slides whose reading level, sentence length, jargon or size call for a rewrite"""
+    import numpy as np
+
+    metrics = slide_metrics([(lesson_content, course_level or lesson_content.course_level)])
+    return [int(index) for index in np.flatnonzero(metrics["needs_rewrite"])]
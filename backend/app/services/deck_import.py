@@ -0,0 +1,216 @@
+# backend/app/services/deck_import.py
+import re
+import threading
+import zipfile
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.lesson import LessonSlide
+
+# python-pptx is imported by the first import, not when the API starts
+
+# LessonContent's slide count limits
+MIN_LESSON_SLIDES = 8
+MAX_LESSON_SLIDES = 15
+
+SLIDE_PART_PATTERN = re.compile(r"^ppt/slides/slide\d+\.xml$")
+
+
+class DeckImportError(Exception):
+    """Raised when an uploaded deck cannot be turned into a lesson"""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ImportedDeck:
+    def __init__(self, title: Optional[str], slides: List[LessonSlide], source_slides: int, skipped: int):
+        self.title = title
+        self.slides = slides
+        self.source_slides = source_slides
+        self.skipped = skipped
+
+
+def clip(text: str, limit: int) -> str:
+    """``text`` cut to ``limit`` characters at a word boundary, marked with an ellipsis"""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 1]
+    if " " in cut[limit // 2:]:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + "…"
+
+
+def shape_text(shape) -> List[str]:
+    """Text lines of a shape, nested bullets indented, table rows joined by " | " """
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+        return [line for member in shape.shapes for line in shape_text(member)]
+    if getattr(shape, "has_table", False) and shape.has_table:
+        rows = ([cell.text.strip() for cell in row.cells] for row in shape.table.rows)
+        return [" | ".join(cells) for cells in rows if any(cells)]
+    if not shape.has_text_frame:
+        return []
+    return ["  " * paragraph.level + paragraph.text.strip()
+            for paragraph in shape.text_frame.paragraphs if paragraph.text.strip()]
+
+
+def picture_descriptions(shapes) -> List[str]:
+    """Alt text of a slide's pictures, which exported lessons set from each slide's image_prompt"""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    descriptions = []
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            descriptions.extend(picture_descriptions(shape.shapes))
+        elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            description = (shape._element.nvPicPr.cNvPr.get("descr") or "").strip()
+            if description:
+                descriptions.append(description)
+    return descriptions
+
+
+def read_slide(slide) -> Dict[str, str]:
+    title_shape = slide.shapes.title
+    title = title_shape.text.strip() if title_shape is not None and title_shape.has_text_frame else ""
+    title_id = title_shape.shape_id if title_shape is not None else None
+    body = [line for shape in slide.shapes if shape.shape_id != title_id for line in shape_text(shape)]
+    notes = slide.notes_slide.notes_text_frame.text.strip() if slide.has_notes_slide else ""
+    descriptions = picture_descriptions(slide.shapes)
+    return {
+        "title": title,
+        "content": "\n".join(body),
+        "notes": notes,
+        "image_prompt": descriptions[0] if descriptions else ""
+    }
+
+
+def has_content(slide: Dict[str, str]) -> bool:
+    """Whether a slide has body text, or a title long enough to serve as its content"""
+    return len(slide["content"] or slide["title"]) >= 10
+
+
+def merge_slides(slides: List[Dict[str, str]], count: int) -> List[Dict[str, str]]:
+    """Fold consecutive slides into ``count`` slides; later slides' titles become headings in the body"""
+    size, extra = divmod(len(slides), count)
+    merged = []
+    start = 0
+    for group_index in range(count):
+        group = slides[start:start + size + (1 if group_index < extra else 0)]
+        start += len(group)
+        first = group[0]
+        body = [first["content"]] + [f"{slide['title']}\n{slide['content']}".strip() for slide in group[1:]]
+        merged.append({
+            "title": first["title"] or next((slide["title"] for slide in group if slide["title"]), ""),
+            "content": "\n\n".join(part for part in body if part),
+            "notes": "\n\n".join(slide["notes"] for slide in group if slide["notes"]),
+            "image_prompt": next((slide["image_prompt"] for slide in group if slide["image_prompt"]), "")
+        })
+    return merged
+
+
+def lesson_slide(slide: Dict[str, str], position: int) -> LessonSlide:
+    title = clip(slide["title"] or f"Slide {position + 1}", 200)
+    content = slide["content"] or slide["title"]
+    return LessonSlide(
+        title=title,
+        content=clip(content, 2000),
+        notes=clip(slide["notes"], 1000) or None,
+        image_prompt=clip(slide["image_prompt"], 500) or None
+    )
+
+
+class DeckImporter:
+    """Parses uploaded .pptx decks into lesson slides in a small worker pool
+
+    The package is checked before python-pptx opens it: it must be a
+    PowerPoint zip whose decompressed size and slide count are within limits.
+    Slides without enough text to stand on their own are skipped, and decks
+    longer than a lesson allows are folded into ``MAX_LESSON_SLIDES`` slides.
+    """
+
+    def __init__(self, workers: int, max_uncompressed_bytes: int, max_source_slides: int):
+        self.workers = workers
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.max_source_slides = max_source_slides
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.outcomes = Counter()
+
+    def check_package(self, path: str):
+        try:
+            with zipfile.ZipFile(path) as package:
+                infos = package.infolist()
+        except zipfile.BadZipFile:
+            raise DeckImportError("The file is not a PowerPoint (.pptx) deck", status_code=400)
+
+        if not any(info.filename == "ppt/presentation.xml" for info in infos):
+            raise DeckImportError("The file is not a PowerPoint (.pptx) deck", status_code=400)
+        if sum(info.file_size for info in infos) > self.max_uncompressed_bytes:
+            raise DeckImportError("The deck is too large once decompressed", status_code=413)
+        if sum(1 for info in infos if SLIDE_PART_PATTERN.match(info.filename)) > self.max_source_slides:
+            raise DeckImportError(f"Decks can have at most {self.max_source_slides} slides", status_code=413)
+
+    def parse(self, path: str) -> ImportedDeck:
+        self.check_package(path)
+
+        from pptx import Presentation
+
+        presentation = Presentation(path)
+        source = [read_slide(slide) for slide in presentation.slides]
+        slides = [slide for slide in source if has_content(slide)]
+        skipped = len(source) - len(slides)
+        if len(slides) < MIN_LESSON_SLIDES:
+            raise DeckImportError(
+                f"The deck has {len(slides)} slides with content; lessons need at least {MIN_LESSON_SLIDES}"
+            )
+        if len(slides) > MAX_LESSON_SLIDES:
+            slides = merge_slides(slides, MAX_LESSON_SLIDES)
+
+        title = (presentation.core_properties.title or "").strip() or source[0]["title"] or None
+        return ImportedDeck(
+            title=title,
+            slides=[lesson_slide(slide, position) for position, slide in enumerate(slides)],
+            source_slides=len(source),
+            skipped=skipped
+        )
+
+    def _run(self, path: str) -> ImportedDeck:
+        outcome = "failed"
+        try:
+            deck = self.parse(path)
+            outcome = "imported"
+            return deck
+        except DeckImportError:
+            outcome = "rejected"
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.outcomes[outcome] += 1
+
+    def submit(self, path: str) -> Future:
+        """Future for the ``ImportedDeck`` parsed from ``path`` (raises DeckImportError if unusable)"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="deck-import")
+            self.in_flight += 1
+        return self._pool.submit(self._run, path)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "parsing": self.in_flight,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+deck_importer = DeckImporter(
+    settings.DECK_IMPORT_WORKERS,
+    settings.DECK_IMPORT_MAX_UNCOMPRESSED_BYTES,
+    settings.DECK_IMPORT_MAX_SOURCE_SLIDES
+)
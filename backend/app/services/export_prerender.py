@@ -0,0 +1,220 @@
+# backend/app/services/export_prerender.py
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.lesson import LessonContent
+from app.services.pptx_generator import RenderCancelled, create_presentation, export_path
+from app.services.scheduler import BACKGROUND, WorkPriority, build_scheduler, current_priority
+
+
+def render_to_file(lesson_content: LessonContent, path: str, checkpoint: Callable[[], None]) -> str:
+    """Render next to ``path`` into a temporary file and return its name
+
+    The caller moves it into place, so readers never see a partial deck.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if create_presentation(lesson_content, tmp_path, checkpoint) is None:
+            raise RuntimeError(f"Could not save presentation to {tmp_path}")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+class _Render:
+    def __init__(self, version: int, task: asyncio.Task, cancel_event: threading.Event, work: WorkPriority):
+        self.version = version
+        self.task = task
+        self.cancel_event = cancel_event
+        self.work = work
+
+
+class ExportPrerenderer:
+    """Keeps each session's PowerPoint export warm in the background.
+
+    All renders, interactive exports included, share a priority scheduler
+    with ``render_slots`` slots. Pre-renders run as background work and give
+    way to waiting exports between slides. Scheduling a newer version
+    immediately cancels the stale render, which stops at the next slide
+    boundary, and a render that finishes after a newer one is dropped.
+    Completed stages render right away; edits are debounced so a burst of
+    changes renders once.
+    """
+
+    def __init__(self, enabled: bool, debounce_seconds: float, render_slots: int):
+        self.enabled = enabled
+        self.debounce_seconds = debounce_seconds
+        self.scheduler = build_scheduler("export_renders", render_slots)
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._renders: Dict[str, _Render] = {}
+        self._artifacts: Dict[str, Tuple[int, str]] = {}
+        self.outcomes = Counter()
+        self.last_render_ms: Optional[float] = None
+
+    async def _render_file(self, lesson_content: LessonContent, path: str, work: WorkPriority,
+                           cancel_event: Optional[threading.Event] = None) -> str:
+        async with self.scheduler.acquire_async(work=work) as slot:
+            def checkpoint():
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RenderCancelled()
+                slot.checkpoint()
+
+            return await run_in_threadpool(render_to_file, lesson_content, path, checkpoint)
+
+    async def render(self, lesson_content: LessonContent, path: str) -> str:
+        """Render a deck to ``path`` at the caller's priority"""
+        tmp_path = await self._render_file(lesson_content, path, current_priority())
+        os.replace(tmp_path, path)
+        return path
+
+    def schedule(self, session_id: str, session: Dict, debounce: bool = False):
+        """Render the session's current version once ``debounce_seconds`` pass without another change"""
+        if not self.enabled:
+            return
+        self.cancel(session_id, keep_version=session["version"])
+        delay = self.debounce_seconds if debounce else 0.0
+        self._timers[session_id] = asyncio.ensure_future(self._render_after(session_id, session, delay))
+
+    async def _render_after(self, session_id: str, session: Dict, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        if self._timers.get(session_id) is asyncio.current_task():
+            del self._timers[session_id]
+        if self.warm_artifact(session_id, session) is None:
+            self._start_render(session_id, session, WorkPriority(BACKGROUND))
+
+    def _start_render(self, session_id: str, session: Dict, work: WorkPriority) -> asyncio.Task:
+        version = session["version"]
+        current = self._renders.get(session_id)
+        if current is not None:
+            if current.version == version:
+                current.work.promote(work.level)
+                return current.task
+            current.cancel_event.set()
+
+        # Snapshot on the event loop, so the render sees exactly this version
+        snapshot = session["lesson_content"].model_copy(deep=True)
+        path = export_path(session["lesson_dir"], snapshot)
+        cancel_event = threading.Event()
+        task = asyncio.ensure_future(self._render_session(session_id, version, snapshot, path, cancel_event, work))
+        self._renders[session_id] = _Render(version, task, cancel_event, work)
+        return task
+
+    async def _render_session(self, session_id: str, version: int, snapshot: LessonContent, path: str,
+                              cancel_event: threading.Event, work: WorkPriority) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            tmp_path = await self._render_file(snapshot, path, work, cancel_event)
+        except RenderCancelled:
+            self.outcomes["cancelled"] += 1
+            return None
+        except Exception as e:
+            if cancel_event.is_set():
+                # The session was deleted or replaced underneath the render
+                self.outcomes["cancelled"] += 1
+            else:
+                print(f"Error pre-rendering export for session {session_id}: {e}")
+                self.outcomes["failed"] += 1
+            return None
+        finally:
+            current = self._renders.get(session_id)
+            if current is not None and current.cancel_event is cancel_event:
+                del self._renders[session_id]
+
+        previous = self._artifacts.get(session_id)
+        if cancel_event.is_set() or (previous is not None and previous[0] > version):
+            # A newer deck was written while this one was saving
+            os.remove(tmp_path)
+            self.outcomes["cancelled"] += 1
+            return None
+
+        os.replace(tmp_path, path)
+        self.outcomes["rendered"] += 1
+        self.last_render_ms = round((time.perf_counter() - started) * 1000, 2)
+        self._record(session_id, version, path)
+        return path
+
+    def _record(self, session_id: str, version: int, path: str):
+        previous = self._artifacts.get(session_id)
+        if previous is not None and previous[0] > version:
+            return
+        if previous is not None and previous[1] != path and os.path.exists(previous[1]):
+            # A retitled lesson renders under a new filename; drop the outdated deck
+            os.remove(previous[1])
+        self._artifacts[session_id] = (version, path)
+
+    def record(self, session_id: str, session: Dict, path: str):
+        """Register a deck rendered elsewhere for the session's current version"""
+        self._record(session_id, session["version"], path)
+
+    def warm_artifact(self, session_id: str, session: Dict) -> Optional[str]:
+        artifact = self._artifacts.get(session_id)
+        if artifact is not None and artifact[0] == session["version"] and os.path.exists(artifact[1]):
+            return artifact[1]
+        return None
+
+    async def current_artifact(self, session_id: str, session: Dict) -> Tuple[str, str]:
+        """Path of a deck for the session's current version and how it was obtained
+
+        Serves a warm artifact, joins a render already running for this
+        version, or renders now (skipping any pending debounce).
+        """
+        path = self.warm_artifact(session_id, session)
+        if path is not None:
+            self.outcomes["served_warm"] += 1
+            return path, "warm"
+
+        current = self._renders.get(session_id)
+        source = "joined" if current is not None and current.version == session["version"] else "cold"
+        self.outcomes[f"served_{source}"] += 1
+
+        timer = self._timers.pop(session_id, None)
+        if timer is not None:
+            timer.cancel()
+        path = await asyncio.shield(self._start_render(session_id, session, current_priority()))
+        if path is None:
+            raise RuntimeError("Export render did not complete")
+        return path, source
+
+    def cancel(self, session_id: str, keep_version: Optional[int] = None):
+        """Cancel pending and running renders, except one already rendering ``keep_version``"""
+        timer = self._timers.pop(session_id, None)
+        if timer is not None:
+            timer.cancel()
+        current = self._renders.get(session_id)
+        if current is not None and current.version != keep_version:
+            current.cancel_event.set()
+
+    def discard(self, session_id: str):
+        """Forget the session entirely (on cleanup)"""
+        self.cancel(session_id)
+        self._artifacts.pop(session_id, None)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "debounce_seconds": self.debounce_seconds,
+            "pending": len(self._timers),
+            "rendering": len(self._renders),
+            "warm_artifacts": len(self._artifacts),
+            "last_render_ms": self.last_render_ms,
+            "outcomes": dict(self.outcomes),
+            "scheduler": self.scheduler.stats(),
+        }
+
+
+export_prerenderer = ExportPrerenderer(
+    settings.EXPORT_PRERENDER_ENABLED,
+    settings.EXPORT_PRERENDER_DEBOUNCE,
+    settings.EXPORT_RENDER_SLOTS
+)
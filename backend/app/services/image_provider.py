@@ -0,0 +1,428 @@
+# backend/app/services/image_provider.py
+import hashlib
+import io
+import os
+import re
+import textwrap
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Pillow is imported on first render, not when the API starts
+
+CHART_PATTERN = re.compile(r"\b(bar chart|pie chart|chart|graph|plot|histogram|comparison|comparing|trend)s?\b")
+DIAGRAM_PATTERN = re.compile(
+    r"\b(diagram|flowchart|flow chart|process|cycle|timeline|step|stage|sequence|pipeline|workflow|map)s?\b"
+)
+
+# (background, header, accent, text) per style
+STYLE_PALETTES = {
+    "classroom": ((247, 249, 252), (44, 62, 80), (52, 152, 219), (52, 73, 94)),
+    "high_contrast": ((255, 255, 255), (0, 0, 0), (0, 90, 181), (0, 0, 0)),
+    "warm": ((253, 248, 240), (120, 53, 15), (217, 119, 6), (68, 64, 60)),
+}
+
+
+class SlideImage:
+    """A rendered slide image on disk and the alt text describing it"""
+
+    def __init__(self, path: str, alt_text: str, width: int, height: int):
+        self.path = path
+        self.alt_text = alt_text
+        self.width = width
+        self.height = height
+
+
+class ImageProvider(ABC):
+    """Turns an ``image_prompt`` into PNG bytes plus alt text
+
+    ``name`` and ``version`` are part of the cache key, so bump ``version``
+    whenever a provider's output changes for the same prompt.
+    """
+
+    name = "base"
+    version = "1"
+
+    @abstractmethod
+    def render(self, prompt: str, style: str) -> Tuple[bytes, str, int, int]:
+        """Return (png bytes, alt text, width, height)"""
+
+
+def image_kind(prompt: str) -> str:
+    lowered = prompt.lower()
+    if CHART_PATTERN.search(lowered):
+        return "chart"
+    if DIAGRAM_PATTERN.search(lowered):
+        return "diagram"
+    return "illustration"
+
+
+def prompt_heading(prompt: str) -> str:
+    """Short card heading: the prompt up to its first clause break, at most seven words"""
+    clause = re.split(r"[:;,.(]| showing | with | that | of how ", prompt.strip(), maxsplit=1)[0]
+    words = clause.split()[:7] or ["Illustration"]
+    heading = " ".join(words)
+    return heading[0].upper() + heading[1:]
+
+
+def prompt_parts(prompt: str, limit: int = 5) -> List[str]:
+    """Steps or items named in the prompt, used as diagram boxes and chart bars"""
+    body = prompt.split(":", 1)[1] if ":" in prompt else prompt
+    parts = [part.strip(" .") for part in re.split(r",|;|->|→|\band then\b|\bthen\b|\band\b", body)]
+    parts = [part for part in parts if len(part) > 2]
+    return parts[:limit] if len(parts) >= 2 else []
+
+
+class PillowCardProvider(ImageProvider):
+    """Local renderer: titled diagram, chart and placeholder cards drawn with Pillow
+
+    Prompts naming steps or items become box-and-arrow diagrams or bar
+    charts of those items; anything else becomes a framed placeholder card
+    that spells the prompt out. No network calls, so exports stay offline.
+    """
+
+    name = "pillow-cards"
+    version = "1"
+    width = 1280
+    height = 720
+
+    def __init__(self):
+        self._fonts: Dict[Tuple[int, bool], object] = {}
+        self._font_lock = threading.Lock()
+
+    def _font(self, size: int, bold: bool = False):
+        from PIL import ImageFont
+
+        with self._font_lock:
+            key = (size, bold)
+            if key not in self._fonts:
+                try:
+                    self._fonts[key] = ImageFont.truetype("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf", size)
+                except OSError:
+                    self._fonts[key] = ImageFont.load_default(size=size)
+            return self._fonts[key]
+
+    def render(self, prompt: str, style: str) -> Tuple[bytes, str, int, int]:
+        from PIL import Image, ImageDraw
+
+        background, header, accent, text = STYLE_PALETTES.get(style, STYLE_PALETTES["classroom"])
+        image = Image.new("RGB", (self.width, self.height), background)
+        draw = ImageDraw.Draw(image)
+
+        heading = prompt_heading(prompt)
+        draw.rectangle((0, 0, self.width, 120), fill=header)
+        draw.text((60, 60), textwrap.shorten(heading, 48, placeholder="..."), font=self._font(48, True),
+                  fill=background, anchor="lm")
+
+        kind = image_kind(prompt)
+        parts = prompt_parts(prompt)
+        if kind == "diagram" and parts:
+            self._draw_diagram(draw, parts, accent, text)
+            alt_text = f"Diagram titled {heading}, showing {' then '.join(parts)}."
+        elif kind == "chart" and parts:
+            self._draw_chart(draw, parts, prompt, accent, text)
+            alt_text = f"Bar chart titled {heading}, comparing {', '.join(parts)}."
+        else:
+            self._draw_placeholder(draw, prompt, accent, text)
+            alt_text = f"Illustration placeholder titled {heading}: {prompt.strip()}"
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=False, compress_level=6)
+        return buffer.getvalue(), textwrap.shorten(alt_text, 480, placeholder="..."), self.width, self.height
+
+    def _draw_diagram(self, draw, parts: List[str], accent, text):
+        gap = 50
+        box_width = (self.width - 120 - gap * (len(parts) - 1)) // len(parts)
+        top, bottom = 260, 560
+        font = self._font(26)
+        for index, part in enumerate(parts):
+            left = 60 + index * (box_width + gap)
+            draw.rounded_rectangle((left, top, left + box_width, bottom), radius=18, outline=accent, width=6)
+            label = textwrap.fill(part, width=max(8, box_width // 16))
+            draw.multiline_text((left + box_width // 2, (top + bottom) // 2), label, font=font, fill=text,
+                                anchor="mm", align="center")
+            if index < len(parts) - 1:
+                arrow_y = (top + bottom) // 2
+                start, end = left + box_width + 6, left + box_width + gap - 6
+                draw.line((start, arrow_y, end, arrow_y), fill=accent, width=6)
+                draw.polygon(((end, arrow_y), (end - 14, arrow_y - 12), (end - 14, arrow_y + 12)), fill=accent)
+
+    def _draw_chart(self, draw, parts: List[str], prompt: str, accent, text):
+        # Illustrative bar heights, stable for the prompt so cached and fresh renders match
+        digest = hashlib.sha256(prompt.encode()).digest()
+        baseline, chart_top = 600, 200
+        bar_width = (self.width - 240) // (len(parts) * 2)
+        font = self._font(24)
+        draw.line((100, chart_top, 100, baseline), fill=text, width=4)
+        draw.line((100, baseline, self.width - 80, baseline), fill=text, width=4)
+        for index, part in enumerate(parts):
+            height = 80 + digest[index] % (baseline - chart_top - 80)
+            left = 160 + index * bar_width * 2
+            draw.rectangle((left, baseline - height, left + bar_width, baseline), fill=accent)
+            draw.text((left + bar_width // 2, baseline + 30), textwrap.shorten(part, 18, placeholder="..."),
+                      font=font, fill=text, anchor="mm")
+
+    def _draw_placeholder(self, draw, prompt: str, accent, text):
+        draw.rounded_rectangle((60, 170, self.width - 60, self.height - 50), radius=24, outline=accent, width=5)
+        # Picture glyph: frame, sun and mountains
+        draw.rectangle((100, 230, 420, 470), outline=accent, width=6)
+        draw.ellipse((330, 255, 385, 310), fill=accent)
+        draw.polygon(((110, 460), (210, 330), (290, 420), (340, 370), (410, 460)), fill=accent)
+        wrapped = "\n".join(textwrap.wrap(prompt.strip(), width=38)[:9])
+        draw.multiline_text((470, 220), wrapped, font=self._font(30), fill=text, spacing=10)
+
+
+IMAGE_PROVIDERS: Dict[str, Callable[[], ImageProvider]] = {
+    "pillow": PillowCardProvider,
+}
+
+
+def register_image_provider(name: str, factory: Callable[[], ImageProvider]):
+    """Make another provider (e.g. a hosted image model) selectable through IMAGE_PROVIDER"""
+    IMAGE_PROVIDERS[name] = factory
+
+
+class SlideImageRenderer:
+    """Renders slide images in a worker pool behind a content-addressed disk cache
+
+    Images are stored under ``cache_dir`` by a hash of provider, style and
+    prompt, with the alt text alongside, so repeat exports and slides sharing
+    a prompt reuse the same file. Concurrent requests for an image that is
+    already rendering wait for that render instead of starting another.
+
+    Cache hits touch the entry, and the cache is pruned in the pool when it
+    outgrows ``max_bytes`` and at least every ``PRUNE_INTERVAL`` seconds:
+    entries unused for ``max_age`` seconds are removed, then the least
+    recently used until it is below ``PRUNE_TARGET`` of ``max_bytes``.
+    Entries used in the last ``PRUNE_GRACE`` seconds, or since the prune
+    scanned them, are kept, so a deck being built does not lose an image it
+    was handed; should one vanish anyway, the slide goes without it (see
+    ``result``) and the cache read is a miss rather than an error.
+    """
+
+    PRUNE_INTERVAL = 3600.0
+    PRUNE_MIN_SPACING = 60.0
+    PRUNE_TARGET = 0.9
+    PRUNE_GRACE = 600.0
+
+    def __init__(self, provider_name: str, cache_dir: str, style: str, workers: int,
+                 max_bytes: int = 0, max_age: float = 0.0):
+        self.provider_name = provider_name
+        self.cache_dir = cache_dir
+        self.style = style
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._provider: Optional[ImageProvider] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.outcomes = Counter()
+        # Bytes on disk as of the last prune plus renders since; None until the first prune measures it
+        self.cache_bytes: Optional[int] = None
+        self._pruning = False
+        self._last_prune = 0.0
+
+    @property
+    def provider(self) -> ImageProvider:
+        with self._lock:
+            if self._provider is None:
+                self._provider = IMAGE_PROVIDERS[self.provider_name]()
+            return self._provider
+
+    def cache_key(self, prompt: str) -> str:
+        provider = self.provider
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{provider.name}\0{provider.version}\0{self.style}\0{normalized}".encode()).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.png", f"{base}.txt"
+
+    def _cached(self, key: str) -> Optional[SlideImage]:
+        """The cached image for ``key``, or None (also when a prune removes it while it is read)"""
+        image_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as handle:
+                width, height, alt_text = handle.read().split("\n", 2)
+            # The metadata's mtime is the entry's last use, which pruning evicts by
+            os.utime(meta_path)
+            if not os.path.exists(image_path):
+                return None
+            return SlideImage(image_path, alt_text, int(width), int(height))
+        except (OSError, ValueError):
+            return None
+
+    def _render(self, key: str, prompt: str) -> SlideImage:
+        try:
+            image_bytes, alt_text, width, height = self.provider.render(prompt, self.style)
+            image_path, meta_path = self._paths(key)
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            # Write both files atomically; the metadata last, since its presence marks a complete entry
+            for path, data in ((image_path, image_bytes), (meta_path, f"{width}\n{height}\n{alt_text}".encode())):
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, "wb") as handle:
+                    handle.write(data)
+                os.replace(tmp_path, path)
+            with self._lock:
+                self.outcomes["rendered"] += 1
+                if self.cache_bytes is not None:
+                    self.cache_bytes += len(image_bytes) + len(alt_text) + 16
+            return SlideImage(image_path, alt_text, width, height)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def submit(self, prompt: str) -> Future:
+        """Future for the slide image of ``prompt``, served from the cache when possible"""
+        key = self.cache_key(prompt)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.outcomes["joined"] += 1
+                return future
+
+        # Read outside the lock, so submissions do not queue behind disk I/O. Renders leave
+        # _in_flight only after their files are written, so one that just finished is on disk
+        cached = self._cached(key)
+        if cached is not None:
+            with self._lock:
+                self.outcomes["cache_hit"] += 1
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.outcomes["joined"] += 1
+                return future
+
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="slide-images")
+            future = self._pool.submit(self._render, key, prompt)
+            self._in_flight[key] = future
+            self._schedule_prune()
+            return future
+
+    def _schedule_prune(self):
+        """Queue a prune if the cache outgrew its size limit or the last prune is old (caller holds the lock)"""
+        if self._pruning or not (self.max_bytes or self.max_age):
+            return
+        since_prune = time.monotonic() - self._last_prune
+        oversized = self.max_bytes and self.cache_bytes is not None and self.cache_bytes > self.max_bytes
+        if self.cache_bytes is None or since_prune >= self.PRUNE_INTERVAL or (
+                oversized and since_prune >= self.PRUNE_MIN_SPACING):
+            self._pruning = True
+            self._pool.submit(self.prune)
+
+    def prune(self) -> int:
+        """Evict unused and least recently used cache entries; returns how many were removed"""
+        try:
+            now = time.time()
+            entries = []  # (last use, bytes, image path, meta path)
+            total = 0
+            for shard in os.scandir(self.cache_dir) if os.path.isdir(self.cache_dir) else ():
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    stat = entry.stat()
+                    total += stat.st_size
+                    if entry.name.endswith(".tmp"):
+                        # Left behind by a render that died before its rename
+                        if now - stat.st_mtime > self.PRUNE_GRACE:
+                            os.remove(entry.path)
+                            total -= stat.st_size
+                    elif entry.name.endswith(".txt"):
+                        image_path = entry.path[:-len(".txt")] + ".png"
+                        image_size = os.path.getsize(image_path) if os.path.exists(image_path) else 0
+                        entries.append((stat.st_mtime, stat.st_size + image_size, image_path, entry.path))
+
+            entries.sort()
+            target = self.max_bytes * self.PRUNE_TARGET
+            removed = 0
+            with self._lock:
+                in_flight = set(self._in_flight)
+            for last_use, size, image_path, meta_path in entries:
+                expired = self.max_age and now - last_use > self.max_age
+                if not expired and not (self.max_bytes and total > target):
+                    continue
+                key = os.path.basename(meta_path)[:-len(".txt")]
+                if now - last_use < self.PRUNE_GRACE or key in in_flight:
+                    continue
+                try:
+                    if os.stat(meta_path).st_mtime > last_use:
+                        continue  # used since the scan
+                except FileNotFoundError:
+                    pass
+                # The metadata first: without it the entry is already a cache miss
+                for path in (meta_path, image_path):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                removed += 1
+
+            with self._lock:
+                self.cache_bytes = total
+                self.outcomes["evicted"] += removed
+            return removed
+        except Exception as e:
+            print(f"Error pruning the slide image cache: {e}")
+            return 0
+        finally:
+            with self._lock:
+                self._pruning = False
+                self._last_prune = time.monotonic()
+
+    def submit_all(self, prompts: Iterable[Optional[str]]) -> List[Optional[Future]]:
+        """Start every image at once (None for empty prompts); collect each with ``result``"""
+        return [self.submit(prompt) if prompt and prompt.strip() else None for prompt in prompts]
+
+    def result(self, future: Optional[Future]) -> Optional[SlideImage]:
+        """The image a ``submit_all`` future produced, or None if there is none or it failed"""
+        if future is None:
+            return None
+        try:
+            slide_image = future.result()
+        except Exception as e:
+            print(f"Error rendering slide image: {e}")
+            with self._lock:
+                self.outcomes["failed"] += 1
+            return None
+        if not os.path.exists(slide_image.path):
+            with self._lock:
+                self.outcomes["vanished"] += 1
+            return None
+        return slide_image
+
+    def render_all(self, prompts: Iterable[Optional[str]]) -> List[Optional[SlideImage]]:
+        """Images for ``prompts`` in order (None for empty prompts or failed renders)"""
+        return [self.result(future) for future in self.submit_all(prompts)]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "provider": self.provider_name,
+            "style": self.style,
+            "rendering": len(self._in_flight),
+            "cache_bytes": self.cache_bytes,
+            "max_bytes": self.max_bytes,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+slide_images = SlideImageRenderer(
+    settings.IMAGE_PROVIDER,
+    settings.IMAGE_CACHE_DIR,
+    settings.IMAGE_STYLE,
+    settings.IMAGE_RENDER_WORKERS,
+    max_bytes=settings.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    max_age=settings.IMAGE_CACHE_MAX_AGE_DAYS * 86400
+)
@@ -0,0 +1,280 @@
+# backend/app/services/lesson_archive.py
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.models.lesson import LessonContent, LessonRequest, load_stored_lesson
+
+# bm25 column weights, in slides_fts column order: a match in a slide title or
+# the lesson topic says more about relevance than one in the speaker notes
+SEARCH_COLUMN_WEIGHTS = (10.0, 4.0, 1.0, 5.0, 6.0, 3.0, 2.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lessons (
+    lesson_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    course_level TEXT,
+    udl_stage TEXT NOT NULL,
+    slide_count INTEGER NOT NULL,
+    archived_at REAL NOT NULL,
+    request_json TEXT NOT NULL,
+    lesson_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slides (
+    id INTEGER PRIMARY KEY,
+    lesson_id TEXT NOT NULL REFERENCES lessons(lesson_id),
+    slide_index INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slides_by_lesson ON slides(lesson_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS slides_fts USING fts5(
+    title, content, notes, lesson_title, topic, chapter, udl_stage,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+SEARCH_SQL = """
+SELECT s.lesson_id, s.slide_index, l.title, l.topic, l.chapter, l.udl_stage,
+       slides_fts.title, snippet(slides_fts, 1, '[', ']', '...', 16), rank
+FROM slides_fts
+JOIN slides s ON s.id = slides_fts.rowid
+JOIN lessons l ON l.lesson_id = s.lesson_id
+WHERE slides_fts MATCH ?
+ORDER BY rank
+LIMIT ? OFFSET ?
+"""
+
+COUNT_SQL = "SELECT count(*) FROM slides_fts WHERE slides_fts MATCH ?"
+
+# Slide contents of the most recently archived lessons, read from the FTS columns instead of lesson_json
+SLIDE_CONTENTS_SQL = """
+SELECT l.lesson_id, l.title, l.course_level, slides_fts.content
+FROM (SELECT lesson_id, title, course_level, archived_at FROM lessons ORDER BY archived_at DESC LIMIT ?) l
+JOIN slides s ON s.lesson_id = l.lesson_id
+JOIN slides_fts ON slides_fts.rowid = s.id
+ORDER BY l.archived_at, l.lesson_id, s.slide_index
+"""
+
+
+class ArchivedLessonNotFound(KeyError):
+    """Raised when an archived lesson id is unknown"""
+
+
+def match_expression(query: str, stage: Optional[str] = None) -> Optional[str]:
+    """FTS5 query matching every word of ``query``; the last word also matches as a prefix
+
+    Words are quoted, so FTS5 operators and punctuation typed by users are
+    searched as text rather than parsed as query syntax. The stage filter is
+    a column filter, so it is applied inside the index.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    expression = " ".join(terms)
+    if stage:
+        expression += f' AND udl_stage : "{stage}"'
+    return expression
+
+
+class LessonArchive:
+    """SQLite FTS5 index of exported lessons, kept after their sessions are deleted
+
+    Each slide is one full-text row carrying its lesson's title, topic,
+    chapter and UDL stage, ranked with bm25. Archiving the same lesson again
+    replaces its rows. Connections are per thread (the archive is used from
+    the threadpool); WAL mode lets searches run while a lesson is written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self.searches = 0
+        self.archived = 0
+        self._cache_lock = threading.Lock()
+        self._cache: Dict[str, Tuple[Tuple, Any]] = {}
+        self.cache_hits = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._schema_lock:
+                if not self._schema_ready:
+                    with connection:
+                        connection.executescript(SCHEMA)
+                        weights = ", ".join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS)
+                        connection.execute("INSERT INTO slides_fts(slides_fts, rank) VALUES ('rank', ?)",
+                                           (f"bm25({weights})",))
+                    self._schema_ready = True
+        return connection
+
+    def archive(self, lesson_content: LessonContent, lesson_request: LessonRequest, stage: str,
+                lesson_id: Optional[str] = None) -> str:
+        """Index ``lesson_content``, replacing an earlier copy archived under ``lesson_id``"""
+        lesson_id = lesson_id or str(uuid.uuid4())
+        connection = self._connection()
+        with connection:
+            self._delete(connection, lesson_id)
+            connection.execute(
+                "INSERT INTO lessons VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (lesson_id, lesson_content.title, lesson_request.topic, lesson_request.chapter,
+                 lesson_content.course_level, stage, len(lesson_content.slides), time.time(),
+                 lesson_request.model_dump_json(exclude={"uploaded_file_path"}),
+                 lesson_content.model_dump_json())
+            )
+            for index, slide in enumerate(lesson_content.slides):
+                rowid = connection.execute(
+                    "INSERT INTO slides (lesson_id, slide_index) VALUES (?, ?)", (lesson_id, index)
+                ).lastrowid
+                connection.execute(
+                    "INSERT INTO slides_fts (rowid, title, content, notes, lesson_title, topic, chapter, udl_stage) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (rowid, slide.title, slide.content, slide.notes or "", lesson_content.title,
+                     lesson_request.topic, lesson_request.chapter, stage)
+                )
+        self.archived += 1
+        return lesson_id
+
+    def _delete(self, connection: sqlite3.Connection, lesson_id: str):
+        connection.execute(
+            "DELETE FROM slides_fts WHERE rowid IN (SELECT id FROM slides WHERE lesson_id = ?)", (lesson_id,)
+        )
+        connection.execute("DELETE FROM slides WHERE lesson_id = ?", (lesson_id,))
+        connection.execute("DELETE FROM lessons WHERE lesson_id = ?", (lesson_id,))
+
+    def search(self, query: str, page: int = 1, page_size: int = 20,
+               stage: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """Slides matching ``query``, best first, as (total matches, requested page)"""
+        expression = match_expression(query, stage)
+        if expression is None:
+            return 0, []
+
+        connection = self._connection()
+        total = connection.execute(COUNT_SQL, (expression,)).fetchone()[0]
+        rows = connection.execute(SEARCH_SQL, (expression, page_size, (page - 1) * page_size)).fetchall()
+        self.searches += 1
+
+        return total, [
+            {
+                "lesson_id": lesson_id,
+                "slide_index": slide_index,
+                "lesson_title": lesson_title,
+                "topic": topic,
+                "chapter": chapter,
+                "udl_stage": udl_stage,
+                "slide_title": slide_title,
+                "snippet": snippet,
+                "score": round(-rank, 4),
+            }
+            for lesson_id, slide_index, lesson_title, topic, chapter, udl_stage, slide_title, snippet, rank in rows
+        ]
+
+    def get(self, lesson_id: str) -> Tuple[LessonRequest, LessonContent, str]:
+        """The archived (request, lesson, stage) for ``lesson_id``, the lesson exactly as it was exported"""
+        row = self._connection().execute(
+            "SELECT request_json, lesson_json, udl_stage FROM lessons WHERE lesson_id = ?", (lesson_id,)
+        ).fetchone()
+        if row is None:
+            raise ArchivedLessonNotFound(lesson_id)
+        request_json, lesson_json, stage = row
+        return LessonRequest.model_validate_json(request_json), load_stored_lesson(lesson_json), stage
+
+    def summaries(self, lesson_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Title, topic, chapter, stage and slide count of the given archived lessons"""
+        if not lesson_ids:
+            return {}
+        rows = self._connection().execute(
+            "SELECT lesson_id, title, topic, chapter, udl_stage, slide_count FROM lessons "
+            f"WHERE lesson_id IN ({', '.join('?' * len(lesson_ids))})",
+            list(lesson_ids)
+        ).fetchall()
+        return {
+            lesson_id: {"title": title, "topic": topic, "chapter": chapter, "udl_stage": stage,
+                        "slide_count": slide_count}
+            for lesson_id, title, topic, chapter, stage, slide_count in rows
+        }
+
+    def requests(self) -> Iterator[Tuple[str, LessonRequest]]:
+        """Every archived (lesson_id, request), oldest first"""
+        self._connection()  # creates the schema on first use
+        # A dedicated connection, so a long scan does not hold this thread's cursor
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            for lesson_id, request_json in connection.execute(
+                    "SELECT lesson_id, request_json FROM lessons ORDER BY archived_at"):
+                try:
+                    lesson_request = LessonRequest.model_validate_json(request_json)
+                except ValueError as e:
+                    print(f"Skipping unreadable archived request {lesson_id}: {e}")
+                    continue
+                yield lesson_id, lesson_request
+        finally:
+            connection.close()
+
+    def slide_contents(self, max_lessons: int) -> List[Tuple[str, str, Optional[str], List[str]]]:
+        """(lesson_id, title, course level, slide contents) of the ``max_lessons`` latest lessons, oldest first"""
+        self._connection()  # creates the schema on first use
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            lessons: List[Tuple[str, str, Optional[str], List[str]]] = []
+            for lesson_id, title, course_level, content in connection.execute(SLIDE_CONTENTS_SQL, (max_lessons,)):
+                if not lessons or lessons[-1][0] != lesson_id:
+                    lessons.append((lesson_id, title, course_level, []))
+                lessons[-1][3].append(content)
+            return lessons
+        finally:
+            connection.close()
+
+    def revision(self) -> Tuple:
+        """Changes whenever a lesson is archived, re-archived or deleted, by any process"""
+        return self._connection().execute(
+            "SELECT count(*), max(archived_at), total(slide_count) FROM lessons").fetchone()
+
+    def cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """``compute()``, reused until the archive's revision changes"""
+        revision = self.revision()
+        with self._cache_lock:
+            entry = self._cache.get(name)
+            if entry is not None and entry[0] == revision:
+                self.cache_hits += 1
+                return entry[1]
+        value = compute()
+        with self._cache_lock:
+            self._cache[name] = (revision, value)
+        return value
+
+    def delete(self, lesson_id: str) -> bool:
+        connection = self._connection()
+        with connection:
+            if connection.execute("SELECT 1 FROM lessons WHERE lesson_id = ?", (lesson_id,)).fetchone() is None:
+                return False
+            self._delete(connection, lesson_id)
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        connection = self._connection()
+        return {
+            "lessons": connection.execute("SELECT count(*) FROM lessons").fetchone()[0],
+            "slides": connection.execute("SELECT count(*) FROM slides").fetchone()[0],
+            "archived": self.archived,
+            "searches": self.searches,
+            "cache_hits": self.cache_hits,
+        }
+
+
+lesson_archive = LessonArchive(settings.LESSON_ARCHIVE_PATH)
@@ -1,23 +1,176 @@
 # backend/app/services/lesson_generator.py
 import os
-from typing import List, Dict, Any
-from openai import OpenAI
-from app.models.lesson import LessonRequest, LessonContent, LessonSlide, LessonStage, UDLPrinciple
+import time
+from types import MappingProxyType
+from typing import List, Dict, Any, Callable, Mapping, Optional, Sequence
+from app.models.lesson import (
+    LessonRequest, LessonContent, LessonSlide, LessonStage, UDLPrinciple, CollegeLessonValidator, CourseLevelType
+)
 from app.core.config import settings
+from app.core.profiling import profiled
+from app.models.lesson_analytics import slides_needing_rewrite
+from app.services.rate_limiter import ModelCapacityError, model_call_limiter, estimate_tokens
+from app.services.resilience import model_resilience
+from app.services.model_routing import ModelRoute, model_router
+from app.services.prompts import prompt_registry, udl_system_prompt_name
 import json
 import re
 
 
+# Static college-level guidance, built once at import and shared read-only by every request
+COURSE_LEVEL_CONTEXTS = MappingProxyType({
+    "undergraduate_intro": "Introductory undergraduate level (100-200). Focus on foundational concepts, "
+                           "broad survey of the field, basic terminology, and connecting to students' prior knowledge.",
+    "undergraduate_intermediate": "Intermediate undergraduate level (300). Building on prerequisites, "
+                                  "connecting complex concepts, practical applications, and developing analytical skills.",
+    "undergraduate_advanced": "Advanced undergraduate level (400). Sophisticated analysis, advanced theories, "
+                              "independent research, and preparation for graduate study or professional practice.",
+    "graduate_masters": "Graduate master's level. Research-based content, critical analysis of current literature, "
+                        "professional application, thesis-level thinking, and advanced methodological approaches.",
+    "graduate_doctoral": "Graduate doctoral level. Cutting-edge research, original scholarship, theoretical innovation, "
+                         "comprehensive literature mastery, and contribution to disciplinary knowledge.",
+    "professional": "Professional development/continuing education. Practical skills enhancement, "
+                    "real-world application, career advancement, and immediate workplace relevance."
+})
+
+COLLEGE_UDL_FEATURES = MappingProxyType({
+    "engagement": MappingProxyType({
+        "motivation": "Career-relevant applications, authentic research problems, choice in learning pathways",
+        "persistence": "Professional goal alignment, peer collaboration, self-directed learning options",
+        "self_regulation": "Academic planning tools, reflection frameworks, metacognitive strategies"
+    }),
+    "representation": MappingProxyType({
+        "perception": "Multiple academic formats, visual-audio-text options, discipline-specific representations",
+        "language": "Academic vocabulary support, multilingual resources, discipline glossaries",
+        "comprehension": "Theoretical framework connections, prerequisite reviews, multiple scholarly perspectives"
+    }),
+    "action_expression": MappingProxyType({
+        "physical_action": "Technology choice flexibility, multiple platform options, accessibility tools",
+        "expression": "Diverse assessment formats, oral-written-visual options, collaborative-individual choices",
+        "executive_function": "Research planning templates, project organization tools, academic rubrics"
+    })
+})
+
+COLLEGE_UDL_ENHANCEMENTS = MappingProxyType({
+    "engagement": (
+        "Connected to professional career applications and real-world relevance",
+        "Included diverse cultural perspectives and global contexts",
+        "Added student choice in learning pathways and assignment formats",
+        "Incorporated collaborative opportunities leveraging student expertise",
+        "Provided authentic research problems and current case studies",
+        "Supported self-directed learning and autonomous goal-setting"
+    ),
+    "representation": (
+        "Added multiple academic content formats (text, visual, audio, multimedia)",
+        "Included discipline-specific vocabulary support and glossaries",
+        "Provided background knowledge scaffolds for diverse academic paths",
+        "Offered multiple theoretical perspectives and scholarly viewpoints",
+        "Added visual representations appropriate for college-level content",
+        "Included links to supplementary research and extended readings"
+    ),
+    "action_expression": (
+        "Provided multiple assessment formats (written, oral, visual, digital)",
+        "Included individual and collaborative response options",
+        "Added organizational tools for complex academic projects",
+        "Provided planning templates and research frameworks",
+        "Included self-assessment and peer review opportunities",
+        "Offered technology options for different skill levels and preferences"
+    )
+})
+
+
 # Initialize OpenAI client
 def get_openai_client():
     """Get OpenAI client with proper error handling"""
     try:
-        return OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Imported on first use: the SDK dominates the API's import time
+        from openai import OpenAI
+
+        # Retries are owned by the resilience layer, not the SDK
+        return OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
     except Exception as e:
         print(f"Error initializing OpenAI client: {e}")
         return None
 
 
+def create_chat_completion(client, messages: List[Dict[str, str]], model: str = "gpt-4-turbo-preview",
+                           temperature: float = 0.7, max_tokens: int = 4000, timeout: Optional[float] = None):
+    """Call the chat completions API through the provider limiter and resilience layer
+
+    Raises once retries are exhausted or the circuit is open, so callers fall
+    back to template content. ModelCapacityError (no provider slot within the
+    queue timeout) is not a provider failure: callers let it propagate so the
+    endpoint can answer 429 instead of serving fallback content.
+    """
+    estimated = estimate_tokens(sum(len(m["content"]) for m in messages), max_tokens)
+    request_options = {"timeout": timeout} if timeout else {}
+
+    def attempt():
+        with model_call_limiter.acquire(estimated):
+            return client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **request_options
+            )
+
+    response = model_resilience.call(attempt)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        model_call_limiter.record_usage(estimated, usage.total_tokens)
+
+    return response
+
+
+def complete_on_route(client, route: ModelRoute, messages: List[Dict[str, str]]) -> str:
+    """Text of a completion made with ``route``'s model and limits, recorded in the route metrics"""
+    start = time.monotonic()
+    response = create_chat_completion(
+        client,
+        messages=messages,
+        model=route.model,
+        temperature=route.temperature,
+        max_tokens=route.max_tokens,
+        timeout=route.timeout
+    )
+    model_router.record(route, time.monotonic() - start, getattr(response, "usage", None))
+    return response.choices[0].message.content
+
+
+def rigor_score(lesson_content: LessonContent, lesson_request: LessonRequest) -> float:
+    """Academic rigor score (0-10) the validator gives ``lesson_content``"""
+    course_level = CourseLevelType(lesson_request.course_level or CourseLevelType.UNDERGRADUATE_INTRO)
+    return CollegeLessonValidator.validate_academic_rigor(lesson_content, course_level)["score"]
+
+
+def escalate_if_below_standard(client, route: ModelRoute, messages: List[Dict[str, str]],
+                               lesson_content: LessonContent, lesson_request: LessonRequest,
+                               rebuild: Callable[[str], LessonContent],
+                               input_score: Optional[float] = None) -> LessonContent:
+    """Regenerate ``lesson_content`` on the route's larger model if the validator scores it too low
+
+    ``rebuild`` turns the larger model's response into a lesson; the better
+    scoring of the two lessons is returned.
+    """
+    if not model_router.can_escalate(route):
+        return lesson_content
+
+    score = rigor_score(lesson_content, lesson_request)
+    if not model_router.should_escalate(route, score, input_score):
+        return lesson_content
+
+    model_router.record_escalation(route)
+    print(f"{route.operation} output from {route.model} scored {score:.1f}; retrying on {route.escalate_to}")
+    try:
+        escalated = rebuild(complete_on_route(client, model_router.escalation(route), messages))
+    except Exception as e:
+        print(f"Error escalating {route.operation} to {route.escalate_to}: {e}")
+        return lesson_content
+    return escalated if rigor_score(escalated, lesson_request) >= score else lesson_content
+
+
 def generate_baseline_lesson(lesson_request: LessonRequest) -> LessonContent:
     """Generate baseline lesson content for college-level instruction"""
 
@@ -26,90 +179,42 @@ def generate_baseline_lesson(lesson_request: LessonRequest) -> LessonContent:
     if not client:
         return create_baseline_fallback_lesson(lesson_request)
 
-    # Enhanced college-focused system prompt
-    system_prompt = f"""
-    You are an expert higher education curriculum designer with extensive experience in college-level pedagogy. 
-    Create a comprehensive, research-based lesson plan for college students studying {lesson_request.topic}.
-
-    This is the BASELINE STAGE of a multi-stage UDL enhancement process.
-
-    COLLEGE-LEVEL REQUIREMENTS:
-    - Use sophisticated academic language appropriate for higher education
-    - Include research citations and current scholarly perspectives
-    - Incorporate critical thinking and analytical frameworks
-    - Reference real-world applications and case studies
-    - Use discipline-specific terminology with clear explanations
-    - Design for adult learners with diverse academic backgrounds
-
-    CONTENT DEPTH:
-    - Each slide should contain 300-500 words of substantive content
-    - Include multiple examples, counterexamples, and applications
-    - Connect concepts to broader theoretical frameworks
-    - Encourage analysis, synthesis, and evaluation (Bloom's higher levels)
-
-    ACADEMIC RIGOR:
-    - Present multiple perspectives on complex topics
-    - Include current research and emerging trends
-    - Reference primary sources and foundational texts
-    - Encourage scholarly discourse and debate
-
-    DO NOT include UDL-specific accessibility features yet - we'll add those in subsequent stages.
-    Focus on creating exceptional college-level educational content.
-    """
-
-    # Enhanced course-level specific prompting
     course_level_context = get_course_level_context(getattr(lesson_request, 'course_level', 'undergraduate_intro'))
 
-    user_prompt = f"""
-    Create a comprehensive college-level lesson plan for:
-
-    Subject Area: {lesson_request.topic}
-    Course Module: {lesson_request.chapter}
-    Lesson Title: {lesson_request.lesson_title}
-    Course Level: {course_level_context}
-    Duration: {lesson_request.duration}
-    Learning Objectives: {lesson_request.learning_objectives}
-
-    Create exactly 12 slides with this enhanced structure:
-    1. Course Introduction & Context
-    2. Learning Objectives & Outcomes
-    3. Theoretical Framework & Background
-    4. Key Concepts & Terminology
-    5. Core Content - Part I (Foundational Theory)
-    6. Core Content - Part II (Advanced Applications)
-    7. Research Perspectives & Current Developments
-    8. Case Studies & Real-World Applications
-    9. Critical Analysis & Discussion Points
-    10. Practical Exercise & Problem-Solving
-    11. Assessment & Evaluation Methods
-    12. Synthesis & Future Directions
-
-    For each slide, provide:
-    - Compelling, academic title
-    - 300-500 words of substantive, college-level content
-    - Detailed instructor notes (150+ words) with pedagogical guidance
-    - Specific image descriptions for academic visuals
-    - Discussion questions or reflection prompts
-    - References to relevant research or scholarly sources
-    """
+    system_prompt = prompt_registry.render("baseline_system", topic=lesson_request.topic)
+    user_prompt = prompt_registry.render(
+        "baseline_user",
+        topic=lesson_request.topic,
+        chapter=lesson_request.chapter,
+        lesson_title=lesson_request.lesson_title,
+        course_level_context=course_level_context,
+        duration=lesson_request.duration,
+        learning_objectives=lesson_request.learning_objectives
+    )
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000
-        )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    route = model_router.route("baseline")
 
-        ai_response = response.choices[0].message.content
-        slides = parse_ai_response_to_slides(ai_response, lesson_request)
+    def build(ai_response: str) -> LessonContent:
+        return build_baseline_lesson(lesson_request, parse_ai_response_to_slides(ai_response, lesson_request))
 
+    try:
+        lesson_content = build(complete_on_route(client, route, messages))
+    except ModelCapacityError:
+        raise
     except Exception as e:
         print(f"Error generating baseline content: {e}")
-        slides = create_baseline_slides_fallback(lesson_request)
+        return build_baseline_lesson(lesson_request, create_baseline_slides_fallback(lesson_request))
+
+    return escalate_if_below_standard(client, route, messages, lesson_content, lesson_request, build)
+
+
+def build_baseline_lesson(lesson_request: LessonRequest, slides: List[LessonSlide]) -> LessonContent:
+    """Baseline lesson around generated (or fallback) ``slides``"""
+    course_level_context = get_course_level_context(getattr(lesson_request, 'course_level', 'undergraduate_intro'))
 
     # Parse learning objectives
     learning_objectives = [obj.strip() for obj in lesson_request.learning_objectives.split("\n") if obj.strip()]
@@ -163,21 +268,7 @@ def generate_baseline_lesson(lesson_request: LessonRequest) -> LessonContent:
 
 def get_course_level_context(course_level: str) -> str:
     """Get appropriate context and expectations for different course levels"""
-    course_contexts = {
-        "undergraduate_intro": "Introductory undergraduate level (100-200). Focus on foundational concepts, "
-                               "broad survey of the field, basic terminology, and connecting to students' prior knowledge.",
-        "undergraduate_intermediate": "Intermediate undergraduate level (300). Building on prerequisites, "
-                                      "connecting complex concepts, practical applications, and developing analytical skills.",
-        "undergraduate_advanced": "Advanced undergraduate level (400). Sophisticated analysis, advanced theories, "
-                                  "independent research, and preparation for graduate study or professional practice.",
-        "graduate_masters": "Graduate master's level. Research-based content, critical analysis of current literature, "
-                            "professional application, thesis-level thinking, and advanced methodological approaches.",
-        "graduate_doctoral": "Graduate doctoral level. Cutting-edge research, original scholarship, theoretical innovation, "
-                             "comprehensive literature mastery, and contribution to disciplinary knowledge.",
-        "professional": "Professional development/continuing education. Practical skills enhancement, "
-                        "real-world application, career advancement, and immediate workplace relevance."
-    }
-    return course_contexts.get(course_level, course_contexts["undergraduate_intro"])
+    return COURSE_LEVEL_CONTEXTS.get(course_level, COURSE_LEVEL_CONTEXTS["undergraduate_intro"])
 
 
 def enhance_with_udl_principle(lesson_content: LessonContent, principle: str,
@@ -189,128 +280,59 @@ def enhance_with_udl_principle(lesson_content: LessonContent, principle: str,
     if not client:
         return apply_fallback_udl_enhancement(lesson_content, principle)
 
-    # College-focused UDL enhancement prompts
-    udl_prompts = {
-        "engagement": """
-        Apply UDL ENGAGEMENT principles specifically for COLLEGE-LEVEL ADULT LEARNERS:
-
-        ENGAGEMENT FOR ADULT LEARNERS:
-        - Connect to prior professional/academic experiences and career goals
-        - Provide authentic, research-based problems and real-world applications
-        - Offer choice in learning pathways, assignment formats, and assessment methods
-        - Include collaborative opportunities that leverage diverse student backgrounds
-        - Incorporate current events and contemporary issues relevant to the field
-        - Support self-directed learning and autonomous goal-setting
-        - Address diverse cultural perspectives and global contexts
-        - Encourage peer teaching and knowledge sharing
-
-        For each slide, add college-appropriate:
-        - Professional relevance connections and career applications
-        - Choice in how students engage with content (discussion, research, analysis)
-        - Authentic problems from current practice or research
-        - Opportunities for student expertise sharing
-        - Self-regulation tools for adult learners
-        - Culturally responsive examples and perspectives
-        """,
-
-        "representation": """
-        Apply UDL REPRESENTATION principles for COLLEGE-LEVEL ACADEMIC CONTENT:
-
-        REPRESENTATION FOR HIGHER EDUCATION:
-        - Provide multiple formats: visual diagrams, research articles, case studies, multimedia
-        - Include academic vocabulary support with discipline-specific glossaries
-        - Offer background knowledge scaffolds for students from diverse academic paths
-        - Present information through multiple scholarly perspectives and theoretical lenses
-        - Use discipline-appropriate visual representations (charts, models, diagrams)
-        - Provide translated materials or multilingual resources when appropriate
-        - Include audio/video supplements for complex concepts
-        - Offer different levels of detail for varied prior knowledge
-
-        For each slide, add:
-        - Multiple representation formats (text, visual, audio descriptions)
-        - Academic vocabulary support and definition resources
-        - Background knowledge connections and prerequisite reviews
-        - Alternative explanations using different theoretical approaches
-        - Visual aids appropriate for college-level content
-        - Links to supplementary resources and extended readings
-        """,
-
-        "action_expression": """
-        Apply UDL ACTION & EXPRESSION principles for COLLEGE-LEVEL ASSESSMENT:
-
-        ACTION & EXPRESSION FOR ADULT LEARNERS:
-        - Provide multiple ways to demonstrate knowledge (written, oral, visual, digital)
-        - Include options for individual and collaborative responses
-        - Support different communication styles and academic backgrounds
-        - Offer various assignment formats and assessment methods
-        - Provide organizational tools for complex projects and research
-        - Support executive functioning with planning templates and rubrics
-        - Allow for different technological skill levels and preferences
-        - Include self-assessment and peer review opportunities
-
-        For each slide, add:
-        - Multiple options for student responses and participation
-        - Various communication tools and platforms
-        - Organizational supports for complex academic tasks
-        - Planning templates and project management tools
-        - Self-monitoring and reflection opportunities
-        - Technology options accommodating different skill levels
-        - Collaborative and individual expression choices
-        """
-    }
-
-    system_prompt = f"""
-    You are a Universal Design for Learning expert specializing in HIGHER EDUCATION. 
-    Enhance the provided college-level lesson content by applying {principle.upper()} principles 
-    specifically adapted for adult learners in higher education settings.
-
-    COLLEGE UDL CONSIDERATIONS:
-    - Adult learners bring diverse professional and academic experiences
-    - Students may have different technological comfort levels
-    - Career relevance and practical application are crucial motivators
-    - Academic rigor must be maintained while ensuring accessibility
-    - Cultural and linguistic diversity requires thoughtful accommodation
-    - Self-directed learning preferences should be supported
-
-    {udl_prompts[principle]}
-
-    Build upon the existing content rather than replacing it. Maintain academic rigor while adding accessibility.
-    Mark new additions with [UDL-{principle.upper()}-COLLEGE] tags for clear identification.
-    """
+    # Representation rewrites only the slides whose reading level, sentences, jargon or size call for it
+    slide_indexes = None
+    if principle == UDLPrinciple.REPRESENTATION.value and settings.REPRESENTATION_SELECTIVE_REWRITE:
+        slide_indexes = slides_needing_rewrite(lesson_content, lesson_request.course_level)
+        if not slide_indexes:
+            return build_enhanced_lesson(
+                lesson_content, principle, parse_enhanced_slides("", lesson_content.slides, principle)
+            )
+
+    system_prompt = prompt_registry.render(udl_system_prompt_name(principle))
 
     # Convert current lesson to text for AI processing
-    current_lesson_text = format_lesson_for_ai(lesson_content)
+    current_lesson_text = format_lesson_for_ai(lesson_content, slide_indexes)
 
-    user_prompt = f"""
-    Enhance this college-level lesson with UDL {principle} principles adapted for adult learners:
+    user_prompt = prompt_registry.render(
+        "udl_user",
+        principle=principle,
+        principle_upper=principle.upper(),
+        lesson_text=current_lesson_text
+    )
 
-    {current_lesson_text}
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    route = model_router.route(principle)
 
-    For each slide, add specific {principle} enhancements while preserving all original academic content.
-    Ensure enhancements are appropriate for college-level instruction and adult learning principles.
-    Mark new additions with [UDL-{principle.upper()}-COLLEGE] tags.
-    """
+    def build(ai_response: str) -> LessonContent:
+        return build_enhanced_lesson(
+            lesson_content, principle, parse_enhanced_slides(ai_response, lesson_content.slides, principle)
+        )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4000
+        enhanced_lesson = build(complete_on_route(client, route, messages))
+    except ModelCapacityError:
+        raise
+    except Exception as e:
+        print(f"Error enhancing with UDL {principle}: {e}")
+        return build_enhanced_lesson(
+            lesson_content, principle, apply_fallback_udl_enhancement(lesson_content, principle).slides
         )
 
-        ai_response = response.choices[0].message.content
-        enhanced_slides = parse_enhanced_slides(ai_response, lesson_content.slides, principle)
+    input_score = rigor_score(lesson_content, lesson_request) if model_router.can_escalate(route) else None
+    return escalate_if_below_standard(
+        client, route, messages, enhanced_lesson, lesson_request, build, input_score
+    )
 
-    except Exception as e:
-        print(f"Error enhancing with UDL {principle}: {e}")
-        enhanced_slides = apply_fallback_udl_enhancement(lesson_content, principle).slides
 
+def build_enhanced_lesson(lesson_content: LessonContent, principle: str,
+                          enhanced_slides: List[LessonSlide]) -> LessonContent:
+    """Copy of ``lesson_content`` with ``enhanced_slides`` and ``principle`` recorded as applied"""
     # Update lesson content
-    enhanced_lesson = lesson_content.copy(deep=True)
+    enhanced_lesson = lesson_content.model_copy(deep=True)
     enhanced_lesson.slides = enhanced_slides
     enhanced_lesson.udl_stage = LessonStage(principle)
     enhanced_lesson.udl_applied_principles.append(UDLPrinciple(principle))
@@ -321,26 +343,9 @@ def enhance_with_udl_principle(lesson_content: LessonContent, principle: str,
     return enhanced_lesson
 
 
-def get_college_udl_features(principle: str) -> Dict[str, str]:
+def get_college_udl_features(principle: str) -> Mapping[str, str]:
     """Get UDL accessibility features specifically designed for college-level instruction"""
-    features = {
-        "engagement": {
-            "motivation": "Career-relevant applications, authentic research problems, choice in learning pathways",
-            "persistence": "Professional goal alignment, peer collaboration, self-directed learning options",
-            "self_regulation": "Academic planning tools, reflection frameworks, metacognitive strategies"
-        },
-        "representation": {
-            "perception": "Multiple academic formats, visual-audio-text options, discipline-specific representations",
-            "language": "Academic vocabulary support, multilingual resources, discipline glossaries",
-            "comprehension": "Theoretical framework connections, prerequisite reviews, multiple scholarly perspectives"
-        },
-        "action_expression": {
-            "physical_action": "Technology choice flexibility, multiple platform options, accessibility tools",
-            "expression": "Diverse assessment formats, oral-written-visual options, collaborative-individual choices",
-            "executive_function": "Research planning templates, project organization tools, academic rubrics"
-        }
-    }
-    return features.get(principle, {})
+    return COLLEGE_UDL_FEATURES.get(principle, MappingProxyType({}))
 
 
 def create_baseline_slides_fallback(lesson_request: LessonRequest) -> List[LessonSlide]:
@@ -472,6 +477,7 @@ def create_baseline_slides_fallback(lesson_request: LessonRequest) -> List[Lesso
     return slides
 
 
+@profiled("parse_ai_response_to_slides")
 def parse_ai_response_to_slides(ai_response: str, lesson_request: LessonRequest) -> List[LessonSlide]:
     """Parse AI response into college-level slide objects with enhanced content"""
     slides = []
@@ -519,53 +525,29 @@ def create_fallback_slide(slide_number: int, lesson_request: LessonRequest) -> L
     )
 
 
+@profiled("parse_enhanced_slides")
 def parse_enhanced_slides(ai_response: str, original_slides: List[LessonSlide], principle: str) -> List[LessonSlide]:
     """Parse AI-enhanced response and merge with original slides for college content"""
     enhanced_slides = []
+    college_enhancements = get_college_udl_enhancements(principle)
 
     for i, original_slide in enumerate(original_slides):
-        enhanced_slide = original_slide.copy()
+        enhanced_slide = original_slide.model_copy(deep=True)
 
         # Add college-specific UDL enhancements
         if principle not in enhanced_slide.udl_enhancements:
             enhanced_slide.udl_enhancements[principle] = []
 
-        enhanced_slide.udl_enhancements[principle].extend(get_college_udl_enhancements(principle))
+        enhanced_slide.udl_enhancements[principle].extend(college_enhancements)
 
         enhanced_slides.append(enhanced_slide)
 
     return enhanced_slides
 
 
-def get_college_udl_enhancements(principle: str) -> List[str]:
+def get_college_udl_enhancements(principle: str) -> Sequence[str]:
     """Get default UDL enhancements specifically designed for college-level instruction"""
-    enhancements = {
-        "engagement": [
-            "Connected to professional career applications and real-world relevance",
-            "Included diverse cultural perspectives and global contexts",
-            "Added student choice in learning pathways and assignment formats",
-            "Incorporated collaborative opportunities leveraging student expertise",
-            "Provided authentic research problems and current case studies",
-            "Supported self-directed learning and autonomous goal-setting"
-        ],
-        "representation": [
-            "Added multiple academic content formats (text, visual, audio, multimedia)",
-            "Included discipline-specific vocabulary support and glossaries",
-            "Provided background knowledge scaffolds for diverse academic paths",
-            "Offered multiple theoretical perspectives and scholarly viewpoints",
-            "Added visual representations appropriate for college-level content",
-            "Included links to supplementary research and extended readings"
-        ],
-        "action_expression": [
-            "Provided multiple assessment formats (written, oral, visual, digital)",
-            "Included individual and collaborative response options",
-            "Added organizational tools for complex academic projects",
-            "Provided planning templates and research frameworks",
-            "Included self-assessment and peer review opportunities",
-            "Offered technology options for different skill levels and preferences"
-        ]
-    }
-    return enhancements.get(principle, [])
+    return COLLEGE_UDL_ENHANCEMENTS.get(principle, ())
 
 
 # Rest of the existing functions remain the same but can be enhanced for college focus
@@ -598,13 +580,14 @@ def create_baseline_fallback_lesson(lesson_request: LessonRequest) -> LessonCont
 
 def apply_fallback_udl_enhancement(lesson_content: LessonContent, principle: str) -> LessonContent:
     """Apply fallback UDL enhancements with college-level focus when AI is unavailable"""
-    enhanced_lesson = lesson_content.copy(deep=True)
+    enhanced_lesson = lesson_content.model_copy(deep=True)
 
     # Add college-specific UDL enhancements to each slide
+    college_enhancements = get_college_udl_enhancements(principle)
     for slide in enhanced_lesson.slides:
         if principle not in slide.udl_enhancements:
             slide.udl_enhancements[principle] = []
-        slide.udl_enhancements[principle].extend(get_college_udl_enhancements(principle))
+        slide.udl_enhancements[principle].extend(college_enhancements)
 
     enhanced_lesson.udl_stage = LessonStage(principle)
     enhanced_lesson.udl_applied_principles.append(UDLPrinciple(principle))
@@ -613,8 +596,12 @@ def apply_fallback_udl_enhancement(lesson_content: LessonContent, principle: str
     return enhanced_lesson
 
 
-def format_lesson_for_ai(lesson_content: LessonContent) -> str:
-    """Format lesson content for AI processing with college-level context"""
+def format_lesson_for_ai(lesson_content: LessonContent, slide_indexes: Optional[Sequence[int]] = None) -> str:
+    """Format lesson content for AI processing with college-level context
+
+    With ``slide_indexes`` only those slides are included, under their
+    original numbers.
+    """
     formatted_text = f"""
     COLLEGE-LEVEL LESSON: {lesson_content.title}
     ACADEMIC LEVEL: {lesson_content.grade_level}
@@ -623,10 +610,12 @@ def format_lesson_for_ai(lesson_content: LessonContent) -> str:
     LEARNING OBJECTIVES:
     {chr(10).join([f"- {obj}" for obj in lesson_content.learning_objectives])}
 
-    SLIDES:
+    {"SLIDES:" if slide_indexes is None else "SLIDES TO REWRITE (the other slides stay as they are):"}
     """
 
     for i, slide in enumerate(lesson_content.slides, 1):
+        if slide_indexes is not None and i - 1 not in slide_indexes:
+            continue
         formatted_text += f"""
 
     SLIDE {i}: {slide.title}
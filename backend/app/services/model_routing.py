@@ -0,0 +1,142 @@
+# backend/app/services/model_routing.py
+import threading
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.core.config import settings
+from app.services.resilience import LatencyTracker
+
+
+class ModelRoute:
+    """Model and request limits used for one stage (baseline or a UDL principle)"""
+
+    def __init__(self, operation: str, model: str, max_tokens: int = 4000, timeout: float = 120.0,
+                 temperature: float = 0.7, escalate_to: Optional[str] = None, min_score: float = 0.0):
+        self.operation = operation
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.temperature = temperature
+        self.escalate_to = escalate_to
+        self.min_score = min_score
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """Prompt tokens the provider served from its prompt cache, per the usage field
+
+    Older SDKs keep ``prompt_tokens_details`` as a plain dict, newer ones as
+    an object; providers without prompt caching omit it.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+class RouteMetrics:
+    """Call counts, latency, tokens and cost of one (route, model) pair"""
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+
+class ModelRouter:
+    """Resolves each stage to a ModelRoute and accounts for the calls made on it
+
+    Routes come from ``Settings.MODEL_ROUTES``; unknown operations use the
+    baseline route. Costs are estimated from reported token usage, cached
+    prompt tokens included, and ``Settings.MODEL_PRICES`` (models without a
+    price are reported at 0).
+    """
+
+    def __init__(self, routes: Mapping[str, Mapping[str, Any]], prices: Mapping[str, Tuple[float, ...]]):
+        self.routes = {
+            operation: ModelRoute(operation, **config) for operation, config in routes.items()
+        }
+        self.prices = dict(prices)
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.escalations = Counter()
+
+    def route(self, operation: str) -> ModelRoute:
+        return self.routes.get(operation) or self.routes["baseline"]
+
+    def escalation(self, route: ModelRoute) -> ModelRoute:
+        """``route`` moved to its larger model, which does not escalate again
+
+        Token limit and timeout come from another route already using that
+        model, when there is one, since they were sized for it.
+        """
+        limits = next((other for other in self.routes.values() if other.model == route.escalate_to), route)
+        return ModelRoute(route.operation, route.escalate_to, limits.max_tokens, limits.timeout, route.temperature)
+
+    def can_escalate(self, route: ModelRoute) -> bool:
+        """Whether ``route``'s output is checked at all; callers skip scoring lessons when it is not"""
+        return bool(settings.MODEL_ESCALATION_ENABLED and route.escalate_to)
+
+    def should_escalate(self, route: ModelRoute, score: float, input_score: Optional[float] = None) -> bool:
+        """Whether a lesson scored ``score`` by the validator should be regenerated on the larger model
+
+        A stage is not blamed for a lesson that already scored lower before it ran.
+        """
+        if not self.can_escalate(route):
+            return False
+        threshold = route.min_score if input_score is None else min(route.min_score, input_score)
+        return score < threshold
+
+    def record(self, route: ModelRoute, seconds: float, usage: Any = None):
+        """Account for one completed call on ``route``"""
+        with self._lock:
+            metrics = self._metrics.get((route.operation, route.model))
+            if metrics is None:
+                metrics = self._metrics[(route.operation, route.model)] = RouteMetrics()
+            metrics.calls += 1
+            metrics.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            metrics.cached_tokens += cached_prompt_tokens(usage)
+            metrics.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        metrics.latency.record(seconds)
+
+    def record_escalation(self, route: ModelRoute):
+        with self._lock:
+            self.escalations[route.operation] += 1
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        prompt_price, completion_price, cached_price = self.prices.get(model, (0.0, 0.0, 0.0))
+        uncached_tokens = prompt_tokens - cached_tokens
+        return (uncached_tokens * prompt_price + cached_tokens * cached_price
+                + completion_tokens * completion_price) / 1_000_000
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            snapshot = [
+                (operation, model, metrics.calls, metrics.prompt_tokens, metrics.cached_tokens,
+                 metrics.completion_tokens, metrics.latency)
+                for (operation, model), metrics in self._metrics.items()
+            ]
+            escalations = dict(self.escalations)
+
+        report: Dict[str, Dict[str, Any]] = {
+            operation: {"model": route.model, "escalate_to": route.escalate_to,
+                        "escalations": escalations.get(operation, 0), "calls": {}}
+            for operation, route in self.routes.items()
+        }
+        for operation, model, calls, prompt_tokens, cached_tokens, completion_tokens, latency in snapshot:
+            p50, p95 = latency.percentile(50.0), latency.percentile(95.0)
+            report.setdefault(operation, {"calls": {}})["calls"][model] = {
+                "calls": calls,
+                "p50_latency_s": round(p50, 3) if p50 is not None else None,
+                "p95_latency_s": round(p95, 3) if p95 is not None else None,
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cached_tokens,
+                "cached_token_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(self.cost(model, prompt_tokens, completion_tokens, cached_tokens), 4),
+            }
+        return report
+
+
+model_router = ModelRouter(settings.MODEL_ROUTES, settings.MODEL_PRICES)
@@ -0,0 +1,226 @@
+# backend/app/services/pipeline.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.models.lesson import (
+    LessonContent, LessonRequest, LessonStage, UDLPrinciple, CollegeLessonValidator, CourseLevelType
+)
+from app.services.lesson_generator import enhance_with_udl_principle
+from app.services.export_prerender import export_prerenderer
+from app.services.single_flight import generation_flights, enhancement_flight_key
+
+# Single source of truth for the teacher-in-the-loop stage order
+STAGE_ORDER: Tuple[str, ...] = ("baseline", "engagement", "representation", "action_expression")
+UDL_STAGES: Tuple[str, ...] = STAGE_ORDER[1:]
+
+# Slide fields a UDL stage may rewrite; enhancements and features are merged per principle instead
+MERGEABLE_SLIDE_FIELDS = ("title", "content", "notes", "image_prompt")
+
+
+def next_stage(current_stage: str) -> Optional[str]:
+    """The UDL principle to apply after ``current_stage`` (None once all are applied)"""
+    if current_stage not in STAGE_ORDER:
+        return None
+    position = STAGE_ORDER.index(current_stage) + 1
+    return STAGE_ORDER[position] if position < len(STAGE_ORDER) else None
+
+
+def available_next_stages(current_stage: str) -> List[str]:
+    """Stages the teacher can move on to from ``current_stage``"""
+    if current_stage == STAGE_ORDER[-1]:
+        return ["export"]
+    following = next_stage(current_stage)
+    return [following] if following else []
+
+
+def remaining_stages(current_stage: str) -> List[str]:
+    """UDL principles not yet applied after ``current_stage``"""
+    if current_stage not in STAGE_ORDER:
+        return []
+    return list(STAGE_ORDER[STAGE_ORDER.index(current_stage) + 1:])
+
+
+# Called with (node name, status, timing) as nodes start and finish
+PipelineObserver = Callable[[str, str, Dict[str, Any]], None]
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline node fails; carries the timings recorded so far"""
+
+    def __init__(self, node: str, error: BaseException, timings: Dict[str, Dict[str, Any]]):
+        super().__init__(f"Pipeline node '{node}' failed: {error}")
+        self.node = node
+        self.error = error
+        self.timings = timings
+
+
+class PipelineNode:
+    """One stage of a pipeline
+
+    ``run`` receives the results of the finished nodes (keyed by node name)
+    and returns an awaitable producing this node's result.
+    """
+
+    def __init__(self, name: str, run: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 depends_on: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+class Pipeline:
+    """Declarative DAG of stages; each node starts as soon as its dependencies finish
+
+    Independent nodes run concurrently. If a node fails, nodes depending on
+    it are skipped and ``run`` raises PipelineError once the rest settle.
+    """
+
+    def __init__(self, nodes: Sequence[PipelineNode]):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate pipeline node: {node.name}")
+            self.nodes[node.name] = node
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline cycle: {' -> '.join(path + (name,))}")
+            if name not in self.nodes:
+                raise ValueError(f"Unknown pipeline dependency: {name}")
+            state[name] = "visiting"
+            for dependency in self.nodes[name].depends_on:
+                visit(dependency, path + (name,))
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, ())
+        return order
+
+    async def run(self, observer: Optional[PipelineObserver] = None
+                  ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """Execute the pipeline, returning (results, per-node timings in ms)
+
+        ``observer`` is called with (node, status, timing) whenever a node
+        starts, completes, fails or is skipped.
+        """
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        def record(name: str, status: str, **timing):
+            timings.setdefault(name, {}).update(timing, status=status)
+            if observer is not None:
+                observer(name, status, dict(timings[name]))
+
+        async def execute(node: PipelineNode):
+            for dependency in node.depends_on:
+                try:
+                    await tasks[dependency]
+                except Exception:
+                    record(node.name, "skipped")
+                    raise
+            node_started = time.perf_counter()
+            record(node.name, "running", start_ms=round((node_started - started) * 1000, 2))
+            try:
+                results[node.name] = await node.run(results)
+            except Exception:
+                record(node.name, "failed", duration_ms=round((time.perf_counter() - node_started) * 1000, 2))
+                raise
+            record(node.name, "completed", duration_ms=round((time.perf_counter() - node_started) * 1000, 2))
+
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(execute(self.nodes[name]))
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        for name, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, Exception) and timings.get(name, {}).get("status") == "failed":
+                raise PipelineError(name, outcome, timings)
+        timings["total"] = {"duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+        return results, timings
+
+
+def merge_udl_results(base: LessonContent, results: Sequence[Tuple[str, LessonContent]]) -> LessonContent:
+    """Combine principle enhancements that were each applied to the same ``base`` lesson
+
+    Each principle only adds its own ``udl_enhancements`` entry and accessibility
+    features, so those merge without conflict. Slide text a stage rewrote is
+    taken from that stage; if two stages rewrote the same field, the later
+    stage in STAGE_ORDER wins, matching what a sequential run would keep.
+    """
+    merged = base.model_copy(deep=True)
+    for principle, result in sorted(results, key=lambda item: STAGE_ORDER.index(item[0])):
+        if len(result.slides) != len(base.slides):
+            raise ValueError(f"{principle} stage changed the slide count; it cannot be merged")
+
+        for index, (slide, original) in enumerate(zip(result.slides, base.slides)):
+            target = merged.slides[index]
+            for field in MERGEABLE_SLIDE_FIELDS:
+                value = getattr(slide, field)
+                if value != getattr(original, field):
+                    setattr(target, field, value)
+            target.accessibility_features.update(slide.accessibility_features)
+            if principle in slide.udl_enhancements:
+                target.udl_enhancements[principle] = list(slide.udl_enhancements[principle])
+
+        merged.accessibility_features.update(result.accessibility_features)
+        if UDLPrinciple(principle) not in merged.udl_applied_principles:
+            merged.udl_applied_principles.append(UDLPrinciple(principle))
+        merged.udl_stage = LessonStage(principle)
+
+    return merged
+
+
+def quality_report(lesson_content: LessonContent, lesson_request: LessonRequest) -> Dict[str, Any]:
+    course_level = CourseLevelType(lesson_request.course_level or CourseLevelType.UNDERGRADUATE_INTRO)
+    report = CollegeLessonValidator.validate_academic_rigor(lesson_content, course_level)
+    report["suggestions"] = CollegeLessonValidator.suggest_enhancements(lesson_content, course_level)
+    return report
+
+
+def build_full_udl_pipeline(lesson_content: LessonContent, lesson_request: LessonRequest,
+                            principles: Sequence[str], export_path: Optional[str] = None) -> Pipeline:
+    """Pipeline applying ``principles`` concurrently to ``lesson_content``, then checking and exporting
+
+    The principle nodes work on ``lesson_content`` as given, so callers pass a
+    snapshot. Principle calls go through the shared single-flight layer and
+    join identical in-flight stage requests.
+    """
+
+    def principle_node(principle: str) -> PipelineNode:
+        return PipelineNode(
+            principle,
+            lambda results: generation_flights.do(
+                enhancement_flight_key(lesson_content, principle, lesson_request),
+                lambda: run_in_threadpool(enhance_with_udl_principle, lesson_content, principle, lesson_request)
+            )
+        )
+
+    async def merge(results: Dict[str, Any]) -> LessonContent:
+        return merge_udl_results(lesson_content, [(principle, results[principle]) for principle in principles])
+
+    nodes = [principle_node(principle) for principle in principles]
+    nodes.append(PipelineNode("merge", merge, depends_on=principles))
+    nodes.append(PipelineNode(
+        "quality_check",
+        lambda results: run_in_threadpool(quality_report, results["merge"], lesson_request),
+        depends_on=("merge",)
+    ))
+    if export_path:
+        nodes.append(PipelineNode(
+            "export",
+            lambda results: export_prerenderer.render(results["merge"], export_path),
+            depends_on=("merge",)
+        ))
+
+    return Pipeline(nodes)
@@ -1,17 +1,82 @@
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
-from pptx.enum.text import MSO_ANCHOR
+from app.core.config import settings
+from app.core.profiling import profiled
 from app.models.lesson import LessonContent
+from typing import Callable, Optional
+import io
 import os
+import re
+import unicodedata
 
+# python-pptx (and lxml) are imported on first render or by warm_up(), not when the API starts
+_template_bytes: Optional[bytes] = None
 
-def create_presentation(lesson_content: LessonContent, output_path: str):
-    """Create a PowerPoint presentation based on lesson content"""
 
-    # Create a new presentation
-    prs = Presentation()
+class RenderCancelled(Exception):
+    """Raised when a background render is cancelled because a newer lesson version exists"""
+
+
+def load_template() -> bytes:
+    """Import python-pptx and cache the default template package
+
+    Called before gunicorn forks (preload mode) so workers share the modules
+    and template bytes copy-on-write instead of each reading them again.
+    """
+    global _template_bytes
+    if _template_bytes is None:
+        import pptx
+
+        template_path = os.path.join(os.path.dirname(pptx.__file__), "templates", "default.pptx")
+        with open(template_path, "rb") as handle:
+            _template_bytes = handle.read()
+    return _template_bytes
+
+
+# Titles come from teachers, models and imported decks; only these characters reach a file name
+UNSAFE_FILENAME_CHARACTERS = re.compile(r"[^A-Za-z0-9_-]+")
+MAX_FILENAME_STEM = 100
+
+
+def export_filename(lesson_content: LessonContent) -> str:
+    """Deck file name built from a slug of the lesson title (never a path)"""
+    # Accents are dropped rather than the whole letter, so "Économie" becomes "Economie"
+    title = unicodedata.normalize("NFKD", lesson_content.title).encode("ascii", "ignore").decode("ascii")
+    stem = UNSAFE_FILENAME_CHARACTERS.sub("_", title)[:MAX_FILENAME_STEM].strip("_-")
+    return f"{stem or 'lesson'}_final.pptx"
+
+
+def export_path(lesson_dir: str, lesson_content: LessonContent) -> str:
+    """Path of the lesson's deck in ``lesson_dir``; raises ValueError if it would resolve elsewhere"""
+    path = os.path.join(lesson_dir, export_filename(lesson_content))
+    if os.path.dirname(os.path.realpath(path)) != os.path.realpath(lesson_dir):
+        raise ValueError(f"Export path {path!r} is outside {lesson_dir!r}")
+    return path
+
+
+@profiled("create_presentation")
+def create_presentation(lesson_content: LessonContent, output_path: str,
+                        checkpoint: Optional[Callable[[], None]] = None):
+    """Create a PowerPoint presentation based on lesson content
+
+    ``checkpoint`` is called at every slide boundary and before saving; it may
+    raise RenderCancelled to abandon the render (nothing is saved) or block
+    while higher-priority work uses the CPU.
+
+    Each slide's ``image_prompt`` is rendered (or taken from the image cache)
+    in the image worker pool while the deck is built, and embedded with its
+    alt text.
+    """
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.dml.color import RGBColor
+
+    # Start the slide images first, so they render in parallel with the text slides
+    image_futures = [None] * len(lesson_content.slides)
+    if settings.IMAGES_ENABLED:
+        from app.services.image_provider import slide_images
+        image_futures = slide_images.submit_all(slide.image_prompt for slide in lesson_content.slides)
+
+    # Create a new presentation from the cached default template
+    prs = Presentation(io.BytesIO(load_template()))
 
     # Define slide layouts
     title_slide_layout = prs.slide_layouts[0]  # Title slide
@@ -51,7 +116,9 @@ def create_presentation(lesson_content: LessonContent, output_path: str):
     )
 
     # Create slide for each content slide
-    for slide_content in lesson_content.slides:
+    for slide_content, image_future in zip(lesson_content.slides, image_futures):
+        if checkpoint:
+            checkpoint()
         slide = prs.slides.add_slide(content_slide_layout)
 
         # Set title
@@ -87,6 +154,21 @@ def create_presentation(lesson_content: LessonContent, output_path: str):
             except:
                 pass
 
+        # Place the slide image to the right of the narrowed content, with its alt text
+        slide_image = slide_images.result(image_future) if image_future is not None else None
+        picture = None
+        if slide_image is not None:
+            try:
+                picture = slide.shapes.add_picture(slide_image.path, Inches(6.1), Inches(2.2), width=Inches(3.6))
+            except FileNotFoundError:
+                # Pruned from the image cache since it was handed out; the slide goes without it
+                print(f"Slide image {slide_image.path} vanished before it was embedded")
+        if picture is not None:
+            if len(slide.placeholders) > 1:
+                slide.placeholders[1].width = Inches(5.4)
+            picture.name = "Slide image"
+            picture._element.nvPicPr.cNvPr.set("descr", slide_image.alt_text)
+
         # Add a text box with accessibility information at the bottom
         try:
             accessibility_info = []
@@ -197,6 +279,8 @@ The lesson is designed for {lesson_content.grade_level} students and should take
 All materials and activities can be adapted further based on specific student needs and classroom contexts."""
 
     # Save the presentation
+    if checkpoint:
+        checkpoint()
     try:
         prs.save(output_path)
         print(f"Presentation saved successfully to {output_path}")
@@ -0,0 +1,413 @@
+# backend/app/services/prompts.py
+"""Versioned prompt templates built once at import.
+
+Constant prompt sections are frozen into the templates up front; per-request
+values are filled in with a cheap ``string.Template`` substitution. The active
+version comes from ``settings.PROMPT_VERSION`` and extra versions can be
+dropped into ``settings.PROMPT_TEMPLATES_DIR`` as ``<name>@<version>.txt``
+files, so prompts can be A/B tested without code edits.
+
+Version v2 (the default ``settings.PROMPT_VERSION``) sends one system prompt
+to every stage, so the provider's prompt cache can reuse it across the
+baseline and UDL calls. Every template also exists in ``BASE_PROMPT_VERSION``
+(v1), which is used wherever the active version does not override it.
+"""
+import hashlib
+import os
+import textwrap
+import threading
+from collections import Counter
+from string import Template
+from typing import Dict, Tuple
+
+from app.core.config import settings
+from app.models.lesson import COLLEGE_UDL_PRINCIPLES
+
+# Every template has this version; a newer version may override only some templates
+BASE_PROMPT_VERSION = "v1"
+
+
+class PromptTemplate:
+    """A named, versioned prompt with ``$placeholder`` slots"""
+
+    def __init__(self, name: str, version: str, text: str):
+        self.name = name
+        self.version = version
+        self.text = text
+        self._template = Template(text)
+        self.placeholders = frozenset(self._template.get_identifiers())
+
+    def render(self, **values: str) -> str:
+        if not self.placeholders:
+            return self.text
+        return self._template.substitute(values)
+
+
+class PromptRegistry:
+    """Lookup of prompt templates by name, resolved against the active version"""
+
+    def __init__(self, active_version: str = BASE_PROMPT_VERSION):
+        self.active_version = active_version
+        self._templates: Dict[Tuple[str, str], PromptTemplate] = {}
+        self._usage = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def version_id(self) -> str:
+        return self.active_version
+
+    def register(self, template: PromptTemplate):
+        self._templates[(template.name, template.version)] = template
+
+    def get(self, name: str) -> PromptTemplate:
+        """Active version of ``name``, falling back to the base version"""
+        template = self._templates.get((name, self.active_version))
+        if template is None:
+            template = self._templates[(name, BASE_PROMPT_VERSION)]
+        return template
+
+    def render(self, name: str, **values: str) -> str:
+        template = self.get(name)
+        with self._lock:
+            self._usage[f"{template.name}@{template.version}"] += 1
+        return template.render(**values)
+
+    def load_directory(self, directory: str):
+        """Register every ``<name>@<version>.txt`` file found in ``directory``"""
+        for filename in sorted(os.listdir(directory)):
+            stem, extension = os.path.splitext(filename)
+            if extension != ".txt" or "@" not in stem:
+                continue
+            name, version = stem.split("@", 1)
+            with open(os.path.join(directory, filename), encoding="utf-8") as handle:
+                self.register(PromptTemplate(name, version, handle.read()))
+
+    def system_prefixes(self) -> Dict[str, str]:
+        """Short hash of each distinct active system prompt, with the prompts sharing it
+
+        Providers only reuse a cached prefix that is byte-identical, so this
+        shows whether stages can share one.
+        """
+        names = {name for name, _ in self._templates if name.endswith("_system") or name.startswith("udl_system.")}
+        prefixes: Dict[str, list] = {}
+        for name in sorted(names):
+            digest = hashlib.sha256(self.get(name).text.encode("utf-8")).hexdigest()[:12]
+            prefixes.setdefault(digest, []).append(name)
+        return {digest: ", ".join(shared_by) for digest, shared_by in prefixes.items()}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            usage = dict(self._usage)
+        return {"active_version": self.active_version, "renders": usage, "system_prefixes": self.system_prefixes()}
+
+
+# ---------------------------------------------------------------------------
+# Version v1 templates
+# ---------------------------------------------------------------------------
+
+BASELINE_SYSTEM_PROMPT = """
+    You are an expert higher education curriculum designer with extensive experience in college-level pedagogy.
+    Create a comprehensive, research-based lesson plan for college students studying $topic.
+
+    This is the BASELINE STAGE of a multi-stage UDL enhancement process.
+
+    COLLEGE-LEVEL REQUIREMENTS:
+    - Use sophisticated academic language appropriate for higher education
+    - Include research citations and current scholarly perspectives
+    - Incorporate critical thinking and analytical frameworks
+    - Reference real-world applications and case studies
+    - Use discipline-specific terminology with clear explanations
+    - Design for adult learners with diverse academic backgrounds
+
+    CONTENT DEPTH:
+    - Each slide should contain 300-500 words of substantive content
+    - Include multiple examples, counterexamples, and applications
+    - Connect concepts to broader theoretical frameworks
+    - Encourage analysis, synthesis, and evaluation (Bloom's higher levels)
+
+    ACADEMIC RIGOR:
+    - Present multiple perspectives on complex topics
+    - Include current research and emerging trends
+    - Reference primary sources and foundational texts
+    - Encourage scholarly discourse and debate
+
+    DO NOT include UDL-specific accessibility features yet - we'll add those in subsequent stages.
+    Focus on creating exceptional college-level educational content.
+    """
+
+BASELINE_USER_PROMPT = """
+    Create a comprehensive college-level lesson plan for:
+
+    Subject Area: $topic
+    Course Module: $chapter
+    Lesson Title: $lesson_title
+    Course Level: $course_level_context
+    Duration: $duration
+    Learning Objectives: $learning_objectives
+
+    Create exactly 12 slides with this enhanced structure:
+    1. Course Introduction & Context
+    2. Learning Objectives & Outcomes
+    3. Theoretical Framework & Background
+    4. Key Concepts & Terminology
+    5. Core Content - Part I (Foundational Theory)
+    6. Core Content - Part II (Advanced Applications)
+    7. Research Perspectives & Current Developments
+    8. Case Studies & Real-World Applications
+    9. Critical Analysis & Discussion Points
+    10. Practical Exercise & Problem-Solving
+    11. Assessment & Evaluation Methods
+    12. Synthesis & Future Directions
+
+    For each slide, provide:
+    - Compelling, academic title
+    - 300-500 words of substantive, college-level content
+    - Detailed instructor notes (150+ words) with pedagogical guidance
+    - Specific image descriptions for academic visuals
+    - Discussion questions or reflection prompts
+    - References to relevant research or scholarly sources
+    """
+
+# College-focused UDL enhancement instructions, one block per principle
+UDL_PRINCIPLE_INSTRUCTIONS = {
+    "engagement": """
+        Apply UDL ENGAGEMENT principles specifically for COLLEGE-LEVEL ADULT LEARNERS:
+
+        ENGAGEMENT FOR ADULT LEARNERS:
+        - Connect to prior professional/academic experiences and career goals
+        - Provide authentic, research-based problems and real-world applications
+        - Offer choice in learning pathways, assignment formats, and assessment methods
+        - Include collaborative opportunities that leverage diverse student backgrounds
+        - Incorporate current events and contemporary issues relevant to the field
+        - Support self-directed learning and autonomous goal-setting
+        - Address diverse cultural perspectives and global contexts
+        - Encourage peer teaching and knowledge sharing
+
+        For each slide, add college-appropriate:
+        - Professional relevance connections and career applications
+        - Choice in how students engage with content (discussion, research, analysis)
+        - Authentic problems from current practice or research
+        - Opportunities for student expertise sharing
+        - Self-regulation tools for adult learners
+        - Culturally responsive examples and perspectives
+        """,
+
+    "representation": """
+        Apply UDL REPRESENTATION principles for COLLEGE-LEVEL ACADEMIC CONTENT:
+
+        REPRESENTATION FOR HIGHER EDUCATION:
+        - Provide multiple formats: visual diagrams, research articles, case studies, multimedia
+        - Include academic vocabulary support with discipline-specific glossaries
+        - Offer background knowledge scaffolds for students from diverse academic paths
+        - Present information through multiple scholarly perspectives and theoretical lenses
+        - Use discipline-appropriate visual representations (charts, models, diagrams)
+        - Provide translated materials or multilingual resources when appropriate
+        - Include audio/video supplements for complex concepts
+        - Offer different levels of detail for varied prior knowledge
+
+        For each slide, add:
+        - Multiple representation formats (text, visual, audio descriptions)
+        - Academic vocabulary support and definition resources
+        - Background knowledge connections and prerequisite reviews
+        - Alternative explanations using different theoretical approaches
+        - Visual aids appropriate for college-level content
+        - Links to supplementary resources and extended readings
+        """,
+
+    "action_expression": """
+        Apply UDL ACTION & EXPRESSION principles for COLLEGE-LEVEL ASSESSMENT:
+
+        ACTION & EXPRESSION FOR ADULT LEARNERS:
+        - Provide multiple ways to demonstrate knowledge (written, oral, visual, digital)
+        - Include options for individual and collaborative responses
+        - Support different communication styles and academic backgrounds
+        - Offer various assignment formats and assessment methods
+        - Provide organizational tools for complex projects and research
+        - Support executive functioning with planning templates and rubrics
+        - Allow for different technological skill levels and preferences
+        - Include self-assessment and peer review opportunities
+
+        For each slide, add:
+        - Multiple options for student responses and participation
+        - Various communication tools and platforms
+        - Organizational supports for complex academic tasks
+        - Planning templates and project management tools
+        - Self-monitoring and reflection opportunities
+        - Technology options accommodating different skill levels
+        - Collaborative and individual expression choices
+        """
+}
+
+UDL_SYSTEM_PROMPT = """
+    You are a Universal Design for Learning expert specializing in HIGHER EDUCATION.
+    Enhance the provided college-level lesson content by applying $principle_upper principles
+    specifically adapted for adult learners in higher education settings.
+
+    COLLEGE UDL CONSIDERATIONS:
+    - Adult learners bring diverse professional and academic experiences
+    - Students may have different technological comfort levels
+    - Career relevance and practical application are crucial motivators
+    - Academic rigor must be maintained while ensuring accessibility
+    - Cultural and linguistic diversity requires thoughtful accommodation
+    - Self-directed learning preferences should be supported
+
+    $principle_instructions
+
+    Build upon the existing content rather than replacing it. Maintain academic rigor while adding accessibility.
+    Mark new additions with [UDL-$principle_upper-COLLEGE] tags for clear identification.
+    """
+
+UDL_USER_PROMPT = """
+    Enhance this college-level lesson with UDL $principle principles adapted for adult learners:
+
+    $lesson_text
+
+    For each slide, add specific $principle enhancements while preserving all original academic content.
+    Ensure enhancements are appropriate for college-level instruction and adult learning principles.
+    Mark new additions with [UDL-$principle_upper-COLLEGE] tags.
+    """
+
+
+
+# ---------------------------------------------------------------------------
+# Version v2 templates: one system prompt shared by every stage
+#
+# Providers cache prompts by exact prefix, so everything that does not vary
+# (role, standards, response format and the guidance for all three UDL
+# principles) is one byte-stable system prompt used by the baseline and every
+# UDL stage. The stage and the request-specific values come after it, in the
+# user message.
+# ---------------------------------------------------------------------------
+
+SHARED_SYSTEM_PROMPT = textwrap.dedent("""\
+    You are an expert higher education curriculum designer and Universal Design for Learning (UDL) specialist
+    with extensive experience in college-level pedagogy. Lessons are built in stages: a BASELINE stage writes
+    the lesson, then one stage per UDL principle enhances it. The user message names the stage and gives the
+    lesson details.
+
+    COLLEGE-LEVEL REQUIREMENTS:
+    - Use sophisticated academic language appropriate for higher education
+    - Include research citations and current scholarly perspectives
+    - Incorporate critical thinking and analytical frameworks
+    - Reference real-world applications and case studies
+    - Use discipline-specific terminology with clear explanations
+    - Design for adult learners with diverse academic backgrounds
+
+    CONTENT DEPTH:
+    - Each slide should contain 300-500 words of substantive content
+    - Include multiple examples, counterexamples, and applications
+    - Connect concepts to broader theoretical frameworks
+    - Encourage analysis, synthesis, and evaluation (Bloom's higher levels)
+
+    ACADEMIC RIGOR:
+    - Present multiple perspectives on complex topics
+    - Include current research and emerging trends
+    - Reference primary sources and foundational texts
+    - Encourage scholarly discourse and debate
+
+    BASELINE SLIDE STRUCTURE (exactly 12 slides):
+    1. Course Introduction & Context
+    2. Learning Objectives & Outcomes
+    3. Theoretical Framework & Background
+    4. Key Concepts & Terminology
+    5. Core Content - Part I (Foundational Theory)
+    6. Core Content - Part II (Advanced Applications)
+    7. Research Perspectives & Current Developments
+    8. Case Studies & Real-World Applications
+    9. Critical Analysis & Discussion Points
+    10. Practical Exercise & Problem-Solving
+    11. Assessment & Evaluation Methods
+    12. Synthesis & Future Directions
+
+    For each slide, provide:
+    - Compelling, academic title
+    - 300-500 words of substantive, college-level content
+    - Detailed instructor notes (150+ words) with pedagogical guidance
+    - Specific image descriptions for academic visuals
+    - Discussion questions or reflection prompts
+    - References to relevant research or scholarly sources
+
+    RESPONSE FORMAT:
+    Start each slide on a new line with "Slide N: <title>", followed by its content, then a line starting
+    "Instructor Notes:" and a line starting "Image:" with the image description.
+
+    COLLEGE UDL CONSIDERATIONS:
+    - Adult learners bring diverse professional and academic experiences
+    - Students may have different technological comfort levels
+    - Career relevance and practical application are crucial motivators
+    - Academic rigor must be maintained while ensuring accessibility
+    - Cultural and linguistic diversity requires thoughtful accommodation
+    - Self-directed learning preferences should be supported
+
+    UDL STAGES:
+    Build upon the existing content rather than replacing it. Maintain academic rigor while adding
+    accessibility. Mark new additions with [UDL-<PRINCIPLE>-COLLEGE] tags for clear identification, using the
+    stage's principle name in capitals.
+    """)
+
+
+def college_udl_guidance() -> str:
+    """Guidance for every UDL principle, from COLLEGE_UDL_PRINCIPLES and the per-principle instructions"""
+    sections = []
+    for principle, instructions in UDL_PRINCIPLE_INSTRUCTIONS.items():
+        details = COLLEGE_UDL_PRINCIPLES[principle]
+        lines = [f"{principle.upper()} STAGE - {details['name']}:"]
+        lines.extend(f"- {guideline}" for guideline in details["guidelines"])
+        lines.append("College-specific focus:")
+        lines.extend(f"- {focus}" for focus in details["college_specific"])
+        lines.append(textwrap.dedent(instructions).strip())
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) + "\n"
+
+
+BASELINE_USER_PROMPT_V2 = textwrap.dedent("""\
+    Stage: BASELINE. Create a comprehensive college-level lesson plan following the baseline slide structure.
+    Do not include UDL-specific accessibility features yet - they are added in the UDL stages.
+
+    Subject Area: $topic
+    Course Module: $chapter
+    Lesson Title: $lesson_title
+    Course Level: $course_level_context
+    Duration: $duration
+    Learning Objectives: $learning_objectives
+    """)
+
+UDL_USER_PROMPT_V2 = textwrap.dedent("""\
+    Stage: $principle_upper. Enhance this college-level lesson by applying the $principle_upper stage guidance
+    for adult learners. For each slide, add specific $principle enhancements while preserving all original
+    academic content, and mark new additions with [UDL-$principle_upper-COLLEGE] tags.
+
+    $lesson_text
+    """)
+
+
+def udl_system_prompt_name(principle: str) -> str:
+    return f"udl_system.{principle}"
+
+
+def _build_registry() -> PromptRegistry:
+    registry = PromptRegistry(settings.PROMPT_VERSION)
+    registry.register(PromptTemplate("baseline_system", BASE_PROMPT_VERSION, BASELINE_SYSTEM_PROMPT))
+    registry.register(PromptTemplate("baseline_user", BASE_PROMPT_VERSION, BASELINE_USER_PROMPT))
+    registry.register(PromptTemplate("udl_user", BASE_PROMPT_VERSION, UDL_USER_PROMPT))
+
+    # The UDL system prompt only varies by principle, so each one is rendered in full here
+    udl_system = Template(UDL_SYSTEM_PROMPT)
+    for principle, instructions in UDL_PRINCIPLE_INSTRUCTIONS.items():
+        text = udl_system.substitute(principle_upper=principle.upper(), principle_instructions=instructions)
+        registry.register(PromptTemplate(udl_system_prompt_name(principle), BASE_PROMPT_VERSION, text))
+
+    # v2: every stage sends the same system prompt
+    shared_system = SHARED_SYSTEM_PROMPT + "\nUDL PRINCIPLE GUIDANCE:\n\n" + college_udl_guidance()
+    for name in ["baseline_system"] + [udl_system_prompt_name(principle) for principle in UDL_PRINCIPLE_INSTRUCTIONS]:
+        registry.register(PromptTemplate(name, "v2", shared_system))
+    registry.register(PromptTemplate("baseline_user", "v2", BASELINE_USER_PROMPT_V2))
+    registry.register(PromptTemplate("udl_user", "v2", UDL_USER_PROMPT_V2))
+
+    if settings.PROMPT_TEMPLATES_DIR and os.path.isdir(settings.PROMPT_TEMPLATES_DIR):
+        registry.load_directory(settings.PROMPT_TEMPLATES_DIR)
+
+    return registry
+
+
+prompt_registry = _build_registry()
@@ -0,0 +1,210 @@
+# backend/app/services/rate_limiter.py
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.scheduler import SchedulerTimeout, build_scheduler
+
+
+def client_key(api_key: Optional[str], host: Optional[str]) -> str:
+    """Identity that per-client budgets (and idempotency keys) are scoped to"""
+    if api_key:
+        return f"key:{api_key}"
+    return f"ip:{host or 'unknown'}"
+
+
+class ModelCapacityError(Exception):
+    """Raised when a model call cannot get a provider slot within the queue timeout"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model provider capacity exhausted, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` tokens, refilled continuously at ``refill_rate`` per second.
+
+    Not thread-safe on its own; callers hold their limiter's lock.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds until ``amount`` tokens are available (0 if available now)"""
+        self._refill(time.monotonic() if now is None else now)
+        # A request larger than the whole bucket is charged as a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_rate <= 0:
+            return math.inf
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+def per_minute_bucket(per_minute: float, burst: Optional[float] = None) -> TokenBucket:
+    return TokenBucket(capacity=burst or per_minute, refill_rate=per_minute / 60.0)
+
+
+class ClientRateLimiter:
+    """Per-client request and estimated-token budgets for the API layer"""
+
+    def __init__(self, requests_per_minute: float, request_burst: float, tokens_per_minute: float,
+                 max_clients: int = 10000):
+        self.requests_per_minute = requests_per_minute
+        self.request_burst = request_burst
+        self.tokens_per_minute = tokens_per_minute
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[TokenBucket, TokenBucket]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, client_key: str) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(client_key)
+        if buckets is None:
+            buckets = (
+                per_minute_bucket(self.requests_per_minute, self.request_burst),
+                per_minute_bucket(self.tokens_per_minute),
+            )
+            self._buckets[client_key] = buckets
+            # Bound memory: forget the least recently seen clients (their buckets are full anyway)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_key)
+        return buckets
+
+    def check(self, client_key: str, estimated_tokens: float) -> float:
+        """Charge one request and ``estimated_tokens`` to the client.
+
+        Returns 0 when admitted, otherwise the Retry-After delay in seconds
+        (nothing is charged for rejected requests).
+        """
+        with self._lock:
+            request_bucket, token_bucket = self._buckets_for(client_key)
+            now = time.monotonic()
+            wait = max(request_bucket.wait_time(1, now), token_bucket.wait_time(estimated_tokens, now))
+            if wait > 0:
+                return wait
+            request_bucket.consume(1)
+            token_bucket.consume(estimated_tokens)
+            return 0.0
+
+    def refund(self, client_key: str, estimated_tokens: float):
+        """Give back what ``check`` charged, for a request the server turned away after admitting it"""
+        with self._lock:
+            buckets = self._buckets.get(client_key)
+            if buckets is None:
+                return
+            request_bucket, token_bucket = buckets
+            request_bucket.tokens = min(request_bucket.capacity, request_bucket.tokens + 1)
+            token_bucket.tokens = min(token_bucket.capacity,
+                                      token_bucket.tokens + min(estimated_tokens, token_bucket.capacity))
+
+
+class ModelCallLimiter:
+    """Process-wide gate around provider calls.
+
+    Bounds the number of concurrent model calls and paces them against the
+    provider's requests-per-minute and tokens-per-minute limits. Call slots
+    are handed out by priority class (see ``scheduler``), weighted by the
+    estimated tokens of each call.
+    """
+
+    def __init__(self, max_concurrent: int, rpm_limit: float, tpm_limit: float, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.scheduler = build_scheduler("model_calls", max_concurrent)
+        self._rpm = per_minute_bucket(rpm_limit)
+        self._tpm = per_minute_bucket(tpm_limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def admission_delay(self, estimated_tokens: float) -> float:
+        """Estimated wait for provider budget, without reserving anything"""
+        with self._lock:
+            now = time.monotonic()
+            return max(self._rpm.wait_time(1, now), self._tpm.wait_time(estimated_tokens, now))
+
+    def _reserve(self, estimated_tokens: float, deadline: float):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self._rpm.wait_time(1, now), self._tpm.wait_time(estimated_tokens, now))
+                if wait == 0:
+                    self._rpm.consume(1)
+                    self._tpm.consume(estimated_tokens)
+                    return
+            if now + wait > deadline:
+                raise ModelCapacityError(wait)
+            time.sleep(min(wait, 0.25))
+
+    @contextmanager
+    def acquire(self, estimated_tokens: float):
+        """Block until a call slot and provider budget are available, up to the queue timeout"""
+        deadline = time.monotonic() + self.queue_timeout
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(self.scheduler.acquire(
+                    cost=max(1.0, estimated_tokens / 1000), timeout=self.queue_timeout
+                ))
+            except SchedulerTimeout:
+                raise ModelCapacityError(self.queue_timeout)
+
+            self._reserve(estimated_tokens, deadline)
+            with self._lock:
+                self.in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: float):
+        """Reconcile the TPM budget once the provider reports real token usage"""
+        with self._lock:
+            self._tpm.tokens = min(self._tpm.capacity, self._tpm.tokens + estimated_tokens - actual_tokens)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrent": self.max_concurrent,
+                "rpm_available": round(self._rpm.tokens, 1),
+                "tpm_available": round(self._tpm.tokens, 1),
+                "scheduler": self.scheduler.stats(),
+            }
+
+
+def estimate_tokens(text_chars: int, max_tokens: int = 0) -> int:
+    """Rough token estimate (about 4 characters per token) plus the completion budget"""
+    return text_chars // 4 + max_tokens
+
+
+client_rate_limiter = ClientRateLimiter(
+    requests_per_minute=settings.RATE_LIMIT_REQUESTS_PER_MINUTE,
+    request_burst=settings.RATE_LIMIT_REQUEST_BURST,
+    tokens_per_minute=settings.RATE_LIMIT_TOKENS_PER_MINUTE,
+)
+
+model_call_limiter = ModelCallLimiter(
+    max_concurrent=settings.MAX_CONCURRENT_MODEL_CALLS,
+    rpm_limit=settings.OPENAI_RPM_LIMIT,
+    tpm_limit=settings.OPENAI_TPM_LIMIT,
+    queue_timeout=settings.MODEL_CALL_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,239 @@
+# backend/app/services/request_index.py
+import hashlib
+import re
+import threading
+import uuid
+from typing import Dict, Iterable, List, Set, Tuple
+
+from app.core.config import settings
+from app.models.lesson import CourseLevelType, LessonRequest
+
+# numpy is imported inside the methods that need it, so it does not add to startup time
+
+MINHASH_SEED = 20240917
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Spellings teachers use interchangeably; applied per word before comparison
+WORD_ALIASES = {
+    "intro": "introduction", "introductory": "introduction", "fundamentals": "introduction",
+    "basics": "introduction", "bio": "biology", "chem": "chemistry", "econ": "economics",
+    "stats": "statistics", "stat": "statistics", "calc": "calculus", "psych": "psychology",
+    "math": "mathematics", "maths": "mathematics", "cs": "computer", "ch": "chapter",
+    "chap": "chapter", "pt": "part", "vs": "versus", "adv": "advanced",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "by", "at", "from", "into",
+    "is", "are", "be", "as", "or", "its", "their", "how", "what", "students", "will", "able",
+}
+
+COURSE_LEVEL_CODES = {level.value: code for code, level in enumerate(CourseLevelType)}
+UNKNOWN_COURSE_LEVEL = 255
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lower-case words with aliases expanded, stopwords dropped and plurals folded"""
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("&", " and ")):
+        word = WORD_ALIASES.get(word, word)
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def request_tokens(lesson_request: LessonRequest) -> Set[str]:
+    """The set compared between requests: field-tagged words, so word order and objective order do not matter"""
+    tokens = set()
+    for prefix, text in (("t", lesson_request.topic), ("c", lesson_request.chapter),
+                         ("l", lesson_request.lesson_title), ("o", lesson_request.learning_objectives)):
+        tokens.update(f"{prefix}:{word}" for word in normalize_words(text))
+    return tokens
+
+
+class RequestIndex:
+    """MinHash/LSH index of past lesson requests, for finding near-duplicates before generating
+
+    Each request becomes a MinHash signature over its normalized token set.
+    Signatures are kept as b-bit (16-bit) values in one NumPy array, and the
+    LSH band keys (``bands`` bands of ``num_perm / bands`` rows) in another,
+    with per-band sorted copies of the keys (and their rows) for binary
+    search, so an entry costs about ``num_perm * 2 + bands * 12 + 18``
+    bytes. The sorted copies are rebuilt once enough new entries
+    accumulate; newer entries are scanned directly until then. Candidates
+    are confirmed by estimated Jaccard similarity and must match the course
+    level and be within one complexity level.
+
+    Once ``capacity`` entries are held the oldest are overwritten, which
+    bounds memory regardless of how many requests have been archived.
+    """
+
+    def __init__(self, capacity: int, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.capacity = capacity
+        self.num_perm = num_perm
+        self.bands = bands
+        self._lock = threading.Lock()
+        self._allocated = 0
+        self._count = 0
+        self._next = 0
+        self._recent: List[int] = []
+        self._sorted_keys = None
+        self._sorted_rows = None
+        self._permutations = None
+        self.lookups = 0
+        self.hits = 0
+
+    def _arrays(self, size: int):
+        import numpy as np
+
+        if self._permutations is None:
+            rng = np.random.default_rng(MINHASH_SEED)
+            # a * x + b stays below 2**64 for 32-bit x, so uint64 arithmetic cannot wrap
+            self._permutations = (
+                rng.integers(1, 1 << 32, size=self.num_perm, dtype=np.uint64),
+                rng.integers(0, 1 << 32, size=self.num_perm, dtype=np.uint64),
+            )
+            self._band_multipliers = rng.integers(1, 1 << 32, size=self.num_perm // self.bands, dtype=np.uint64)
+            self._signatures = np.zeros((0, self.num_perm), dtype=np.uint16)
+            self._band_keys = np.zeros((0, self.bands), dtype=np.uint32)
+            self._lesson_ids = np.zeros((0, 16), dtype=np.uint8)
+            self._course_levels = np.zeros(0, dtype=np.uint8)
+            self._complexity = np.zeros(0, dtype=np.uint8)
+
+        if size > self._allocated:
+            new_size = min(self.capacity, max(size, self._allocated * 2, 1024))
+            grow = new_size - self._allocated
+            self._signatures = np.vstack([self._signatures, np.zeros((grow, self.num_perm), dtype=np.uint16)])
+            self._band_keys = np.vstack([self._band_keys, np.zeros((grow, self.bands), dtype=np.uint32)])
+            self._lesson_ids = np.vstack([self._lesson_ids, np.zeros((grow, 16), dtype=np.uint8)])
+            self._course_levels = np.concatenate([self._course_levels, np.zeros(grow, dtype=np.uint8)])
+            self._complexity = np.concatenate([self._complexity, np.zeros(grow, dtype=np.uint8)])
+            self._allocated = new_size
+
+    def signature(self, lesson_request: LessonRequest):
+        """(full 32-bit MinHash signature, LSH band keys) of ``lesson_request``"""
+        import numpy as np
+
+        with self._lock:
+            self._arrays(0)
+        tokens = request_tokens(lesson_request) or {""}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little") for token in tokens),
+            dtype=np.uint64, count=len(tokens)
+        )
+        a, b = self._permutations
+        permuted = (np.outer(hashes, a) + b) % np.uint64(MERSENNE_PRIME)
+        signature = (permuted & np.uint64(0xFFFFFFFF)).min(axis=0)
+        rows = signature.reshape(self.bands, -1)
+        band_keys = ((rows * self._band_multipliers).sum(axis=1) >> np.uint64(32)).astype(np.uint32)
+        return signature, band_keys
+
+    def add(self, lesson_request: LessonRequest, lesson_id: str):
+        signature, band_keys = self.signature(lesson_request)
+        with self._lock:
+            if self._count < self.capacity:
+                self._arrays(self._count + 1)
+                self._count += 1
+            row = self._next
+            self._next = (self._next + 1) % self.capacity
+
+            self._signatures[row] = signature.astype("uint16")
+            self._band_keys[row] = band_keys
+            self._lesson_ids[row] = list(uuid.UUID(lesson_id).bytes)
+            self._course_levels[row] = COURSE_LEVEL_CODES.get(lesson_request.course_level, UNKNOWN_COURSE_LEVEL)
+            self._complexity[row] = lesson_request.complexity_level or 0
+            self._recent.append(row)
+            if len(self._recent) > max(1024, self._count // 8):
+                self._rebuild()
+
+    def _rebuild(self):
+        import numpy as np
+
+        keys = self._band_keys[:self._count].T
+        self._sorted_rows = np.argsort(keys, axis=1, kind="stable").astype(np.int32)
+        self._sorted_keys = np.take_along_axis(keys, self._sorted_rows, axis=1)
+        self._recent = []
+
+    def load(self, entries: Iterable[Tuple[str, LessonRequest]]) -> int:
+        """Index (lesson_id, request) pairs, oldest first; returns how many were added"""
+        added = 0
+        for lesson_id, lesson_request in entries:
+            self.add(lesson_request, lesson_id)
+            added += 1
+        with self._lock:
+            if self._count:
+                self._rebuild()
+        return added
+
+    def similar(self, lesson_request: LessonRequest, threshold: float, limit: int = 5) -> List[Tuple[str, float]]:
+        """Indexed lessons whose requests are at least ``threshold`` similar, most similar first"""
+        import numpy as np
+
+        signature, band_keys = self.signature(lesson_request)
+        course_level = COURSE_LEVEL_CODES.get(lesson_request.course_level, UNKNOWN_COURSE_LEVEL)
+        with self._lock:
+            self.lookups += 1
+            if not self._count:
+                return []
+
+            candidates = []
+            if self._sorted_keys is not None:
+                for band in range(self.bands):
+                    keys = self._sorted_keys[band]
+                    start, end = np.searchsorted(keys, band_keys[band], "left"), np.searchsorted(
+                        keys, band_keys[band], "right")
+                    rows = self._sorted_rows[band, start:end]
+                    # Rows overwritten since the last rebuild no longer carry the key
+                    candidates.append(rows[self._band_keys[rows, band] == band_keys[band]])
+            if self._recent:
+                recent = np.array(self._recent, dtype=np.int32)
+                candidates.append(recent[(self._band_keys[recent] == band_keys).any(axis=1)])
+
+            rows = np.unique(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int32)
+            rows = rows[(self._course_levels[rows] == course_level)
+                        & (np.abs(self._complexity[rows].astype(np.int16) - (lesson_request.complexity_level or 0)) <= 1)]
+            if not len(rows):
+                return []
+
+            # b-bit estimate: unrelated signatures agree on 16 bits with probability 2**-16
+            agreement = (self._signatures[rows] == signature.astype(np.uint16)).mean(axis=1)
+            similarity = (agreement - 2 ** -16) / (1 - 2 ** -16)
+            keep = similarity >= threshold
+            rows, similarity = rows[keep], similarity[keep]
+            order = np.argsort(-similarity, kind="stable")
+            lesson_ids = self._lesson_ids[rows[order]]
+
+        matches: Dict[str, float] = {}
+        for raw_id, score in zip(lesson_ids, similarity[order]):
+            lesson_id = str(uuid.UUID(bytes=raw_id.tobytes()))
+            if lesson_id not in matches:
+                matches[lesson_id] = round(float(score), 4)
+            if len(matches) == limit:
+                break
+        if matches:
+            self.hits += 1
+        return list(matches.items())
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            allocated_bytes = 0
+            if self._permutations is not None:
+                allocated_bytes = sum(array.nbytes for array in (
+                    self._signatures, self._band_keys, self._lesson_ids, self._course_levels, self._complexity
+                ))
+                if self._sorted_keys is not None:
+                    allocated_bytes += self._sorted_keys.nbytes + self._sorted_rows.nbytes
+            return {
+                "entries": self._count,
+                "capacity": self.capacity,
+                "memory_bytes": allocated_bytes,
+                "lookups": self.lookups,
+                "hits": self.hits,
+            }
+
+
+similar_requests = RequestIndex(settings.SIMILAR_REQUESTS_CAPACITY)
@@ -0,0 +1,276 @@
+# backend/app/services/resilience.py
+import contextvars
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+from app.services.rate_limiter import ModelCapacityError
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+# The provider answers these, but they say nothing about its health (every call fails until the key is fixed)
+AUTH_STATUS_CODES = {401, 403}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient provider failures worth another attempt"""
+    # The SDK is imported lazily; if it is not loaded yet, the error cannot be one of its exceptions
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def provider_answered(error: Exception) -> bool:
+    """Whether the provider itself rejected the request (a 4xx other than auth), so it is not degraded"""
+    openai = sys.modules.get("openai")
+    if openai is None or not isinstance(error, openai.APIStatusError):
+        return False
+    return 400 <= error.status_code < 500 and error.status_code not in AUTH_STATUS_CODES
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Server-requested delay in seconds, if the error carries one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None  # HTTP-date form is not used by the provider
+    return None
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1)
+        return ordered[max(0, index)]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Give up the half-open probe without an outcome, e.g. when it never reached the provider"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Record a failed call; returns True when this failure opened the circuit"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                opened = self.state != self.OPEN
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class ResilientCaller:
+    """Retries, optional hedging and a circuit breaker around a blocking provider call.
+
+    ModelCapacityError is raised by our own call limiter, not the provider, so
+    it is re-raised as-is: it is neither retried nor counted by the breaker.
+    Of the errors that are not retried, only a provider's own 4xx answer
+    counts as a healthy response; anything else (auth errors, local bugs)
+    leaves the breaker as it was.
+    Every outcome is counted in ``outcomes`` so the health endpoint can report them.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float,
+                 breaker: CircuitBreaker, hedge_enabled: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20, hedge_workers: int = 8):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.outcomes = Counter()
+        self._outcomes_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="model-hedge")
+
+    def _count(self, outcome: str):
+        with self._outcomes_lock:
+            self.outcomes[outcome] += 1
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given (1-based) attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = fn()
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _call_with_hedge(self, fn: Callable[[], T]) -> T:
+        hedge_after = None
+        if self.hedge_enabled:
+            hedge_after = self.latency.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if hedge_after is None:
+            return self._timed(fn)
+
+        # Pool threads do not inherit context variables, such as the caller's scheduling priority
+        context = contextvars.copy_context()
+        primary = self._hedge_pool.submit(context.run, self._timed, fn)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedge_launched")
+        hedge = self._hedge_pool.submit(contextvars.copy_context().run, self._timed, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_won")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, fn: Callable[[], T]) -> T:
+        if not self.breaker.allow():
+            self._count("circuit_rejected")
+            raise CircuitOpenError("Model provider circuit is open; serving fallback content")
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = self._call_with_hedge(fn)
+            except ModelCapacityError:
+                self._count("capacity_rejected")
+                # If this was the half-open probe, it never reached the provider; let the next call probe
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                retry_after = get_retry_after(e)
+                give_up = (
+                    not is_retryable(e)
+                    or attempt >= self.max_attempts
+                    or (retry_after is not None and retry_after > self.max_delay)
+                )
+                if give_up:
+                    self._count("failure")
+                    if is_retryable(e):
+                        if self.breaker.record_failure():
+                            self._count("circuit_opened")
+                    elif provider_answered(e):
+                        # The provider answered (e.g. a 400), so it is not degraded
+                        self.breaker.record_success()
+                    else:
+                        # An auth error or a local bug says nothing about the provider; leave the state as is
+                        self.breaker.release_probe()
+                    raise
+
+                self._count("retry")
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+                print(f"Model call failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+                continue
+
+            self._count("success" if attempt == 1 else "success_after_retry")
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, object]:
+        with self._outcomes_lock:
+            outcomes = dict(self.outcomes)
+        p95 = self.latency.percentile(95.0)
+        return {
+            "outcomes": outcomes,
+            "circuit_state": self.breaker.state,
+            "p95_latency_s": round(p95, 3) if p95 is not None else None,
+        }
+
+
+model_resilience = ResilientCaller(
+    max_attempts=settings.MODEL_RETRY_MAX_ATTEMPTS,
+    base_delay=settings.MODEL_RETRY_BASE_DELAY,
+    max_delay=settings.MODEL_RETRY_MAX_DELAY,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+    ),
+    hedge_enabled=settings.MODEL_HEDGE_ENABLED,
+    hedge_percentile=settings.MODEL_HEDGE_PERCENTILE,
+    hedge_min_samples=settings.MODEL_HEDGE_MIN_SAMPLES,
+)
@@ -0,0 +1,268 @@
+# backend/app/services/scheduler.py
+import asyncio
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Union
+
+from app.core.config import settings
+
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BACKGROUND = "background"
+PRIORITY_LEVELS = (INTERACTIVE, NORMAL, BACKGROUND)
+
+_schedulers: List["PriorityScheduler"] = []
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a slot could not be obtained within the timeout"""
+
+
+class WorkPriority:
+    """Priority of one unit of work (a request, a speculative call, a pre-render)
+
+    Shared by everything the work waits on, so raising it (for example when
+    a teacher starts waiting on a speculative result) re-queues its pending
+    requests in every scheduler at the new level.
+    """
+
+    def __init__(self, level: str = NORMAL):
+        if level not in PRIORITY_LEVELS:
+            raise ValueError(f"Unknown priority level: {level}")
+        self.level = level
+
+    def promote(self, level: str):
+        if PRIORITY_LEVELS.index(level) < PRIORITY_LEVELS.index(self.level):
+            self.level = level
+            for scheduler in _schedulers:
+                scheduler._reprioritize(self)
+
+
+_current_priority: ContextVar[Optional[WorkPriority]] = ContextVar("work_priority", default=None)
+
+
+def current_priority() -> WorkPriority:
+    """Priority of the work running in this context (normal unless set)"""
+    priority = _current_priority.get()
+    return priority if priority is not None else WorkPriority(NORMAL)
+
+
+@contextmanager
+def priority_scope(priority: Union[str, WorkPriority]):
+    """Run the enclosed work (and tasks or threads started from it) at ``priority``"""
+    work = priority if isinstance(priority, WorkPriority) else WorkPriority(priority)
+    token = _current_priority.set(work)
+    try:
+        yield work
+    finally:
+        _current_priority.reset(token)
+
+
+class _Waiter:
+    def __init__(self, work: WorkPriority, cost: float, start_tag: float, seq: int, notify: Callable[[], None]):
+        self.work = work
+        self.level = work.level
+        self.cost = cost
+        self.start_tag = start_tag
+        self.seq = seq
+        self.notify = notify
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class Slot:
+    """A granted unit of capacity; background holders should call ``checkpoint`` between steps"""
+
+    def __init__(self, scheduler: "PriorityScheduler", work: WorkPriority, cost: float):
+        self.scheduler = scheduler
+        self.work = work
+        self.level = work.level
+        self.cost = cost
+
+    def should_yield(self) -> bool:
+        return self.scheduler._should_yield(self)
+
+    def checkpoint(self):
+        """Give the slot up to higher-priority work that is waiting, then queue for it again"""
+        if self.should_yield():
+            self.scheduler._preempt(self)
+
+
+class PriorityScheduler:
+    """Weighted fair queueing over a fixed number of slots, with background preemption.
+
+    Each request gets a start tag in its class's virtual time (advanced by
+    cost / weight), and free slots go to the smallest tag, so busy classes
+    share capacity by weight instead of first come, first served. Background
+    work may hold at most ``background_slots`` slots, leaving the rest for
+    interactive and normal work, and is expected to call ``Slot.checkpoint``
+    at safe points so it steps aside while others wait. Calls that are
+    already running are never interrupted.
+    """
+
+    def __init__(self, name: str, slots: int, weights: Dict[str, float], background_slots: int):
+        self.name = name
+        self.slots = slots
+        self.weights = weights
+        self.background_slots = max(1, min(background_slots, slots))
+        self._lock = threading.Lock()
+        self._waiting: List[_Waiter] = []
+        self._running = Counter()
+        self._holders: List[Slot] = []
+        self._virtual_time = 0.0
+        self._class_finish = {level: 0.0 for level in PRIORITY_LEVELS}
+        self._seq = 0
+        self.granted = Counter()
+        self.wait_seconds = Counter()
+        self.preempted = 0
+        _schedulers.append(self)
+
+    def _tag(self, level: str, cost: float) -> float:
+        start = max(self._virtual_time, self._class_finish[level])
+        self._class_finish[level] = start + cost / self.weights[level]
+        return start
+
+    def _eligible(self, level: str) -> bool:
+        return level != BACKGROUND or self._running[BACKGROUND] < self.background_slots
+
+    def _dispatch(self):
+        while sum(self._running.values()) < self.slots:
+            candidates = [waiter for waiter in self._waiting if self._eligible(waiter.level)]
+            if not candidates:
+                return
+            waiter = min(candidates, key=lambda w: (w.start_tag, PRIORITY_LEVELS.index(w.level), w.seq))
+            self._waiting.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._running[waiter.level] += 1
+            self.granted[waiter.level] += 1
+            self.wait_seconds[waiter.level] += time.monotonic() - waiter.enqueued_at
+            waiter.granted = True
+            waiter.notify()
+
+    def _enqueue(self, work: WorkPriority, cost: float, notify: Callable[[], None]) -> _Waiter:
+        with self._lock:
+            self._seq += 1
+            waiter = _Waiter(work, cost, self._tag(work.level, cost), self._seq, notify)
+            self._waiting.append(waiter)
+            self._dispatch()
+            return waiter
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Stop waiting; returns False if the slot was granted in the meantime"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiting.remove(waiter)
+            return True
+
+    def _granted_slot(self, waiter: _Waiter) -> Slot:
+        slot = Slot(self, waiter.work, waiter.cost)
+        slot.level = waiter.level
+        with self._lock:
+            self._holders.append(slot)
+        return slot
+
+    def _release(self, slot: Slot):
+        with self._lock:
+            self._holders.remove(slot)
+            self._running[slot.level] -= 1
+            self._dispatch()
+
+    def _reprioritize(self, work: WorkPriority):
+        with self._lock:
+            for waiter in self._waiting:
+                if waiter.work is work and waiter.level != work.level:
+                    waiter.level = work.level
+                    waiter.start_tag = self._tag(work.level, waiter.cost)
+            for slot in self._holders:
+                if slot.work is work and slot.level != work.level:
+                    self._running[slot.level] -= 1
+                    self._running[work.level] += 1
+                    slot.level = work.level
+            self._dispatch()
+
+    def _should_yield(self, slot: Slot) -> bool:
+        with self._lock:
+            return (slot.level == BACKGROUND
+                    and sum(self._running.values()) >= self.slots
+                    and any(waiter.level != BACKGROUND for waiter in self._waiting))
+
+    def _preempt(self, slot: Slot):
+        """Release ``slot`` and block until it is granted again (called from a worker thread)"""
+        self._release(slot)
+        with self._lock:
+            self.preempted += 1
+        event = threading.Event()
+        waiter = self._enqueue(slot.work, slot.cost, event.set)
+        event.wait()
+        slot.level = waiter.level
+        with self._lock:
+            self._holders.append(slot)
+
+    @contextmanager
+    def acquire(self, cost: float = 1.0, timeout: Optional[float] = None, work: Optional[WorkPriority] = None):
+        """Blocking acquire for worker threads, at the current context's priority unless ``work`` is given"""
+        event = threading.Event()
+        waiter = self._enqueue(work or current_priority(), cost, event.set)
+        if not event.wait(timeout) and self._withdraw(waiter):
+            raise SchedulerTimeout(f"No {self.name} slot within {timeout}s")
+        slot = self._granted_slot(waiter)
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    @asynccontextmanager
+    async def acquire_async(self, cost: float = 1.0, timeout: Optional[float] = None,
+                            work: Optional[WorkPriority] = None):
+        """Event-loop variant of ``acquire``"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enqueue(work or current_priority(), cost, notify)
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if self._withdraw(waiter):
+                if isinstance(e, asyncio.TimeoutError):
+                    raise SchedulerTimeout(f"No {self.name} slot within {timeout}s")
+                raise
+            # Granted while giving up: hand the slot straight back
+            self._release(self._granted_slot(waiter))
+            raise
+        slot = self._granted_slot(waiter)
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "background_slots": self.background_slots,
+                "running": {level: self._running[level] for level in PRIORITY_LEVELS},
+                "waiting": {level: sum(1 for w in self._waiting if w.level == level) for level in PRIORITY_LEVELS},
+                "granted": dict(self.granted),
+                "mean_wait_ms": {
+                    level: round(self.wait_seconds[level] / self.granted[level] * 1000, 2)
+                    for level in self.granted
+                },
+                "preempted": self.preempted,
+            }
+
+
+def build_scheduler(name: str, slots: int) -> PriorityScheduler:
+    """Scheduler using the configured class weights and background share"""
+    return PriorityScheduler(
+        name,
+        slots,
+        settings.SCHEDULER_WEIGHTS,
+        background_slots=int(slots * settings.SCHEDULER_BACKGROUND_SHARE)
+    )
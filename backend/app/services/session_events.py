@@ -0,0 +1,69 @@
+# backend/app/services/session_events.py
+import asyncio
+from typing import Any, Dict, Set
+
+from app.core.config import settings
+
+
+class SessionEventHub:
+    """Fan-out of lesson session events to connected WebSocket clients
+
+    Every subscriber has a bounded queue. A client that falls behind loses its
+    backlog and receives a single ``resync`` event instead, after which it
+    should request a fresh snapshot.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self, session_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[session_id]
+
+    def publish(self, session_id: str, event: Dict[str, Any]):
+        """Queue ``event`` for every client of the session (never blocks)"""
+        subscribers = self._subscribers.get(session_id)
+        if not subscribers:
+            return
+        self.published += 1
+        for queue in subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "reason": "client fell behind"})
+                self.resyncs += 1
+
+    def close(self, session_id: str, reason: str):
+        """Tell the session's clients it is gone; their sockets close after this event"""
+        for queue in self._subscribers.pop(session_id, set()):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "session_closed", "reason": reason})
+
+    def has_subscribers(self, session_id: str) -> bool:
+        return bool(self._subscribers.get(session_id))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+session_events = SessionEventHub(settings.WS_EVENT_QUEUE_SIZE)
@@ -0,0 +1,434 @@
+# backend/app/services/session_store.py
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.lesson import LessonRequest, load_stored_lesson
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this worker, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SessionFootprint:
+    """Serialized size of a session's parts, re-measured only where they changed
+
+    Sessions are almost entirely strings (slides, notes and edit history
+    snapshots), so their JSON size tracks the memory they retain closely.
+    The lesson is re-measured when the session version moves, and the edit
+    history (append-only) only for its new entries.
+    """
+
+    def __init__(self):
+        self.request_bytes = 0
+        self.lesson_bytes = 0
+        self.history_bytes = 0
+        self.history_entries = 0
+        self._request = None
+        self._lesson_key = None
+
+    @property
+    def total(self) -> int:
+        return self.request_bytes + self.lesson_bytes + self.history_bytes
+
+    def update(self, session: Dict) -> int:
+        if session["request"] is not self._request:
+            self._request = session["request"]
+            self.request_bytes = len(self._request.model_dump_json())
+
+        lesson_key = (session["version"], id(session["lesson_content"]))
+        if lesson_key != self._lesson_key:
+            self._lesson_key = lesson_key
+            self.lesson_bytes = len(session["lesson_content"].model_dump_json())
+
+        history = session["edit_history"]
+        if len(history) < self.history_entries:
+            self.history_bytes, self.history_entries = 0, 0
+        for entry in history[self.history_entries:]:
+            self.history_bytes += len(orjson.dumps(entry, default=str))
+        self.history_entries = len(history)
+        return self.total
+
+
+class LessonSessionStore:
+    """In-memory lesson sessions (in production, use Redis or database)
+
+    Behaves like the plain dict the endpoints used before, and additionally
+    tracks a monotonically increasing version per session plus the version at
+    which each slide last changed, so clients can fetch only what changed.
+
+    Each session's serialized size is accounted for. ``admit`` is checked
+    before a new session is created: past ``spill_threshold`` of the memory
+    limit, sessions idle for ``spill_idle`` seconds are written to disk
+    (least recently used first) and read back transparently on their next
+    access; if the sessions still fill the limit, the new one is refused.
+    Spills are measured, serialized and written in the threadpool, and only
+    take effect if the session was not used meanwhile. Endpoints call
+    ``ensure_loaded`` first, which reads a spilled session back in the
+    threadpool too; plain ``in`` and ``[]`` still restore one synchronously.
+    A spilled session is restored exactly as it was (see
+    ``load_stored_lesson``); one that cannot be read back is dropped and
+    reported as missing rather than failing every access.
+    """
+
+    def __init__(self, memory_limit: int, spill_threshold: float, spill_idle: float, spill_root: str):
+        self.memory_limit = memory_limit
+        self.spill_threshold = spill_threshold
+        self.spill_idle = spill_idle
+        self.spill_root = spill_root
+        # Least recently used first
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._footprints: Dict[str, SessionFootprint] = {}
+        # Spilled session id -> bytes on disk, and which spill (of ``spills``) wrote it
+        self._spilled: Dict[str, int] = {}
+        self._spill_serials: Dict[str, int] = {}
+        self._spill_dir: Optional[str] = None
+        # Sessions being written out by an admit() in the threadpool
+        self._spilling: set = set()
+        # Footprints are updated from the threadpool (admit) as well as the event loop
+        self._measure_lock = threading.Lock()
+        self.spills = 0
+        self.restores = 0
+        self.restore_failures = 0
+        self.rejections = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        if session_id in self._spilled:
+            # Read it back now, so a spill that cannot be restored is a missing session, not a 500
+            return self._restore(session_id)
+        return session_id in self._sessions
+
+    async def ensure_loaded(self, session_id: str) -> bool:
+        """Whether the session exists, reading it back in the threadpool if it was spilled"""
+        serial = self._spill_serials.get(session_id)
+        if serial is None:
+            return session_id in self._sessions
+
+        session = await run_in_threadpool(self._read_spill, session_id)
+        if self._spill_serials.get(session_id) != serial:
+            # Restored, replaced, deleted or spilled again while it was read; that outcome stands
+            return session_id in self
+        if session is None:
+            self._drop_unreadable(session_id)
+            return False
+        self._install_restored(session_id, session)
+        return True
+
+    def __getitem__(self, session_id: str) -> Dict:
+        if session_id in self._spilled and not self._restore(session_id):
+            raise KeyError(session_id)
+        session = self._sessions[session_id]
+        self._touch(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict):
+        slide_count = len(session["lesson_content"].slides)
+        session.setdefault("version", 1)
+        session.setdefault("structure_version", session["version"])
+        session.setdefault("slide_versions", [session["version"]] * slide_count)
+        self._discard_spilled(session_id)
+        self._sessions[session_id] = session
+        self._footprints[session_id] = SessionFootprint()
+        self._touch(session_id)
+
+    def __delitem__(self, session_id: str):
+        if session_id in self._spilled:
+            self._discard_spilled(session_id)
+        else:
+            del self._sessions[session_id]
+        self._last_used.pop(session_id, None)
+        self._footprints.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions) + len(self._spilled)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions) + list(self._spilled))
+
+    def get(self, session_id: str, default=None) -> Optional[Dict]:
+        if session_id not in self:
+            return default
+        return self[session_id]
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.monotonic()
+
+    def memory_bytes(self) -> int:
+        """Serialized size of the sessions held in memory"""
+        return self._measure(self._measured_sessions())
+
+    def _measured_sessions(self) -> List[Tuple[SessionFootprint, Dict]]:
+        return [(self._footprints[session_id], session) for session_id, session in self._sessions.items()]
+
+    def _measure(self, sessions: List[Tuple[SessionFootprint, Dict]]) -> int:
+        with self._measure_lock:
+            return sum(footprint.update(session) for footprint, session in sessions)
+
+    async def admit(self) -> bool:
+        """Whether a new session fits under the memory limit, spilling cold sessions first if needed"""
+        if not self.memory_limit:
+            return True
+
+        # Changed sessions are re-serialized to measure them, so not on the event loop
+        used = await run_in_threadpool(self._measure, self._measured_sessions())
+        if used >= self.memory_limit * self.spill_threshold:
+            for session_id, session, last_used in self._cold_sessions(used, self.memory_limit * self.spill_threshold):
+                size = self._footprints[session_id].total
+                self._spilling.add(session_id)
+                try:
+                    payload_size = await run_in_threadpool(self._write_spill, session_id, session)
+                    if payload_size is not None and self._commit_spill(session_id, session, last_used, payload_size):
+                        used -= size
+                finally:
+                    self._spilling.discard(session_id)
+
+        expected = used + (used // len(self._sessions) if self._sessions else 0)
+        if expected >= self.memory_limit:
+            self.rejections += 1
+            return False
+        return True
+
+    def _cold_sessions(self, used: int, target: float) -> List[Tuple[str, Dict, float]]:
+        """(id, session, last use) of the idle sessions to spill to get ``used`` under ``target``"""
+        now = time.monotonic()
+        cold = []
+        for session_id, session in self._sessions.items():
+            if used < target or now - self._last_used[session_id] < self.spill_idle:
+                break  # the remaining sessions were used more recently
+            if session_id in self._spilling:
+                continue
+            cold.append((session_id, session, self._last_used[session_id]))
+            used -= self._footprints[session_id].total
+        return cold
+
+    def _spill_path(self, session_id: str) -> str:
+        if self._spill_dir is None:
+            # One directory per worker process, removed when it exits
+            os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=self.spill_root)
+            atexit.register(shutil.rmtree, self._spill_dir, True)
+        return os.path.join(self._spill_dir, f"{session_id}.json")
+
+    def _write_spill(self, session_id: str, session: Dict) -> Optional[int]:
+        """Write ``session`` to its spill file (run in the threadpool); returns the bytes written"""
+        data: Dict[str, Any] = dict(session)
+        data["request"] = session["request"].model_dump(mode="json")
+        data["lesson_content"] = session["lesson_content"].model_dump(mode="json")
+        path = self._spill_path(session_id)
+        try:
+            payload = orjson.dumps(data, default=str)
+            with open(path + ".tmp", "wb") as spill_file:
+                spill_file.write(payload)
+            os.replace(path + ".tmp", path)
+        except (OSError, TypeError) as e:
+            print(f"Error spilling session {session_id}: {e}")
+            return None
+        return len(payload)
+
+    def _commit_spill(self, session_id: str, session: Dict, last_used: float, size: int) -> bool:
+        """Drop a written-out session from memory, unless it was used or replaced while it was written"""
+        if self._sessions.get(session_id) is not session or self._last_used.get(session_id) != last_used:
+            try:
+                os.remove(self._spill_path(session_id))
+            except OSError:
+                pass
+            return False
+
+        del self._sessions[session_id]
+        del self._footprints[session_id]
+        self._spilled[session_id] = size
+        self.spills += 1
+        self._spill_serials[session_id] = self.spills
+        return True
+
+    def _restore(self, session_id: str) -> bool:
+        """Read a spilled session back into memory; if it cannot be read, drop it and return False"""
+        session = self._read_spill(session_id)
+        if session is None:
+            self._drop_unreadable(session_id)
+            return False
+        self._install_restored(session_id, session)
+        return True
+
+    def _read_spill(self, session_id: str) -> Optional[Dict]:
+        """Load a spilled session from disk (safe in the threadpool); None if it cannot be read"""
+        try:
+            with open(self._spill_path(session_id), "rb") as spill_file:
+                session = orjson.loads(spill_file.read())
+            session["request"] = LessonRequest.model_validate(session["request"])
+            session["lesson_content"] = load_stored_lesson(session["lesson_content"])
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error restoring spilled session {session_id}; dropping it: {e}")
+            return None
+        return session
+
+    def _install_restored(self, session_id: str, session: Dict):
+        self._discard_spilled(session_id)
+        self._sessions[session_id] = session
+        self._footprints[session_id] = SessionFootprint()
+        self.restores += 1
+
+    def _drop_unreadable(self, session_id: str):
+        self._discard_spilled(session_id)
+        self._last_used.pop(session_id, None)
+        self._footprints.pop(session_id, None)
+        self.restore_failures += 1
+
+    def _discard_spilled(self, session_id: str):
+        self._spill_serials.pop(session_id, None)
+        if self._spilled.pop(session_id, None) is not None:
+            try:
+                os.remove(self._spill_path(session_id))
+            except OSError:
+                pass
+
+    def memory(self, session_id: str) -> Optional[Dict[str, object]]:
+        """Memory accounting of one session, without reading it back if it was spilled"""
+        if session_id in self._spilled:
+            return {
+                "session_id": session_id,
+                "spilled": True,
+                "disk_bytes": self._spilled[session_id],
+                "idle_seconds": round(time.monotonic() - self._last_used[session_id], 1),
+            }
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        footprint = self._footprints[session_id]
+        self._measure([(footprint, session)])
+        return {
+            "session_id": session_id,
+            "spilled": False,
+            "bytes": footprint.total,
+            "request_bytes": footprint.request_bytes,
+            "lesson_bytes": footprint.lesson_bytes,
+            "edit_history_bytes": footprint.history_bytes,
+            "edit_history_entries": footprint.history_entries,
+            "idle_seconds": round(time.monotonic() - self._last_used[session_id], 1),
+        }
+
+    def largest(self, limit: int) -> List[Dict[str, object]]:
+        """Memory accounting of the ``limit`` largest in-memory sessions"""
+        self.memory_bytes()
+        session_ids = sorted(self._sessions, key=lambda session_id: self._footprints[session_id].total, reverse=True)
+        return [self.memory(session_id) for session_id in session_ids[:limit]]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_memory": len(self._sessions),
+            "spilled": len(self._spilled),
+            "memory_bytes": self.memory_bytes(),
+            "memory_limit_bytes": self.memory_limit,
+            "spilled_bytes": sum(self._spilled.values()),
+            "spills": self.spills,
+            "restores": self.restores,
+            "restore_failures": self.restore_failures,
+            "rejections": self.rejections,
+            "process_rss_bytes": process_rss_bytes(),
+        }
+
+
+def mark_slides_changed(session: Dict, slide_indexes: Iterable[int]) -> int:
+    """Bump the session version for edits confined to the given slides"""
+    session["version"] += 1
+    for index in slide_indexes:
+        session["slide_versions"][index] = session["version"]
+    return session["version"]
+
+
+def mark_lesson_changed(session: Dict) -> int:
+    """Bump the session version when the whole lesson (or its slide list) was replaced"""
+    session["version"] += 1
+    session["structure_version"] = session["version"]
+    session["slide_versions"] = [session["version"]] * len(session["lesson_content"].slides)
+    return session["version"]
+
+
+def slides_changed_since(session: Dict, since_version: int) -> Optional[List[int]]:
+    """Indexes of slides changed after ``since_version``
+
+    Returns None when the lesson was replaced since then and the client needs
+    a full reload.
+    """
+    if since_version < session["structure_version"]:
+        return None
+    return [index for index, version in enumerate(session["slide_versions"]) if version > since_version]
+
+
+class IdempotencyRecord:
+    def __init__(self, fingerprint: str, task: asyncio.Task, expires_at: float):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.expires_at = expires_at
+
+
+class IdempotencyKeyStore:
+    """Idempotency keys and the responses they produced, kept for ``ttl`` seconds
+
+    A record holds the task producing the response, so a retry arriving while
+    the first request is still running awaits the same result. Only the
+    oldest ``max_keys`` records are evicted early, to bound memory.
+    """
+
+    def __init__(self, ttl: float, max_keys: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self.replays = 0
+
+    def _purge(self):
+        now = time.monotonic()
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at > now and len(self._records) <= self.max_keys:
+                break
+            del self._records[key]
+
+    def get(self, key: str) -> Optional[IdempotencyRecord]:
+        self._purge()
+        return self._records.get(key)
+
+    def begin(self, key: str, fingerprint: str, task: asyncio.Task) -> IdempotencyRecord:
+        record = IdempotencyRecord(fingerprint, task, time.monotonic() + self.ttl)
+        self._records[key] = record
+        self._purge()
+        return record
+
+    def forget(self, key: str, record: IdempotencyRecord):
+        """Drop ``record`` so the key can be retried (a newer record under the key is kept)"""
+        if self._records.get(key) is record:
+            del self._records[key]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "keys": len(self._records),
+            "ttl_seconds": self.ttl,
+            "replays": self.replays,
+        }
+
+
+lesson_sessions = LessonSessionStore(
+    int(settings.SESSION_MEMORY_LIMIT_MB * 1024 * 1024),
+    settings.SESSION_SPILL_THRESHOLD,
+    settings.SESSION_SPILL_IDLE_SECONDS,
+    settings.SESSION_SPILL_DIR
+)
+idempotency_keys = IdempotencyKeyStore(settings.IDEMPOTENCY_KEY_TTL, settings.IDEMPOTENCY_MAX_KEYS)
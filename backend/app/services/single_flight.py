@@ -0,0 +1,97 @@
+# backend/app/services/single_flight.py
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.models.lesson import LessonRequest, LessonContent
+from app.services.prompts import prompt_registry
+from app.services.scheduler import WorkPriority, current_priority, priority_scope
+
+T = TypeVar("T")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a free-text field"""
+    return re.sub(r"\s+", " ", (value or "")).strip().lower()
+
+
+def _digest(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _request_fields(lesson_request: LessonRequest) -> Dict[str, Any]:
+    objectives = [normalize_text(obj) for obj in lesson_request.learning_objectives.split("\n") if obj.strip()]
+    course_level = lesson_request.course_level
+    return {
+        "topic": normalize_text(lesson_request.topic),
+        "chapter": normalize_text(lesson_request.chapter),
+        "lesson_title": normalize_text(lesson_request.lesson_title),
+        "learning_objectives": objectives,
+        "duration": normalize_text(lesson_request.duration),
+        "course_level": getattr(course_level, "value", course_level),
+        "complexity_level": lesson_request.complexity_level,
+        # uploaded_file_path is per-session and not used by generation, so it is left out
+    }
+
+
+def baseline_flight_key(lesson_request: LessonRequest) -> str:
+    """Key identifying baseline generations that would produce the same lesson"""
+    return "baseline:" + _digest({
+        "prompt_version": prompt_registry.version_id,
+        "request": _request_fields(lesson_request),
+    })
+
+
+def enhancement_flight_key(lesson_content: LessonContent, principle: str, lesson_request: LessonRequest) -> str:
+    """Key identifying UDL enhancements of identical lesson content"""
+    return "udl:" + _digest({
+        "prompt_version": prompt_registry.version_id,
+        "principle": principle,
+        "request": _request_fields(lesson_request),
+        "lesson": hashlib.sha256(lesson_content.model_dump_json().encode("utf-8")).hexdigest(),
+    })
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one in-flight task.
+
+    The shared task is shielded, so a caller disconnecting does not cancel the
+    work for everyone else waiting on it. Each caller receives its own copy of
+    the result via ``copy_result``. The task runs at its starter's priority,
+    raised to that of any more urgent caller who joins it.
+    """
+
+    def __init__(self, copy_result: Callable[[T], T]):
+        self.copy_result = copy_result
+        self._in_flight: Dict[str, Tuple[asyncio.Task, WorkPriority]] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            self.started += 1
+            with priority_scope(current_priority()) as work:
+                task = asyncio.ensure_future(fn())
+            self._in_flight[key] = (task, work)
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+            task, work = flight
+            work.promote(current_priority().level)
+
+        result = await asyncio.shield(task)
+        return self.copy_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+# Shared by the baseline and enhancement endpoints; keys are namespaced per operation
+generation_flights = SingleFlight(copy_result=lambda lesson: lesson.model_copy(deep=True))
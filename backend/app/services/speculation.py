@@ -0,0 +1,106 @@
+# backend/app/services/speculation.py
+import asyncio
+from collections import Counter
+from typing import Dict, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.lesson import LessonContent
+from app.services.lesson_generator import enhance_with_udl_principle
+from app.services.scheduler import BACKGROUND, WorkPriority, current_priority, priority_scope
+from app.services.single_flight import generation_flights, enhancement_flight_key
+
+
+class _Speculation:
+    def __init__(self, principle: str, version: int, task: asyncio.Task, work: WorkPriority):
+        self.principle = principle
+        self.version = version
+        self.task = task
+        self.work = work
+
+
+class SpeculativeStageRunner:
+    """Pre-generates the next UDL stage in the background for opted-in sessions.
+
+    The speculative call runs on a snapshot of the lesson and goes through the
+    shared single-flight layer, so a teacher applying the stage while it is
+    still running simply joins it. Results are only served if the session
+    version is unchanged since the snapshot; any edit discards them.
+    Speculative calls are scheduled as background work until someone waits
+    on them. ``max_concurrent`` caps how many may run at once.
+    A discarded call is left to finish (the provider bills it either way) and
+    keeps counting against the cap until it does.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self._pending: Dict[str, _Speculation] = {}
+        self._running: Set[asyncio.Task] = set()
+        self.outcomes = Counter()
+
+    def schedule(self, session_id: str, session: Dict, principle: Optional[str]):
+        """Start speculating ``principle`` for the session's current version"""
+        self.discard(session_id)
+        if not principle:
+            return
+        if len(self._running) >= self.max_concurrent:
+            self.outcomes["skipped_cost_cap"] += 1
+            return
+
+        # Edits mutate slides in place, so the background call works on its own copy
+        snapshot = session["lesson_content"].model_copy(deep=True)
+        lesson_request = session["request"]
+        with priority_scope(BACKGROUND) as work:
+            task = asyncio.ensure_future(generation_flights.do(
+                enhancement_flight_key(snapshot, principle, lesson_request),
+                lambda: run_in_threadpool(enhance_with_udl_principle, snapshot, principle, lesson_request)
+            ))
+        self._running.add(task)
+        task.add_done_callback(self._on_done)
+
+        self._pending[session_id] = _Speculation(principle, session["version"], task, work)
+        self.outcomes["started"] += 1
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.outcomes["failed"] += 1
+
+    async def take(self, session_id: str, session: Dict, principle: str) -> Optional[LessonContent]:
+        """Speculative result for ``principle`` if it is still valid for the session"""
+        speculation = self._pending.pop(session_id, None)
+        if speculation is None:
+            return None
+
+        if speculation.principle != principle or speculation.version != session["version"]:
+            self.outcomes["discarded_stale"] += 1
+            return None
+
+        if speculation.task.done():
+            self.outcomes["hit"] += 1
+        else:
+            # A teacher is now waiting on it, so it no longer runs as background work
+            self.outcomes["joined_in_flight"] += 1
+            speculation.work.promote(current_priority().level)
+        try:
+            return await asyncio.shield(speculation.task)
+        except Exception:
+            return None
+
+    def discard(self, session_id: str):
+        """Drop any speculation for the session (after an edit or on cleanup)"""
+        speculation = self._pending.pop(session_id, None)
+        if speculation is not None:
+            self.outcomes["discarded"] += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pending": len(self._pending),
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+speculative_stages = SpeculativeStageRunner(settings.SPECULATION_MAX_CONCURRENT)
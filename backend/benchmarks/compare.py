@@ -0,0 +1,67 @@
+# backend/benchmarks/compare.py
+"""Compare two benchmark reports and flag performance regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any tracked metric regresses by more than the
+threshold percentage, so the check can gate a deploy.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Any, Iterator, Tuple
+
+# Metrics where a larger value is an improvement; every other tracked metric is a cost
+HIGHER_IS_BETTER = ("slides_per_second", "mb_per_second")
+TRACKED_SUFFIXES = ("mean_ms", "p95_ms", "bytes_per_lesson", "json_bytes") + HIGHER_IS_BETTER
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and key in TRACKED_SUFFIXES:
+            yield path, float(value)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    """Return (metric, baseline, candidate, change %, regressed) rows"""
+    base_metrics = dict(flatten(baseline["results"]))
+    rows = []
+    for path, new_value in flatten(candidate["results"]):
+        old_value = base_metrics.get(path)
+        if old_value is None or old_value == 0:
+            continue
+        change = (new_value - old_value) / old_value * 100
+        if path.endswith(HIGHER_IS_BETTER):
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((path, old_value, new_value, change, regressed))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.candidate) as handle:
+        candidate = json.load(handle)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline['meta'].get('revision')} -> {candidate['meta'].get('revision')}")
+    for path, old_value, new_value, change, regressed in rows:
+        marker = "REGRESSION" if regressed else ""
+        print(f"{path:60} {old_value:14.3f} {new_value:14.3f} {change:+8.1f}% {marker}")
+
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
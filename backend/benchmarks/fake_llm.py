@@ -0,0 +1,132 @@
+# backend/benchmarks/fake_llm.py
+"""Offline stand-in for the OpenAI client used by the benchmark suite.
+
+The fake mimics the small surface of ``openai.OpenAI`` that the services use
+(``client.chat.completions.create``) and sleeps for a configurable latency so
+pipeline timings stay realistic without touching the network.
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Optional
+
+
+SLIDE_TITLES = [
+    "Course Introduction & Context",
+    "Learning Objectives & Outcomes",
+    "Theoretical Framework & Background",
+    "Key Concepts & Terminology",
+    "Core Content - Part I (Foundational Theory)",
+    "Core Content - Part II (Advanced Applications)",
+    "Research Perspectives & Current Developments",
+    "Case Studies & Real-World Applications",
+    "Critical Analysis & Discussion Points",
+    "Practical Exercise & Problem-Solving",
+    "Assessment & Evaluation Methods",
+    "Synthesis & Future Directions",
+]
+
+SLIDE_BODY = (
+    "This slide examines the research evidence and theoretical frameworks that underpin the topic. "
+    "Students analyze findings from recent studies, compare competing perspectives, and evaluate how "
+    "the data supports professional practice. Discussion questions ask learners to synthesize the "
+    "material with prior coursework and to critique the methodological choices of key studies. "
+)
+
+
+def build_fake_lesson_text(slide_count: int = 12, paragraphs_per_slide: int = 3) -> str:
+    """Build a model-style response with ``Slide N:`` sections the parsers understand"""
+    sections = []
+    for i in range(1, slide_count + 1):
+        title = SLIDE_TITLES[(i - 1) % len(SLIDE_TITLES)]
+        body = SLIDE_BODY * paragraphs_per_slide
+        sections.append(
+            f"Slide {i}: {title}\n\n{body}\n\n"
+            f"Instructor Notes: Facilitate discussion on slide {i} and connect to current research.\n"
+            f"Image: Academic diagram illustrating {title.lower()}\n"
+        )
+    return "\n".join(sections)
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+               max_tokens: int = 4000, **kwargs):
+        return self._owner._complete(model, messages, max_tokens)
+
+
+class FakeOpenAI:
+    """Drop-in replacement for ``OpenAI`` with configurable latency and no network access"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, slide_count: int = 12,
+                 failure_rate: float = 0.0, seed: Optional[int] = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.response_text = build_fake_lesson_text(slide_count)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._seen_system_prompts = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    def _complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            should_fail = self.failure_rate and self._random.random() < self.failure_rate
+
+        if delay:
+            time.sleep(delay)
+        if should_fail:
+            raise RuntimeError("Simulated provider failure")
+
+        prompt_chars = sum(len(message.get("content", "")) for message in messages)
+        completion_tokens = min(max_tokens, len(self.response_text) // 4)
+        cached_tokens = self._cached_tokens(messages)
+        with self._lock:
+            self.prompt_tokens += prompt_chars // 4
+            self.cached_tokens += cached_tokens
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=self.response_text))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_chars // 4,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_chars // 4 + completion_tokens,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+            ),
+        )
+
+    def _cached_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Provider-style prompt caching of the system prompt: exact repeats of at least
+        1024 tokens are served from cache in 128-token increments"""
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        system_prompt = messages[0]["content"]
+        with self._lock:
+            seen = system_prompt in self._seen_system_prompts
+            self._seen_system_prompts.add(system_prompt)
+        tokens = len(system_prompt) // 4
+        return tokens // 128 * 128 if seen and tokens >= 1024 else 0
+
+
+def install_fake_client(fake: FakeOpenAI):
+    """Route every model call in the lesson generator through ``fake``
+
+    Returns a callable that restores the real client factory.
+    """
+    from app.services import lesson_generator
+
+    original = lesson_generator.get_openai_client
+    lesson_generator.get_openai_client = lambda: fake
+
+    def restore():
+        lesson_generator.get_openai_client = original
+
+    return restore
@@ -0,0 +1,422 @@
+# backend/benchmarks/run_benchmarks.py
+"""Offline performance benchmarks for the staged lesson pipeline.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+    python -m benchmarks.startup
+
+Every model call goes through ``FakeOpenAI`` so the suite needs no network
+access or API key. Results are written as JSON so runs from different commits
+can be compared.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List
+
+from benchmarks.fake_llm import FakeOpenAI, build_fake_lesson_text, install_fake_client
+from benchmarks.startup import bench_startup
+
+UDL_STAGES = ["engagement", "representation", "action_expression"]
+
+BASELINE_FORM = {
+    "topic": "Thermodynamics",
+    "chapter": "Energy and Entropy",
+    "lesson_title": "Introduction to the Second Law",
+    "grade_level": "College",
+    "learning_objectives": "Analyze entropy changes in closed systems\nEvaluate heat engine efficiency",
+    "duration": "75 minutes",
+    "complexity_level": "5",
+}
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    """Time ``fn`` and summarise the samples in milliseconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    p95_index = max(0, int(round(0.95 * len(samples))) - 1)
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[p95_index],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+    }
+
+
+def build_sample_lesson():
+    """Build a 12-slide baseline lesson through the same code path the API uses"""
+    from app.models.lesson import LessonRequest
+    from app.services.lesson_generator import generate_baseline_lesson
+
+    request = LessonRequest(
+        topic=BASELINE_FORM["topic"],
+        chapter=BASELINE_FORM["chapter"],
+        lesson_title=BASELINE_FORM["lesson_title"],
+        learning_objectives=BASELINE_FORM["learning_objectives"],
+        duration=BASELINE_FORM["duration"],
+    )
+    return request, generate_baseline_lesson(request)
+
+
+def run_pipeline(client) -> str:
+    """Drive baseline -> three UDL stages -> export through the HTTP API"""
+    response = client.post("/api/generate-baseline", data=BASELINE_FORM)
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+
+    for principle in UDL_STAGES:
+        response = client.post(f"/api/apply-udl-principle/{session_id}", json={"principle": principle})
+        response.raise_for_status()
+
+    response = client.post(f"/api/export-lesson/{session_id}")
+    response.raise_for_status()
+    return session_id
+
+
+def bench_end_to_end(iterations: int) -> Dict[str, Any]:
+    """Full teacher session: /generate-baseline, three /apply-udl-principle calls, /export-lesson"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    session_ids = []
+    with TestClient(app) as client:
+        result = measure(lambda: session_ids.append(run_pipeline(client)), iterations)
+        for session_id in session_ids:
+            client.delete(f"/api/lesson-session/{session_id}")
+    return result
+
+
+def bench_create_presentation(iterations: int) -> Dict[str, Any]:
+    """Render throughput of ``create_presentation`` in slides per second"""
+    from app.services.pptx_generator import create_presentation
+
+    _, lesson = build_sample_lesson()
+    # Title and resources slides are rendered in addition to the lesson slides
+    slides_per_deck = len(lesson.slides) + 2
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "bench.pptx")
+        result = measure(lambda: create_presentation(lesson, output_path), iterations)
+
+    result["slides_per_deck"] = slides_per_deck
+    result["slides_per_second"] = slides_per_deck / (result["mean_ms"] / 1000)
+    return result
+
+
+def bench_parsers(iterations: int) -> Dict[str, Any]:
+    """Throughput of the response parsers for baseline and UDL stages"""
+    from app.services.lesson_generator import parse_ai_response_to_slides, parse_enhanced_slides
+
+    request, lesson = build_sample_lesson()
+    ai_response = build_fake_lesson_text()
+    response_mb = len(ai_response.encode("utf-8")) / (1024 * 1024)
+
+    baseline = measure(lambda: parse_ai_response_to_slides(ai_response, request), iterations)
+    baseline["mb_per_second"] = response_mb / (baseline["mean_ms"] / 1000)
+
+    enhanced = measure(lambda: parse_enhanced_slides(ai_response, lesson.slides, "engagement"), iterations)
+    enhanced["slides_per_second"] = len(lesson.slides) / (enhanced["mean_ms"] / 1000)
+
+    return {"parse_ai_response_to_slides": baseline, "parse_enhanced_slides": enhanced}
+
+
+def bench_models(iterations: int) -> Dict[str, Any]:
+    """Validation, copy and serialization cost of a 12-slide ``LessonContent``"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from app.api.endpoints import model_json
+    from app.models.lesson import LessonContent
+
+    _, lesson = build_sample_lesson()
+    payload = lesson.model_dump()
+
+    def default_json_response():
+        # What FastAPI does for an endpoint returning {"lesson_content": lesson.model_dump()}
+        return JSONResponse(jsonable_encoder({"success": True, "lesson_content": lesson.model_dump()})).body
+
+    def orjson_fragment_response():
+        return ORJSONResponse({"success": True, "lesson_content": model_json(lesson)}).body
+
+    return {
+        "slide_count": len(lesson.slides),
+        "validate": measure(lambda: LessonContent.model_validate(payload), iterations),
+        "copy_deep": measure(lambda: lesson.model_copy(deep=True), iterations),
+        "dump_dict": measure(lambda: lesson.model_dump(), iterations),
+        "dump_json": measure(lambda: lesson.model_dump_json(), iterations),
+        "response_default_json": measure(default_json_response, iterations),
+        "response_orjson": measure(orjson_fragment_response, iterations),
+        "json_bytes": len(lesson.model_dump_json()),
+    }
+
+
+def bench_session_memory(lessons: int) -> Dict[str, Any]:
+    """Memory retained per lesson session after the full staged pipeline"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.api.endpoints import lesson_sessions
+
+    with TestClient(app) as client:
+        # Warm imports and caches so they are not attributed to the sessions
+        client.delete(f"/api/lesson-session/{run_pipeline(client)}")
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+        session_ids = [run_pipeline(client) for _ in range(lessons)]
+
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        history_entries = sum(len(lesson_sessions[sid]["edit_history"]) for sid in session_ids)
+
+        for session_id in session_ids:
+            client.delete(f"/api/lesson-session/{session_id}")
+
+    return {
+        "lessons": lessons,
+        "retained_bytes_total": retained,
+        "bytes_per_lesson": retained / lessons,
+        "edit_history_entries_per_lesson": history_entries / lessons,
+    }
+
+
+ARCHIVE_TOPICS = ["Thermodynamics", "Organic Chemistry", "Cell Biology", "Macroeconomics", "Statistics",
+                  "Linear Algebra", "Cognitive Psychology", "Medieval History", "Data Structures", "Ecology"]
+
+
+def bench_library_search(slides: int, iterations: int) -> Dict[str, Any]:
+    """Ranked, paginated /library/search queries over an archive of ``slides`` slides"""
+    from app.models.lesson import LessonRequest
+    from app.services.lesson_archive import LessonArchive
+
+    request, lesson = build_sample_lesson()
+    lessons = max(1, slides // len(lesson.slides))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archive = LessonArchive(os.path.join(tmp_dir, "archive.db"))
+        start = time.perf_counter()
+        for number in range(lessons):
+            topic = ARCHIVE_TOPICS[number % len(ARCHIVE_TOPICS)]
+            archive.archive(
+                lesson,
+                LessonRequest(**{**request.model_dump(), "topic": topic, "chapter": f"Unit {number % 40}"}),
+                UDL_STAGES[number % len(UDL_STAGES)]
+            )
+        build_seconds = time.perf_counter() - start
+
+        return {
+            "lessons": lessons,
+            "slides": lessons * len(lesson.slides),
+            "archive_slides_per_second": lessons * len(lesson.slides) / build_seconds,
+            # Each topic covers a tenth of the archive and each chapter a fortieth
+            "topic_query": measure(lambda: archive.search("linear algebra"), iterations),
+            "prefix_query": measure(lambda: archive.search("cognitive psych"), iterations),
+            "topic_and_chapter": measure(lambda: archive.search("linear algebra unit 5"), iterations),
+            "deep_page": measure(lambda: archive.search("linear algebra", page=400), iterations),
+            "stage_filtered": measure(lambda: archive.search("statistics", stage="engagement"), iterations),
+            "no_match": measure(lambda: archive.search("photosynthesis"), iterations),
+        }
+
+
+def bench_similar_requests(entries: int, iterations: int) -> Dict[str, Any]:
+    """Near-duplicate lookups against a MinHash/LSH index of ``entries`` past requests"""
+    import random
+    import uuid
+    from app.models.lesson import LessonRequest
+    from app.services.request_index import RequestIndex
+
+    rng = random.Random(7)
+    vocabulary = [f"term{number}" for number in range(2000)]
+
+    def random_request() -> LessonRequest:
+        words = rng.sample(vocabulary, 12)
+        return LessonRequest(
+            topic=" ".join(words[:2]),
+            chapter=" ".join(words[2:4]),
+            lesson_title=" ".join(words[4:7]),
+            learning_objectives=f"Analyze {' '.join(words[7:9])}\nEvaluate {' '.join(words[9:])}",
+            duration="60 minutes",
+        )
+
+    requests = [random_request() for _ in range(entries)]
+    index = RequestIndex(capacity=entries)
+    start = time.perf_counter()
+    index.load((str(uuid.uuid4()), request) for request in requests)
+    load_seconds = time.perf_counter() - start
+
+    # Same request with its objectives reordered and the title reworded
+    probe = requests[entries // 2].model_copy(update={
+        "lesson_title": "Intro to " + requests[entries // 2].lesson_title,
+        "learning_objectives": "\n".join(reversed(requests[entries // 2].learning_objectives.split("\n"))),
+    })
+    matches = index.similar(probe, 0.75)
+    return {
+        "entries": entries,
+        "requests_indexed_per_second": entries / load_seconds,
+        "memory_bytes": index.stats()["memory_bytes"],
+        "near_duplicate_found": bool(matches),
+        "near_duplicate_lookup": measure(lambda: index.similar(probe, 0.75), iterations),
+        "miss_lookup": measure(lambda: index.similar(random_request(), 0.75), iterations),
+    }
+
+
+def bench_slide_images(iterations: int) -> Dict[str, Any]:
+    """Slide image rendering for one sample lesson: a cold cache versus a warm one"""
+    import shutil
+    from app.services.image_provider import SlideImageRenderer
+
+    _, lesson = build_sample_lesson()
+    prompts = [slide.image_prompt for slide in lesson.slides]
+    cache_dir = tempfile.mkdtemp(prefix="bench-images-")
+
+    def render_cold():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        SlideImageRenderer("pillow", cache_dir, "classroom", 4).render_all(prompts)
+
+    renderer = SlideImageRenderer("pillow", cache_dir, "classroom", 4)
+    try:
+        cold = measure(render_cold, max(1, iterations // 10))
+        renderer.render_all(prompts)
+        warm = measure(lambda: renderer.render_all(prompts), iterations)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        "prompts_per_lesson": len(prompts),
+        "distinct_prompts": len(set(prompts)),
+        "cold_cache": cold,
+        "warm_cache": warm,
+    }
+
+
+def bench_lesson_analytics(slides: int, iterations: int) -> Dict[str, Any]:
+    """Readability analytics for one lesson and for an archive of ``slides`` slides in one batch"""
+    from app.models.lesson_analytics import analyze_lesson, analyze_lessons, slides_needing_rewrite
+
+    _, lesson = build_sample_lesson()
+    lessons = [(str(number), lesson, None) for number in range(max(1, slides // len(lesson.slides)))]
+    archive = measure(lambda: analyze_lessons(lessons), max(1, iterations // 10))
+    return {
+        "lesson": measure(lambda: analyze_lesson(lesson), iterations),
+        "archive_slides": len(lessons) * len(lesson.slides),
+        "archive": archive,
+        "archive_slides_per_second": len(lessons) * len(lesson.slides) / archive["mean_ms"] * 1000,
+        # Slides of the sample lesson the representation stage would send to the model
+        "representation_slides_sent": len(slides_needing_rewrite(lesson)),
+        "representation_slides_total": len(lesson.slides),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_all(iterations: int, latency: float, lessons: int, only: List[str] = None) -> Dict[str, Any]:
+    benchmarks = {
+        "end_to_end": lambda: bench_end_to_end(max(1, iterations // 10)),
+        "create_presentation": lambda: bench_create_presentation(max(1, iterations // 10)),
+        "parsers": lambda: bench_parsers(iterations),
+        "models": lambda: bench_models(iterations),
+        "session_memory": lambda: bench_session_memory(lessons),
+        "startup": lambda: bench_startup(max(1, iterations // 10)),
+        "library_search": lambda: bench_library_search(100_000, iterations),
+        "similar_requests": lambda: bench_similar_requests(100_000, iterations),
+        "slide_images": lambda: bench_slide_images(iterations),
+        "lesson_analytics": lambda: bench_lesson_analytics(24_000, iterations),
+    }
+
+    from app.core.config import settings
+
+    # The suite measures pipeline cost, not the per-client quotas
+    settings.RATE_LIMIT_ENABLED = False
+    # Exported benchmark lessons would otherwise fill the local lesson archive
+    settings.LESSON_ARCHIVE_ENABLED = False
+
+    # Export benchmarks render slide images into a throwaway cache rather than data/
+    from app.services.image_provider import slide_images
+    image_cache = tempfile.TemporaryDirectory(prefix="bench-image-cache-")
+    slide_images.cache_dir = image_cache.name
+
+    fake = FakeOpenAI(latency=latency)
+    restore = install_fake_client(fake)
+    results = {}
+    try:
+        for name, bench in benchmarks.items():
+            if only and name not in only:
+                continue
+            print(f"Running benchmark: {name}", file=sys.stderr)
+            results[name] = bench()
+    finally:
+        restore()
+        image_cache.cleanup()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "fake_llm_latency_s": latency,
+            "fake_llm_calls": fake.calls,
+            "fake_llm_cached_token_ratio": (
+                round(fake.cached_tokens / fake.prompt_tokens, 3) if fake.prompt_tokens else None
+            ),
+        },
+        "results": results,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the UDL lesson pipeline with a stubbed model")
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations for micro benchmarks")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--lessons", type=int, default=5, help="Sessions created for the memory benchmark")
+    parser.add_argument("--only", nargs="*", help="Run only the named benchmarks")
+    parser.add_argument("--output", help="Write JSON results to this path instead of stdout")
+    args = parser.parse_args(argv)
+
+    # The services log with print(); keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_all(args.iterations, args.latency, args.lessons, args.only)
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output)
+        print(f"Benchmark results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# backend/benchmarks/startup.py
+"""Cold-start benchmark for the API process based on ``python -X importtime``.
+
+    python -m benchmarks.startup --iterations 5 --top 15
+
+Each sample imports ``main`` in a fresh interpreter, so nothing is cached
+between runs. Reports the wall time to import the app, the time spent
+warming the heavy modules afterwards, and the slowest imports by
+cumulative time.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from app.core.warmup import warm_up
+warm_up()
+print("STARTUP", imported - started, time.perf_counter() - imported)
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every top-level line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def parse_importtime_until_main(modules: List[Tuple[str, int, int]]) -> List[Tuple[str, int, int]]:
+    """Imports completed up to and including ``main`` (importtime lists a module after its children)"""
+    for index, (name, _, _) in enumerate(modules):
+        if name == "main":
+            return modules[:index + 1]
+    return modules
+
+
+def sample_startup() -> Dict[str, Any]:
+    env = dict(os.environ, WARM_UP_ON_STARTUP="false")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    line = next(line for line in completed.stdout.splitlines() if line.startswith("STARTUP"))
+    _, import_s, warm_s = line.split()
+    return {
+        "import_ms": float(import_s) * 1000,
+        "warm_up_ms": float(warm_s) * 1000,
+        "modules": parse_importtime(completed.stderr),
+    }
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def bench_startup(iterations: int, top: int = 10) -> Dict[str, Any]:
+    """Import time of ``main`` (what delays the first request) and of the deferred warm-up"""
+    samples = [sample_startup() for _ in range(iterations)]
+
+    # Module breakdown from the last sample, when the OS file cache is warm
+    modules = samples[-1]["modules"]
+    slowest = sorted(modules, key=lambda module: module[2], reverse=True)
+    heavy_at_import = {"openai", "pptx", "lxml"} & {name for name, _, _ in parse_importtime_until_main(modules)}
+    return {
+        "iterations": iterations,
+        "import_main": summarize([sample["import_ms"] for sample in samples]),
+        "warm_up": summarize([sample["warm_up_ms"] for sample in samples]),
+        "heavy_modules_at_import": sorted(heavy_at_import),
+        "slowest_imports": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, self_us, cumulative_us in slowest[:top]
+        ],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure API cold-start import time")
+    parser.add_argument("--iterations", type=int, default=5, help="Fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(bench_startup(args.iterations, args.top), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# backend/gunicorn.conf.py
+"""Production server settings: gunicorn -c gunicorn.conf.py main:app
+
+With preload_app the master imports the app and warms the heavy modules
+once before forking, so every worker shares them copy-on-write instead of
+paying the import cost itself.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    from app.core.warmup import warm_up
+
+    warm_up()
+    # Keep the preloaded objects out of the collector, so it does not touch (and copy) their pages
+    gc.freeze()
@@ -1,11 +1,43 @@
-import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
 from app.api.endpoints import router as api_router
+from app.core.compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.profiling import ProfilingMiddleware, profiler
+from app.core.static_files import DownloadStaticFiles
+from app.core.config import settings
+from app.core.warmup import prepare_static_dirs, start_background_index_load, start_background_warm_up
+from app.services.session_store import idempotency_keys
 
-app = FastAPI(title="UDL Lesson Generator API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prepare_static_dirs()
+    if settings.WARM_UP_ON_STARTUP:
+        start_background_warm_up()
+    if settings.LESSON_ARCHIVE_ENABLED and settings.SIMILAR_REQUESTS_ENABLED:
+        start_background_index_load()
+    yield
+
+
+app = FastAPI(title="UDL Lesson Generator API", lifespan=lifespan)
+
+# Requests an admin selected for profiling (see /api/admin/profiling) carry their profile to @profiled code
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Retries carrying an Idempotency-Key replay the first response instead of generating again
+# (innermost, so stored bodies are uncompressed and each replay negotiates its own encoding)
+app.add_middleware(IdempotencyMiddleware, store=idempotency_keys, paths=settings.IDEMPOTENT_PATHS)
+
+# Compress lesson JSON (which repeats the UDL enhancement lists on every slide)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -14,14 +46,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Range", "Accept-Ranges", "Retry-After", "Idempotent-Replayed"],
 )
 
-# Mount static folder for downloads
-os.makedirs("static/downloads", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Mount static folder for downloads (created in the lifespan, so it is not checked here)
+# Downloads support conditional GET, Range resume and cached gzip siblings
+app.mount(
+    "/static",
+    DownloadStaticFiles(directory=settings.STATIC_DIR, check_dir=False,
+                        precompress_min_size=settings.COMPRESSION_MIN_SIZE),
+    name="static"
+)
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,61 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Offline, deterministic settings; read by app.core.config at import, so set before the app is imported
+os.environ.update({
+    "RATE_LIMIT_ENABLED": "false",
+    "LESSON_ARCHIVE_ENABLED": "false",
+    "IMAGES_ENABLED": "false",
+    "WARM_UP_ON_STARTUP": "false",
+    "EXPORT_PRERENDER_ENABLED": "false",
+    "SPECULATIVE_STAGES_ENABLED": "false",
+    "PROFILING_ENABLED": "false",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.fake_llm import FakeOpenAI, install_fake_client  # noqa: E402
+
+BASELINE_FORM = {
+    "topic": "Thermodynamics",
+    "chapter": "Chapter 3: Entropy",
+    "lesson_title": "Entropy and the Second Law",
+    "grade_level": "College",
+    "learning_objectives": "Analyze entropy changes in isolated systems\nEvaluate reversible processes",
+    "duration": "75 minutes",
+}
+
+
+@pytest.fixture(scope="session")
+def fake_llm():
+    fake = FakeOpenAI()
+    restore = install_fake_client(fake)
+    yield fake
+    restore()
+
+
+@pytest.fixture(scope="session")
+def client(fake_llm, tmp_path_factory):
+    """API client running in a scratch directory, so downloads and spills stay out of the tree"""
+    from main import app
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("backend"))
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def session_id(client):
+    response = client.post("/api/generate-baseline", data=BASELINE_FORM)
+    assert response.status_code == 200
+    session_id = response.json()["session_id"]
+    yield session_id
+    client.delete(f"/api/lesson-session/{session_id}")
@@ -0,0 +1,97 @@
+# backend/tests/test_bulk_slide_edits.py
+from app.services.session_store import lesson_sessions
+
+SLIDE_CONTENT = "Replacement slide content long enough to be valid."
+
+
+def slide_titles(session_id):
+    return [slide.title for slide in lesson_sessions[session_id]["lesson_content"].slides]
+
+
+def edit_slides(client, session_id, operations, base_version=None):
+    body = {"operations": operations}
+    if base_version is not None:
+        body["base_version"] = base_version
+    return client.post(f"/api/edit-slides/{session_id}", json=body)
+
+
+def test_patch_batch_is_one_version_and_one_history_entry(client, session_id):
+    session = lesson_sessions[session_id]
+    version, history = session["version"], len(session["edit_history"])
+
+    response = edit_slides(client, session_id, [
+        {"slide_index": 0, "title": "Patched first"},
+        {"slide_index": 3, "content": SLIDE_CONTENT},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["version"] == version + 1
+    assert body["restructured"] is False
+    assert body["changed_slides"] == [0, 3]
+    assert len(session["edit_history"]) == history + 1
+    assert slide_titles(session_id)[0] == "Patched first"
+    assert session["slide_versions"][0] == session["slide_versions"][3] == version + 1
+    assert session["slide_versions"][1] < version + 1
+
+
+def test_indexes_refer_to_the_deck_left_by_earlier_operations(client, session_id):
+    titles = slide_titles(session_id)
+
+    response = edit_slides(client, session_id, [
+        {"op": "insert", "slide_index": 1, "title": "Inserted", "content": SLIDE_CONTENT},
+        {"op": "patch", "slide_index": 1, "notes": "Notes on the inserted slide"},
+        {"op": "delete", "slide_index": 0},
+        {"op": "patch", "slide_index": 1, "title": "Was second"},
+        {"op": "move", "slide_index": 0, "to_index": len(titles) - 1},
+    ])
+
+    assert response.status_code == 200
+    assert response.json()["restructured"] is True
+    slides = lesson_sessions[session_id]["lesson_content"].slides
+    assert [slide.title for slide in slides] == ["Was second"] + titles[2:] + ["Inserted"]
+    assert slides[-1].notes == "Notes on the inserted slide"
+    assert len(slides) == len(titles)
+
+
+def test_failing_operation_leaves_the_lesson_untouched(client, session_id):
+    session = lesson_sessions[session_id]
+    before = session["lesson_content"].model_dump()
+    version, history = session["version"], len(session["edit_history"])
+
+    failing_batches = [
+        # The last operation fails LessonSlide validation (content too short)
+        [{"slide_index": 0, "title": "Applied first"}, {"slide_index": 2, "content": "short"}],
+        # An index past the end of the deck the earlier operations left
+        [{"op": "delete", "slide_index": 0}, {"slide_index": len(before["slides"]) - 1, "title": "Gone"}],
+        # Fine one by one, but the deck ends up under the LessonContent slide minimum
+        [{"op": "delete", "slide_index": 0}] * 5,
+    ]
+    statuses = [edit_slides(client, session_id, operations).status_code for operations in failing_batches]
+
+    assert statuses == [422, 400, 422]
+    assert session["lesson_content"].model_dump() == before
+    assert session["version"] == version
+    assert len(session["edit_history"]) == history
+
+
+def test_base_version_conflicts(client, session_id):
+    base_version = lesson_sessions[session_id]["version"]
+    assert client.post(f"/api/edit-slide/{session_id}", json={"slide_index": 0, "title": "Co-teacher"}).status_code == 200
+
+    conflict = edit_slides(client, session_id, [{"slide_index": 0, "title": "Mine"}], base_version)
+    assert conflict.status_code == 409
+    assert conflict.json()["detail"]["slide_index"] == 0
+    assert slide_titles(session_id)[0] == "Co-teacher"
+
+    # Slides nobody else touched can still be patched from the older version
+    untouched = edit_slides(client, session_id, [{"slide_index": 5, "title": "Mine"}], base_version)
+    assert untouched.status_code == 200
+
+    # After a restructure every batch based on an older version conflicts
+    restructured_version = edit_slides(client, session_id, [
+        {"op": "move", "slide_index": 7, "to_index": 2}
+    ]).json()["version"]
+    stale = edit_slides(client, session_id, [{"slide_index": 9, "title": "Mine"}], restructured_version - 1)
+    assert stale.status_code == 409
+    assert edit_slides(client, session_id, [{"slide_index": 9, "title": "Mine"}], restructured_version).status_code == 200
@@ -0,0 +1,75 @@
+# backend/tests/test_downloads.py
+import os
+
+import pytest
+
+from app.core.static_files import parse_range
+
+DECK = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def deck_url(client):
+    os.makedirs("static/downloads/range-test", exist_ok=True)
+    with open("static/downloads/range-test/deck.pptx", "wb") as handle:
+        handle.write(DECK)
+    return "/static/downloads/range-test/deck.pptx"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-4", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+def test_range_request_resumes_a_download(client, deck_url):
+    response = client.get(deck_url, headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(DECK)}"
+    assert response.headers["Content-Length"] == "100"
+    assert response.content == DECK[100:200]
+
+
+def test_suffix_range(client, deck_url):
+    response = client.get(deck_url, headers={"Range": "bytes=-16"})
+
+    assert response.status_code == 206
+    assert response.content == DECK[-16:]
+
+
+def test_unsatisfiable_range_is_416(client, deck_url):
+    response = client.get(deck_url, headers={"Range": f"bytes={len(DECK)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(DECK)}"
+
+
+def test_stale_if_range_gets_the_whole_file(client, deck_url):
+    etag = client.get(deck_url).headers["ETag"]
+
+    current = client.get(deck_url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    stale = client.get(deck_url, headers={"Range": "bytes=0-9", "If-Range": '"an-older-export"'})
+
+    assert current.status_code == 206
+    assert stale.status_code == 200
+    assert stale.content == DECK
+
+
+def test_conditional_get(client, deck_url):
+    etag = client.get(deck_url).headers["ETag"]
+
+    assert client.get(deck_url, headers={"If-None-Match": etag}).status_code == 304
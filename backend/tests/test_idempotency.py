@@ -0,0 +1,43 @@
+# backend/tests/test_idempotency.py
+from tests.conftest import BASELINE_FORM
+
+
+def test_retry_with_the_same_key_replays_the_first_response(client, fake_llm):
+    headers = {"Idempotency-Key": "baseline-retry"}
+    first = client.post("/api/generate-baseline", data=BASELINE_FORM, headers=headers)
+    calls = fake_llm.calls
+
+    replay = client.post("/api/generate-baseline", data=BASELINE_FORM, headers=headers)
+
+    assert first.status_code == replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert replay.json()["session_id"] == first.json()["session_id"]
+    assert fake_llm.calls == calls
+    client.delete(f"/api/lesson-session/{first.json()['session_id']}")
+
+
+def test_reusing_a_key_for_a_different_request_is_rejected(client):
+    headers = {"Idempotency-Key": "baseline-reused"}
+    first = client.post("/api/generate-baseline", data=BASELINE_FORM, headers=headers)
+
+    reused = client.post("/api/generate-baseline", data={**BASELINE_FORM, "topic": "Optics"}, headers=headers)
+
+    assert reused.status_code == 422
+    client.delete(f"/api/lesson-session/{first.json()['session_id']}")
+
+
+def test_errors_are_not_replayed(client, session_id):
+    headers = {"Idempotency-Key": "out-of-order-stage"}
+    body = {"principle": "representation"}
+
+    first = client.post(f"/api/apply-udl-principle/{session_id}", json=body, headers=headers)
+    retry = client.post(f"/api/apply-udl-principle/{session_id}", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 400
+    assert "Idempotent-Replayed" not in retry.headers
+
+    # Once the error is fixed the same key runs the request
+    applied = client.post(f"/api/apply-udl-principle/{session_id}", json={"principle": "engagement"},
+                          headers={"Idempotency-Key": "next-stage"})
+    assert applied.status_code == 200
@@ -0,0 +1,73 @@
+# backend/tests/test_image_cache.py
+import os
+import time
+
+import pytest
+
+from app.services import image_provider
+from app.services.image_provider import ImageProvider, SlideImageRenderer, register_image_provider
+
+
+class StubProvider(ImageProvider):
+    name = "stub"
+
+    def render(self, prompt, style):
+        return b"\x89PNG" + prompt.encode(), f"Alt text for {prompt}", 4, 3
+
+
+register_image_provider("stub", StubProvider)
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    # No limits, so renders schedule no background prune; tests set them and prune themselves
+    return SlideImageRenderer("stub", str(tmp_path), "flat", workers=1)
+
+
+def age(renderer, prompt, seconds):
+    """Backdate an entry's last use so pruning may evict it"""
+    _, meta_path = renderer._paths(renderer.cache_key(prompt))
+    last_use = time.time() - seconds
+    os.utime(meta_path, (last_use, last_use))
+    return meta_path
+
+
+def test_hit_on_an_entry_pruned_while_it_is_read_is_a_miss(renderer):
+    first = renderer.submit("Water cycle").result()
+    renderer.submit("Photosynthesis").result()
+    os.remove(renderer._paths(renderer.cache_key("Water cycle"))[1])
+    with open(renderer._paths(renderer.cache_key("Photosynthesis"))[1], "w") as truncated:
+        truncated.write("4")
+
+    assert renderer._cached(renderer.cache_key("Water cycle")) is None
+    assert renderer._cached(renderer.cache_key("Photosynthesis")) is None
+    # A miss renders the image again
+    assert renderer.submit("Water cycle").result().path == first.path
+
+
+def test_prune_keeps_entries_used_since_its_scan(renderer, monkeypatch):
+    renderer.submit("Water cycle").result()
+    renderer.submit("Photosynthesis").result()
+    used_meta = age(renderer, "Water cycle", 2 * renderer.PRUNE_GRACE)
+    age(renderer, "Photosynthesis", 2 * renderer.PRUNE_GRACE)
+    getsize = os.path.getsize
+
+    def hit_during_scan(path):
+        # A cache hit on "Water cycle" lands after the prune has stat-ed its metadata
+        os.utime(used_meta)
+        return getsize(path)
+
+    monkeypatch.setattr(image_provider.os.path, "getsize", hit_during_scan)
+    renderer.max_bytes = 1
+
+    assert renderer.prune() == 1
+    assert renderer._cached(renderer.cache_key("Water cycle")) is not None
+    assert renderer._cached(renderer.cache_key("Photosynthesis")) is None
+
+
+def test_image_removed_after_it_was_handed_out_is_skipped(renderer):
+    future = renderer.submit("Water cycle")
+    os.remove(future.result().path)
+
+    assert renderer.result(future) is None
+    assert renderer.stats()["outcomes"]["vanished"] == 1
@@ -0,0 +1,55 @@
+# backend/tests/test_rate_limits.py
+import pytest
+
+from app.api import endpoints
+from app.core.config import settings
+from app.services.rate_limiter import ClientRateLimiter, ModelCapacityError, client_key
+from tests.conftest import BASELINE_FORM
+
+
+@pytest.fixture
+def client_budgets(monkeypatch):
+    """Rate limiting on, with a fresh per-client limiter whose request budget is two requests"""
+    limiter = ClientRateLimiter(requests_per_minute=2, request_burst=2, tokens_per_minute=100000)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(endpoints, "client_rate_limiter", limiter)
+    return limiter
+
+
+def remaining_requests(limiter):
+    request_bucket, _ = limiter._buckets[client_key(None, "testclient")]
+    return request_bucket.tokens
+
+
+def test_provider_rejection_charges_nothing(client, client_budgets, monkeypatch):
+    monkeypatch.setattr(endpoints.model_call_limiter, "admission_delay", lambda tokens: 1e6)
+
+    response = client.post("/api/generate-baseline", data=BASELINE_FORM)
+
+    assert response.status_code == 429
+    assert "capacity" in response.json()["detail"]
+    assert client_budgets._buckets == {}
+
+
+def test_capacity_error_during_the_request_is_refunded(client, client_budgets, monkeypatch):
+    def exhausted(lesson_request):
+        raise ModelCapacityError(5)
+
+    monkeypatch.setattr(endpoints, "generate_baseline_lesson", exhausted)
+
+    response = client.post("/api/generate-baseline", data=BASELINE_FORM)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert remaining_requests(client_budgets) == pytest.approx(2, abs=0.01)
+
+
+def test_slide_enhancement_is_not_gated_on_provider_capacity(client, session_id, client_budgets, monkeypatch):
+    monkeypatch.setattr(endpoints.model_call_limiter, "admission_delay", lambda tokens: 1e6)
+
+    response = client.post(f"/api/ai-enhance-slide/{session_id}", json={"slide_index": 0, "prompt": "Simplify"})
+
+    assert response.status_code == 200
+    _, token_bucket = client_budgets._buckets[client_key(None, "testclient")]
+    assert token_bucket.tokens == pytest.approx(token_bucket.capacity)
+    assert remaining_requests(client_budgets) == pytest.approx(1, abs=0.01)
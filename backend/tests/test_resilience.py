@@ -0,0 +1,60 @@
+# backend/tests/test_resilience.py
+import httpx
+import openai
+import pytest
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+
+def status_error(status_code):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.APIStatusError("error", response=httpx.Response(status_code, request=request), body=None)
+
+
+def caller(failure_threshold=2, reset_timeout=60.0):
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    return ResilientCaller(max_attempts=1, base_delay=0, max_delay=0, breaker=breaker)
+
+
+def failing(error):
+    def call():
+        raise error
+    return call
+
+
+def test_only_a_provider_4xx_counts_as_a_healthy_answer():
+    resilient = caller()
+    resilient.breaker.record_failure()
+
+    for error in (status_error(401), status_error(403), KeyError("parsing bug")):
+        with pytest.raises(type(error)):
+            resilient.call(failing(error))
+        assert resilient.breaker.consecutive_failures == 1
+
+    with pytest.raises(openai.APIStatusError):
+        resilient.call(failing(status_error(400)))
+    assert resilient.breaker.consecutive_failures == 0
+
+
+def test_local_error_on_the_half_open_probe_keeps_the_circuit_from_closing():
+    resilient = caller(failure_threshold=1, reset_timeout=0.0)
+    with pytest.raises(openai.APIStatusError):
+        resilient.call(failing(status_error(503)))
+    assert resilient.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(ValueError):
+        resilient.call(failing(ValueError("bad model output")))
+    assert resilient.breaker.state == CircuitBreaker.HALF_OPEN
+
+    # The probe was released, so the next call probes the provider and closes the circuit
+    assert resilient.call(lambda: "ok") == "ok"
+    assert resilient.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_rejects_without_calling():
+    resilient = caller(failure_threshold=1)
+    with pytest.raises(openai.APIStatusError):
+        resilient.call(failing(status_error(500)))
+
+    with pytest.raises(CircuitOpenError):
+        resilient.call(lambda: pytest.fail("called the provider"))
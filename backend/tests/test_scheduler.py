@@ -0,0 +1,228 @@
+# backend/tests/test_scheduler.py
+import asyncio
+import threading
+import time
+
+from app.models.lesson import LessonRequest
+from app.services.lesson_generator import create_baseline_fallback_lesson
+from app.services.resilience import CircuitBreaker
+from app.services.scheduler import (
+    BACKGROUND, INTERACTIVE, NORMAL, PriorityScheduler, WorkPriority, current_priority, priority_scope
+)
+from app.services.single_flight import SingleFlight
+
+WEIGHTS = {INTERACTIVE: 8.0, NORMAL: 4.0, BACKGROUND: 1.0}
+
+
+def scheduler(slots, background_slots):
+    return PriorityScheduler("test", slots, WEIGHTS, background_slots=background_slots)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def waiting(pool, level):
+    return pool.stats()["waiting"][level]
+
+
+def running(pool, level):
+    return pool.stats()["running"][level]
+
+
+class Holder(threading.Thread):
+    """Takes a slot at ``work``'s priority, records the grant, and holds it until released"""
+
+    def __init__(self, pool, work, granted, name):
+        super().__init__(daemon=True)
+        self.pool, self.work, self.granted, self.name = pool, work, granted, name
+        self.release = threading.Event()
+
+    def run(self):
+        with self.pool.acquire(work=self.work):
+            self.granted.append(self.name)
+            self.release.wait(2)
+
+
+def test_interactive_waiter_is_granted_ahead_of_queued_background_work():
+    pool = scheduler(slots=1, background_slots=1)
+    granted = []
+    holder = Holder(pool, WorkPriority(NORMAL), granted, "normal")
+    holder.start()
+    wait_until(lambda: granted == ["normal"])
+
+    background = Holder(pool, WorkPriority(BACKGROUND), granted, "background")
+    background.start()
+    wait_until(lambda: waiting(pool, BACKGROUND) == 1)
+    interactive = Holder(pool, WorkPriority(INTERACTIVE), granted, "interactive")
+    interactive.start()
+    wait_until(lambda: waiting(pool, INTERACTIVE) == 1)
+
+    holder.release.set()
+    wait_until(lambda: len(granted) == 2)
+    assert granted == ["normal", "interactive"]
+    interactive.release.set()
+    wait_until(lambda: len(granted) == 3)
+    background.release.set()
+    for thread in (holder, background, interactive):
+        thread.join(2)
+
+
+def test_background_checkpoint_yields_its_slot():
+    pool = scheduler(slots=1, background_slots=1)
+    events = []
+    holding, resume = threading.Event(), threading.Event()
+
+    def background_render():
+        with pool.acquire(work=WorkPriority(BACKGROUND)) as slot:
+            holding.set()
+            resume.wait(2)
+            slot.checkpoint()  # a teacher is waiting: step aside, then carry on
+            events.append("background resumed")
+
+    render = threading.Thread(target=background_render, daemon=True)
+    render.start()
+    holding.wait(2)
+
+    teacher = Holder(pool, WorkPriority(INTERACTIVE), events, "interactive granted")
+    teacher.start()
+    wait_until(lambda: waiting(pool, INTERACTIVE) == 1)
+    resume.set()
+
+    wait_until(lambda: events == ["interactive granted"])
+    assert running(pool, BACKGROUND) == 0
+    assert pool.stats()["preempted"] == 1
+    teacher.release.set()
+    render.join(2)
+    assert events == ["interactive granted", "background resumed"]
+
+
+def test_checkpoint_keeps_the_slot_when_nobody_else_waits():
+    pool = scheduler(slots=1, background_slots=1)
+    with pool.acquire(work=WorkPriority(BACKGROUND)) as slot:
+        assert not slot.should_yield()
+        slot.checkpoint()
+    assert pool.stats()["preempted"] == 0
+
+
+def test_background_work_is_capped_to_its_slots():
+    pool = scheduler(slots=2, background_slots=1)
+    granted = []
+    first = Holder(pool, WorkPriority(BACKGROUND), granted, "first")
+    first.start()
+    wait_until(lambda: granted == ["first"])
+
+    second = Holder(pool, WorkPriority(BACKGROUND), granted, "second")
+    second.start()
+    wait_until(lambda: waiting(pool, BACKGROUND) == 1)
+    # A slot is free, but it is kept for interactive and normal work
+    with pool.acquire(work=WorkPriority(NORMAL), timeout=1):
+        assert granted == ["first"]
+
+    first.release.set()
+    wait_until(lambda: granted == ["first", "second"])
+    second.release.set()
+    for thread in (first, second):
+        thread.join(2)
+
+
+def test_promoting_queued_work_requeues_it_at_the_new_level():
+    pool = scheduler(slots=2, background_slots=1)
+    granted = []
+    running_background = Holder(pool, WorkPriority(BACKGROUND), granted, "running")
+    running_background.start()
+    wait_until(lambda: granted == ["running"])
+
+    speculative = WorkPriority(BACKGROUND)
+    queued = Holder(pool, speculative, granted, "speculative")
+    queued.start()
+    wait_until(lambda: waiting(pool, BACKGROUND) == 1)
+
+    # A teacher joins the speculative work: it is no longer background, so the free slot is its
+    speculative.promote(INTERACTIVE)
+    wait_until(lambda: granted == ["running", "speculative"])
+    assert running(pool, INTERACTIVE) == 1
+    assert waiting(pool, BACKGROUND) == 0
+
+    # Promotion only ever raises the level
+    speculative.promote(BACKGROUND)
+    assert speculative.level == INTERACTIVE
+    for thread in (running_background, queued):
+        thread.release.set()
+        thread.join(2)
+
+
+def test_promoting_a_running_holder_frees_its_background_slot():
+    pool = scheduler(slots=2, background_slots=1)
+    granted = []
+    prerender = WorkPriority(BACKGROUND)
+    holder = Holder(pool, prerender, granted, "prerender")
+    holder.start()
+    wait_until(lambda: granted == ["prerender"])
+    waiter = Holder(pool, WorkPriority(BACKGROUND), granted, "background")
+    waiter.start()
+    wait_until(lambda: waiting(pool, BACKGROUND) == 1)
+
+    prerender.promote(NORMAL)
+
+    wait_until(lambda: granted == ["prerender", "background"])
+    assert running(pool, NORMAL) == running(pool, BACKGROUND) == 1
+    for thread in (holder, waiter):
+        thread.release.set()
+        thread.join(2)
+
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the single half-open probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_failure()  # the probe failed
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_single_flight_coalesces_promotes_and_hands_each_caller_a_copy():
+    lesson_request = LessonRequest(topic="Optics", chapter="Chapter 1", lesson_title="Refraction",
+                                   learning_objectives="Explain refraction", duration="50 minutes")
+    lesson = create_baseline_fallback_lesson(lesson_request)
+    flights = SingleFlight(copy_result=lambda result: result.model_copy(deep=True))
+    levels = []
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        levels.append(current_priority().level)
+        return lesson
+
+    async def callers():
+        started = asyncio.ensure_future(flights.do("key", generate))
+        await asyncio.sleep(0)
+        with priority_scope(INTERACTIVE):
+            joined = await flights.do("key", generate)
+        return await started, joined
+
+    first, second = asyncio.run(callers())
+
+    # One call, raised to the priority of the teacher who joined it
+    assert levels == [INTERACTIVE]
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 1}
+    assert first is not second and first is not lesson
+    first.slides[0].title = "Changed by one caller"
+    assert second.slides[0].title == lesson.slides[0].title
@@ -0,0 +1,143 @@
+# backend/tests/test_session_store.py
+import asyncio
+import os
+import threading
+
+import pytest
+
+from app.api.endpoints import enhance_slide_with_ai
+from app.models.lesson import LessonRequest
+from app.services.lesson_generator import create_baseline_fallback_lesson
+from app.services.session_store import LessonSessionStore
+
+LESSON_REQUEST = LessonRequest(
+    topic="Thermodynamics",
+    chapter="Chapter 3",
+    lesson_title="Entropy and the Second Law",
+    learning_objectives="Analyze entropy changes in isolated systems",
+    duration="75 minutes"
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Every idle session is spilled as soon as a new one is admitted
+    return LessonSessionStore(memory_limit=10 * 1024 * 1024, spill_threshold=0.0, spill_idle=0.0,
+                              spill_root=str(tmp_path))
+
+
+def new_session():
+    return {
+        "request": LESSON_REQUEST,
+        "current_stage": "baseline",
+        "lesson_content": create_baseline_fallback_lesson(LESSON_REQUEST),
+        "edit_history": [{"slide_index": 0, "original": {"title": "Before"}, "timestamp": "t"}],
+        "lesson_dir": "static/downloads/s1",
+        "speculative": False
+    }
+
+
+def spill(store, session_id):
+    assert asyncio.run(store.admit())
+    assert store.memory(session_id)["spilled"]
+
+
+def test_spilled_session_round_trips(store):
+    store["s1"] = new_session()
+    session = store["s1"]
+    session["lesson_content"].slides[2].title = "Edited title"
+    session["version"] = 4
+    session["slide_versions"][2] = 4
+    before = session["lesson_content"].model_dump()
+
+    spill(store, "s1")
+    restored = store["s1"]
+
+    assert restored["lesson_content"].model_dump() == before
+    assert restored["request"] == LESSON_REQUEST
+    assert restored["version"] == 4
+    assert restored["slide_versions"][2] == 4
+    assert restored["edit_history"] == session["edit_history"]
+    assert store.stats()["restores"] == 1
+
+
+def test_session_beyond_field_limits_round_trips(store):
+    # The AI slide enhancement appends to notes without validation, past LessonSlide's 1000 characters
+    store["s1"] = new_session()
+    slides = store["s1"]["lesson_content"].slides
+    for _ in range(3):
+        slides[0] = enhance_slide_with_ai(slides[0], "Add a worked example " * 25, LESSON_REQUEST)
+    notes = slides[0].notes
+    assert len(notes) > 1000
+
+    spill(store, "s1")
+
+    assert "s1" in store
+    assert store["s1"]["lesson_content"].slides[0].notes == notes
+    assert store["s1"]["lesson_content"].model_dump_json()
+
+
+def test_unreadable_spill_is_dropped(store):
+    store["s1"] = new_session()
+    spill(store, "s1")
+    with open(store._spill_path("s1"), "wb") as spill_file:
+        spill_file.write(b"{truncated")
+
+    assert "s1" not in store
+    with pytest.raises(KeyError):
+        store["s1"]
+    assert store.get("s1") is None
+    assert not os.path.exists(store._spill_path("s1"))
+    assert store.stats()["restore_failures"] == 1
+
+
+def test_session_used_while_spilling_stays_in_memory(store, monkeypatch):
+    store["s1"] = new_session()
+    write_spill = store._write_spill
+
+    def used_meanwhile(session_id, session):
+        size = write_spill(session_id, session)
+        store["s1"]  # an endpoint reads the session while it is written out
+        return size
+
+    monkeypatch.setattr(store, "_write_spill", used_meanwhile)
+    asyncio.run(store.admit())
+
+    assert not store.memory("s1")["spilled"]
+    assert not os.path.exists(store._spill_path("s1"))
+
+
+def test_ensure_loaded_reads_the_spill_off_the_event_loop(store, monkeypatch):
+    store["s1"] = new_session()
+    spill(store, "s1")
+    read_spill = store._read_spill
+    read_in = []
+
+    def recording(session_id):
+        read_in.append(threading.current_thread() is threading.main_thread())
+        return read_spill(session_id)
+
+    monkeypatch.setattr(store, "_read_spill", recording)
+
+    assert asyncio.run(store.ensure_loaded("s1"))
+    assert not store.memory("s1")["spilled"]
+    assert asyncio.run(store.ensure_loaded("s1"))
+    assert read_in == [False]  # once, and in a worker thread rather than on the event loop
+    assert not asyncio.run(store.ensure_loaded("missing"))
+
+
+def test_session_replaced_while_loading_is_kept(store, monkeypatch):
+    store["s1"] = new_session()
+    spill(store, "s1")
+    replacement = new_session()
+    read_spill = store._read_spill
+
+    def replaced_meanwhile(session_id):
+        session = read_spill(session_id)
+        store["s1"] = replacement  # e.g. the lesson was reopened from the archive
+        return session
+
+    monkeypatch.setattr(store, "_read_spill", replaced_meanwhile)
+
+    assert asyncio.run(store.ensure_loaded("s1"))
+    assert store["s1"] is replacement
@@ -12,10 +12,34 @@ const apiClient = axios.create({
   }
 });
 
+const MAX_IDEMPOTENT_RETRIES = 2;
+const RETRYABLE_STATUSES = [502, 503, 504];
+
+/**
+ * Request config carrying a fresh Idempotency-Key; retries of the request reuse it,
+ * so the server replays the first result instead of generating again
+ */
+const withIdempotencyKey = (config = {}) => {
+  const key = window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+  return { ...config, headers: { ...(config.headers || {}), 'Idempotency-Key': key } };
+};
+
 // Response interceptor for error handling
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const config = error.config;
+    const retryable = !error.response || RETRYABLE_STATUSES.includes(error.response.status);
+    if (config && config.headers?.['Idempotency-Key'] && retryable
+        && (config.idempotentRetries || 0) < MAX_IDEMPOTENT_RETRIES) {
+      // Timeouts and gateway errors are retried with the same key
+      config.idempotentRetries = (config.idempotentRetries || 0) + 1;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * config.idempotentRetries));
+      return apiClient.request(config);
+    }
+
     console.error('API Error:', error);
 
     if (error.response) {
@@ -47,9 +71,9 @@ export const generateBaselineLesson = async (formData) => {
       }
     });
 
-    const response = await apiClient.post('/generate-baseline', data, {
+    const response = await apiClient.post('/generate-baseline', data, withIdempotencyKey({
       headers: { 'Content-Type': 'multipart/form-data' }
-    });
+    }));
 
     return response.data;
   } catch (error) {
@@ -57,29 +81,121 @@ export const generateBaselineLesson = async (formData) => {
   }
 };
 
+// Start a baseline session from an existing .pptx deck (no generation); lesson_title defaults to the deck's title
+export const importDeck = async (formData) => {
+  const data = new FormData();
+  Object.keys(formData).forEach(key => {
+    if (formData[key] !== undefined && formData[key] !== null) {
+      data.append(key, key === 'file' ? formData[key] : formData[key].toString());
+    }
+  });
+
+  const response = await apiClient.post('/import-deck', data, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  });
+  return response.data;
+};
+
+// Last ETag and body per session read, so unchanged reads come back as 304s
+const sessionReadCache = new Map();
+
 /**
  * Get current lesson session data
+ *
+ * Options:
+ *  - fields: array of lesson fields to return (use 'slides.<field>' for slide fields)
+ *  - sinceVersion: only return slides changed after this version
  */
-export const getLessonSession = async (sessionId) => {
+export const getLessonSession = async (sessionId, { fields, sinceVersion } = {}) => {
   try {
-    const response = await apiClient.get(`/lesson-session/${sessionId}`);
+    const params = {};
+    if (fields && fields.length) params.fields = fields.join(',');
+    if (sinceVersion !== undefined && sinceVersion !== null) params.since_version = sinceVersion;
+
+    const cacheKey = `${sessionId}?${new URLSearchParams(params).toString()}`;
+    const cached = sessionReadCache.get(cacheKey);
+
+    const response = await apiClient.get(`/lesson-session/${sessionId}`, {
+      params,
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+
+    if (response.headers.etag) {
+      sessionReadCache.set(cacheKey, { etag: response.headers.etag, data: response.data });
+    }
     return response.data;
   } catch (error) {
     throw error;
   }
 };
 
+/**
+ * Get a single slide, optionally limited to some fields
+ */
+export const getLessonSlide = async (sessionId, slideIndex, fields = null) => {
+  try {
+    const params = fields && fields.length ? { fields: fields.join(',') } : {};
+    const response = await apiClient.get(`/lesson-session/${sessionId}/slides/${slideIndex}`, { params });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Merge a since_version response into the lesson content the client already has
+ */
+export const applyLessonChanges = (lessonContent, sessionData) => {
+  if (sessionData.full || !lessonContent) {
+    return sessionData.lesson_content;
+  }
+
+  const slides = [...lessonContent.slides];
+  sessionData.changed_slides.forEach(({ index, slide }) => {
+    if (slide) {
+      slides[index] = { ...slides[index], ...slide };
+    }
+  });
+  return { ...lessonContent, slides };
+};
+
 /**
  * Edit a specific slide
  */
-export const editSlide = async (sessionId, slideIndex, slideData) => {
+export const editSlide = async (sessionId, slideIndex, slideData, baseVersion = null) => {
   try {
     const response = await apiClient.post(`/edit-slide/${sessionId}`, {
       slide_index: slideIndex,
       title: slideData.title,
       content: slideData.content,
       notes: slideData.notes,
-      image_prompt: slideData.image_prompt
+      image_prompt: slideData.image_prompt,
+      base_version: baseVersion
+    });
+
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Apply several slide operations as one atomic edit
+ *
+ * Each operation is {op: 'patch' | 'insert' | 'delete' | 'move', slide_index, to_index?,
+ * title?, content?, notes?, image_prompt?}; indexes refer to the deck as left by the
+ * operations before it.
+ */
+export const editSlides = async (sessionId, operations, baseVersion = null) => {
+  try {
+    const response = await apiClient.post(`/edit-slides/${sessionId}`, {
+      operations,
+      base_version: baseVersion
     });
 
     return response.data;
@@ -96,7 +212,7 @@ export const enhanceSlideWithAI = async (sessionId, slideIndex, prompt) => {
     const response = await apiClient.post(`/ai-enhance-slide/${sessionId}`, {
       slide_index: slideIndex,
       prompt: prompt
-    });
+    }, withIdempotencyKey());
 
     return response.data;
   } catch (error) {
@@ -112,7 +228,22 @@ export const applyUDLPrinciple = async (sessionId, principle, customRequirements
     const response = await apiClient.post(`/apply-udl-principle/${sessionId}`, {
       principle: principle,
       custom_requirements: customRequirements
-    });
+    }, withIdempotencyKey());
+
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Apply all remaining UDL principles in one run (optionally exporting the result)
+ */
+export const runFullUDL = async (sessionId, exportDeck = true) => {
+  try {
+    const response = await apiClient.post(`/run-full-udl/${sessionId}`, {
+      export: exportDeck
+    }, withIdempotencyKey());
 
     return response.data;
   } catch (error) {
@@ -144,6 +275,92 @@ export const deleteLessonSession = async (sessionId) => {
   }
 };
 
+/**
+ * Search archived lessons' slides (ranked best first, paginated)
+ */
+export const searchLibrary = async (query, { page = 1, pageSize = 20, stage = null } = {}) => {
+  try {
+    const params = { q: query, page, page_size: pageSize };
+    if (stage) params.stage = stage;
+    const response = await apiClient.get('/library/search', { params });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Archived lessons whose request nearly matches this lesson form (checked before generating)
+ */
+export const findSimilarLessons = async (formData, limit = 5) => {
+  try {
+    const { file, ...fields } = formData;
+    const response = await apiClient.post('/library/similar', fields, { params: { limit } });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Full content of an archived lesson
+ */
+export const getArchivedLesson = async (lessonId) => {
+  try {
+    const response = await apiClient.get(`/library/lessons/${lessonId}`);
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Start a new session from an archived lesson instead of generating a baseline
+ */
+export const startFromArchivedLesson = async (lessonId) => {
+  try {
+    const response = await apiClient.post(`/library/lessons/${lessonId}/start`);
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+/**
+ * Open the live session channel (stage progress, slide patches, co-teacher edits)
+ *
+ * handlers: { onEvent(event), onClose(closeEvent) }. Events include snapshot,
+ * slide_patch, slides_patch, stage_started, stage_progress, lesson_replaced, exported,
+ * ack, conflict, resync and session_closed. On "resync" a fresh snapshot is
+ * requested automatically.
+ */
+export const connectSessionSocket = (sessionId, { onEvent, onClose } = {}) => {
+  const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/session/${sessionId}`);
+  const send = (message) => socket.readyState === WebSocket.OPEN && socket.send(JSON.stringify(message));
+
+  socket.onmessage = (message) => {
+    const event = JSON.parse(message.data);
+    if (event.type === 'resync') {
+      send({ type: 'resync' });
+    }
+    if (onEvent) onEvent(event);
+  };
+  socket.onclose = (closeEvent) => {
+    if (onClose) onClose(closeEvent);
+  };
+
+  return {
+    socket,
+    // Edits made against a stale baseVersion come back as a "conflict" with the current slide
+    sendEdit: (slideIndex, changes, baseVersion = null) => {
+      const opId = `op-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+      send({ type: 'edit', op_id: opId, slide_index: slideIndex, base_version: baseVersion, ...changes });
+      return opId;
+    },
+    close: () => socket.close()
+  };
+};
+
 /**
  * Health check
  */
@@ -450,11 +667,20 @@ export default {
   // API functions
   generateBaselineLesson,
   getLessonSession,
+  getLessonSlide,
+  applyLessonChanges,
   editSlide,
+  editSlides,
   enhanceSlideWithAI,
   applyUDLPrinciple,
+  runFullUDL,
   exportLesson,
   deleteLessonSession,
+  searchLibrary,
+  findSimilarLessons,
+  getArchivedLesson,
+  startFromArchivedLesson,
+  connectSessionSocket,
   healthCheck,
 
   // Utility functions